@@ -0,0 +1,675 @@
+import cmath
+import math
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from decimal import (Context, Decimal, DivisionByZero, InvalidOperation, Overflow,
+                     localcontext)
+from fractions import Fraction
+from functools import wraps
+from typing import Any, Callable, Dict, Tuple
+
+# A backend decides what numbers a compiled expression computes with: how
+# literals and variables are converted, the function table, and the
+# factorial and power implementations. Results too large to be worth
+# computing exactly (more than max_digits digits) raise OverflowError.
+DEFAULT_MAX_DIGITS = 10_000
+
+_GUARD_DIGITS = 5
+
+
+def _check_factorial(value: Any, max_digits: int) -> int:
+    if value < 0 or value != int(value):
+        raise ValueError("Factorial requires non-negative integers")
+    n = int(value)
+    digits = math.lgamma(n + 1) / math.log(10)
+    if digits > max_digits:
+        raise OverflowError(f"Result too large: {n}! is about 10^{digits:.0f}")
+    return n
+
+
+def _with_guard_digits(function: Callable[[Decimal], Decimal]) -> Callable[[Decimal], Decimal]:
+    # Series are summed with a few extra digits, then rounded to the caller's
+    # precision.
+    @wraps(function)
+    def wrapper(value: Decimal) -> Decimal:
+        with localcontext() as context:
+            context.prec += _GUARD_DIGITS
+            result = function(value)
+        return +result
+    return wrapper
+
+
+def _decimal_pi() -> Decimal:
+    with localcontext() as context:
+        context.prec += 2
+        three = Decimal(3)
+        last, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+        while s != last:
+            last = s
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            s += t
+    return +s
+
+
+def _reduce_angle(value: Decimal) -> Decimal:
+    # sin and cos converge fastest close to zero.
+    return value.remainder_near(2 * _decimal_pi())
+
+
+@_with_guard_digits
+def _decimal_sin(value: Decimal) -> Decimal:
+    x = _reduce_angle(value)
+    i, last, s, fact, num, sign = 1, 0, x, 1, x, 1
+    while s != last:
+        last = s
+        i += 2
+        fact *= i * (i - 1)
+        num *= x * x
+        sign *= -1
+        s += num / fact * sign
+    return s
+
+
+@_with_guard_digits
+def _decimal_cos(value: Decimal) -> Decimal:
+    x = _reduce_angle(value)
+    i, last, s, fact, num, sign = 0, 0, 1, 1, 1, 1
+    while s != last:
+        last = s
+        i += 2
+        fact *= i * (i - 1)
+        num *= x * x
+        sign *= -1
+        s += num / fact * sign
+    return s
+
+
+@_with_guard_digits
+def _decimal_tan(value: Decimal) -> Decimal:
+    return _decimal_sin(value) / _decimal_cos(value)
+
+
+@_with_guard_digits
+def _decimal_atan(value: Decimal) -> Decimal:
+    if abs(value) > 1:
+        half_pi = _decimal_pi() / 2
+        return (half_pi if value > 0 else -half_pi) - _decimal_atan(1 / value)
+    # atan(x) = 2 atan(x / (1 + sqrt(1 + x^2))) until the series converges fast.
+    doublings = 0
+    while abs(value) > Decimal('0.1'):
+        value = value / (1 + (1 + value * value).sqrt())
+        doublings += 1
+    x2 = value * value
+    last, s, term, n = 0, value, value, 1
+    while s != last:
+        last = s
+        term *= -x2
+        n += 2
+        s += term / n
+    return s * (2 ** doublings)
+
+
+@_with_guard_digits
+def _decimal_asin(value: Decimal) -> Decimal:
+    if abs(value) > 1:
+        raise ValueError("math domain error")
+    if abs(value) == 1:
+        return _decimal_pi() / 2 * value
+    return _decimal_atan(value / (1 - value * value).sqrt())
+
+
+@_with_guard_digits
+def _decimal_acos(value: Decimal) -> Decimal:
+    return _decimal_pi() / 2 - _decimal_asin(value)
+
+
+def _decimal_sqrt(value: Decimal) -> Decimal:
+    if value < 0:
+        raise ValueError("math domain error")
+    return value.sqrt()
+
+
+def _decimal_ln(value: Decimal) -> Decimal:
+    if value <= 0:
+        raise ValueError("math domain error")
+    return value.ln()
+
+
+def _decimal_log10(value: Decimal) -> Decimal:
+    if value <= 0:
+        raise ValueError("math domain error")
+    return value.log10()
+
+
+DECIMAL_FUNCTION_MAP = {
+    'sin': _decimal_sin,
+    'cos': _decimal_cos,
+    'tan': _decimal_tan,
+    'asin': _decimal_asin,
+    'acos': _decimal_acos,
+    'atan': _decimal_atan,
+    'sqrt': _decimal_sqrt,
+    'log': _decimal_log10,
+    'ln': _decimal_ln,
+    'exp': lambda value: value.exp(),
+}
+
+
+@dataclass(frozen=True)
+class DecimalBackend:
+    # decimal.Decimal arithmetic rounded to `precision` significant digits.
+    # Literals are converted from their shortest repr, so 0.1 is exactly 0.1.
+    precision: int = 28
+    max_digits: int = DEFAULT_MAX_DIGITS
+
+    name = 'decimal'
+    functions = DECIMAL_FUNCTION_MAP
+
+    def __post_init__(self):
+        if self.precision < 1:
+            raise ValueError("Precision must be positive")
+
+    def number(self, value: Any) -> Decimal:
+        if isinstance(value, float):
+            # The parser has already replaced pi and e by floats; they are
+            # recomputed at full precision.
+            if value == math.pi:
+                return _decimal_pi()
+            if value == math.e:
+                return Decimal(1).exp()
+            if value.is_integer() and abs(value) < 1e16:
+                return Decimal(int(value))
+            return Decimal(repr(value))
+        return Decimal(value)
+
+    def factorial(self, value: Decimal) -> Decimal:
+        return +Decimal(math.factorial(_check_factorial(value, self.max_digits)))
+
+    def power(self, base: Decimal, exponent: Decimal) -> Decimal:
+        integral = exponent == exponent.to_integral_value()
+        if base < 0 and not integral:
+            raise ValueError("Negative base requires an integer exponent")
+        if base == 0:
+            if exponent < 0:
+                raise ZeroDivisionError("0 cannot be raised to a negative power")
+        else:
+            with localcontext() as context:
+                context.prec = 16
+                digits = float(exponent) * float(abs(base).log10())
+            if digits > self.max_digits:
+                raise OverflowError(f"Result too large: {base:g}^{exponent:g} is about 10^{digits:.0f}")
+        return base ** (int(exponent) if integral else exponent)
+
+    @contextmanager
+    def context(self):
+        # The decimal signals are reported as the exceptions float
+        # arithmetic would raise, so error handling stays the same.
+        traps = [InvalidOperation, DivisionByZero, Overflow]
+        with localcontext(Context(prec=self.precision, traps=traps)):
+            try:
+                yield
+            except DivisionByZero as e:
+                raise ZeroDivisionError("division by zero") from e
+            except Overflow as e:
+                raise OverflowError("Result too large") from e
+            except InvalidOperation as e:
+                raise ValueError("Invalid operation") from e
+
+
+def _exact_sqrt(value: Any) -> Any:
+    if isinstance(value, Fraction) and value >= 0:
+        numerator = math.isqrt(value.numerator)
+        denominator = math.isqrt(value.denominator)
+        if numerator * numerator == value.numerator and denominator * denominator == value.denominator:
+            return Fraction(numerator, denominator)
+    return math.sqrt(value)
+
+
+def _exact_log10(value: Any) -> Any:
+    if isinstance(value, Fraction) and value > 0:
+        for exponent in (len(str(value.numerator)) - 1, 1 - len(str(value.denominator))):
+            if value == Fraction(10) ** exponent:
+                return Fraction(exponent)
+    return math.log10(value)
+
+
+def _float_function(function: Callable[[float], float], exact_at_zero: bool) -> Callable[[Any], Any]:
+    # f(0) == 0 stays exact for the odd functions; everything else that has
+    # no exact rational result falls back to a float.
+    def call(value: Any) -> Any:
+        if exact_at_zero and value == 0:
+            return Fraction(0)
+        return function(value)
+    return call
+
+
+FRACTION_FUNCTION_MAP: Dict[str, Callable[[Any], Any]] = {
+    'sin': _float_function(math.sin, True),
+    'cos': _float_function(math.cos, False),
+    'tan': _float_function(math.tan, True),
+    'asin': _float_function(math.asin, True),
+    'acos': _float_function(math.acos, False),
+    'atan': _float_function(math.atan, True),
+    'sqrt': _exact_sqrt,
+    'log': _exact_log10,
+    'ln': lambda value: Fraction(0) if value == 1 else math.log(value),
+    'exp': lambda value: Fraction(1) if value == 0 else math.exp(value),
+}
+
+
+@dataclass(frozen=True)
+class FractionBackend:
+    # Exact rational arithmetic where the result is rational; functions and
+    # powers without an exact result fall back to float, and anything
+    # combined with a float is a float from then on.
+    max_digits: int = DEFAULT_MAX_DIGITS
+
+    name = 'fraction'
+    functions = FRACTION_FUNCTION_MAP
+
+    def number(self, value: Any) -> Any:
+        # Literals arrive as their source text and become exact. Floats are
+        # taken at their shortest repr, except pi, e and non-finite values,
+        # which have no exact rational and stay floats.
+        if isinstance(value, float):
+            if not math.isfinite(value) or value in (math.pi, math.e):
+                return value
+            return Fraction(repr(value))
+        return Fraction(value)
+
+    def factorial(self, value: Any) -> Fraction:
+        return Fraction(math.factorial(_check_factorial(value, self.max_digits)))
+
+    def power(self, base: Any, exponent: Any) -> Any:
+        integral = exponent == int(exponent)
+        if base < 0 and not integral:
+            raise ValueError("Negative base requires an integer exponent")
+        if not isinstance(base, Fraction) or not isinstance(exponent, Fraction):
+            return float(base) ** float(exponent)
+        if base == 0:
+            if exponent < 0:
+                raise ZeroDivisionError("0 cannot be raised to a negative power")
+            return Fraction(0) if exponent else Fraction(1)
+        magnitude = math.log10(abs(base.numerator)) - math.log10(base.denominator)
+        digits = float(exponent) * magnitude
+        if digits > self.max_digits:
+            raise OverflowError(f"Result too large: {base}^{exponent} is about 10^{digits:.0f}")
+        if integral:
+            return base ** int(exponent)
+        if exponent.denominator == 2:
+            root = _exact_sqrt(base)
+            if isinstance(root, Fraction):
+                return root ** exponent.numerator
+        return float(base) ** float(exponent)
+
+    @contextmanager
+    def context(self):
+        try:
+            yield
+        except ZeroDivisionError as e:
+            # Fraction reports x/0 as "Fraction(x, 0)".
+            if str(e).startswith('Fraction('):
+                raise ZeroDivisionError("division by zero") from e
+            raise
+
+
+def _unsigned_zero(value: complex) -> complex:
+    # Negating a real such as 1 gives -1-0j, and cmath puts -0j on the other
+    # side of its branch cuts: sqrt(-1-0j) is -1j. The user wrote a real
+    # number, so the imaginary zero is taken as +0.
+    return complex(value.real, value.imag or 0.0)
+
+
+def _principal(function: Callable[[complex], complex]) -> Callable[[complex], complex]:
+    return lambda value: function(_unsigned_zero(value))
+
+
+COMPLEX_FUNCTION_MAP = {
+    'sin': cmath.sin,
+    'cos': cmath.cos,
+    'tan': cmath.tan,
+    'asin': _principal(cmath.asin),
+    'acos': _principal(cmath.acos),
+    'atan': _principal(cmath.atan),
+    'sqrt': _principal(cmath.sqrt),
+    'log': _principal(cmath.log10),
+    'ln': _principal(cmath.log),
+    'exp': cmath.exp,
+}
+
+# Largest power of ten a float can hold.
+_FLOAT_DIGITS = 308
+
+
+@dataclass(frozen=True)
+class ComplexBackend:
+    # cmath arithmetic, so sqrt(-1) is 1j and asin(2) has a value.
+    # Expressions whose inputs are all real are evaluated with floats first
+    # (real_fast_path); only if that fails with a domain error is the
+    # expression run again with complex numbers. Results are therefore
+    # floats unless the evaluation had to leave the real line.
+    real_fast_path = True
+    # Results are not always real numbers; see CalculatorEngine.
+    real_results = False
+    name = 'complex'
+    functions = COMPLEX_FUNCTION_MAP
+
+    def number(self, value: Any) -> complex:
+        return complex(value)
+
+    def factorial(self, value: complex) -> complex:
+        if value.imag:
+            raise ValueError("Factorial requires non-negative integers")
+        return complex(math.factorial(_check_factorial(value.real, _FLOAT_DIGITS)))
+
+    def power(self, base: complex, exponent: complex) -> complex:
+        if base:
+            digits = exponent.real * math.log10(abs(base)) - exponent.imag * cmath.phase(base) / math.log(10)
+            if digits > _FLOAT_DIGITS:
+                raise OverflowError(f"Result too large: about 10^{digits:.0f}")
+        return _unsigned_zero(base) ** exponent
+
+    def context(self):
+        return nullcontext()
+
+
+def _outward(low: float, high: float, ulps: int = 1) -> Tuple[float, float]:
+    for _ in range(ulps):
+        low = math.nextafter(low, -math.inf)
+        high = math.nextafter(high, math.inf)
+    return low, high
+
+
+def _overflowed(approximate: float) -> Tuple[float, float]:
+    # A finite result beyond the largest float lies between it and infinity.
+    if approximate > 0:
+        return math.nextafter(approximate, 0), approximate
+    return approximate, math.nextafter(approximate, 0)
+
+
+def _rounded(exact: Fraction, approximate: float) -> Tuple[float, float]:
+    # The floats either side of an exact result, given its nearest float.
+    if math.isinf(approximate):
+        return _overflowed(approximate)
+    if exact == approximate:
+        return approximate, approximate
+    if exact > approximate:
+        return approximate, math.nextafter(approximate, math.inf)
+    return math.nextafter(approximate, -math.inf), approximate
+
+
+def _product(a: float, b: float) -> Tuple[float, float]:
+    if not (math.isfinite(a) and math.isfinite(b)):
+        return a * b, a * b
+    return _rounded(Fraction(a) * Fraction(b), a * b)
+
+
+def _quotient(a: float, b: float) -> Tuple[float, float]:
+    if not (math.isfinite(a) and math.isfinite(b)):
+        return a / b, a / b
+    return _rounded(Fraction(a) / Fraction(b), a / b)
+
+
+def _sum(a: float, b: float) -> Tuple[float, float]:
+    # Knuth's TwoSum: s + error is exactly a + b.
+    s = a + b
+    if not math.isfinite(s):
+        return _overflowed(s) if math.isfinite(a) and math.isfinite(b) else (s, s)
+    b_virtual = s - a
+    error = (a - (s - b_virtual)) + (b - b_virtual)
+    if error > 0:
+        return s, math.nextafter(s, math.inf)
+    if error < 0:
+        return math.nextafter(s, -math.inf), s
+    return s, s
+
+
+@dataclass(frozen=True)
+class Interval:
+    # A closed interval of reals. Every operation rounds its bounds outwards,
+    # so the exact result of the same operations on any points inside the
+    # operands lies inside the result.
+    low: float
+    high: float
+
+    def __post_init__(self):
+        if not self.low <= self.high:
+            raise ValueError("Invalid interval")
+
+    @classmethod
+    def point(cls, value: float) -> 'Interval':
+        return cls(value, value)
+
+    @property
+    def width(self) -> float:
+        return self.high - self.low
+
+    @property
+    def midpoint(self) -> float:
+        return self.low + (self.high - self.low) / 2
+
+    def __contains__(self, value: float) -> bool:
+        return self.low <= value <= self.high
+
+    def __str__(self) -> str:
+        return f"[{self.low!r}, {self.high!r}]"
+
+    def __neg__(self) -> 'Interval':
+        return Interval(-self.high, -self.low)
+
+    def __add__(self, other: Any) -> 'Interval':
+        other = _as_interval(other)
+        return Interval(_sum(self.low, other.low)[0], _sum(self.high, other.high)[1])
+
+    def __sub__(self, other: Any) -> 'Interval':
+        other = _as_interval(other)
+        return Interval(_sum(self.low, -other.high)[0], _sum(self.high, -other.low)[1])
+
+    def __mul__(self, other: Any) -> 'Interval':
+        other = _as_interval(other)
+        bounds = [_product(a, b) for a in (self.low, self.high) for b in (other.low, other.high)]
+        return Interval(min(low for low, _ in bounds), max(high for _, high in bounds))
+
+    def __truediv__(self, other: Any) -> 'Interval':
+        other = _as_interval(other)
+        if other.low <= 0 <= other.high:
+            raise ZeroDivisionError("division by zero")
+        bounds = [_quotient(a, b) for a in (self.low, self.high) for b in (other.low, other.high)]
+        return Interval(min(low for low, _ in bounds), max(high for _, high in bounds))
+
+    def __radd__(self, other: Any) -> 'Interval':
+        return _as_interval(other) + self
+
+    def __rsub__(self, other: Any) -> 'Interval':
+        return _as_interval(other) - self
+
+    def __rmul__(self, other: Any) -> 'Interval':
+        return _as_interval(other) * self
+
+    def __rtruediv__(self, other: Any) -> 'Interval':
+        return _as_interval(other) / self
+
+
+def _as_interval(value: Any) -> Interval:
+    if isinstance(value, Interval):
+        return value
+    if isinstance(value, (tuple, list)):
+        return Interval(float(value[0]), float(value[1]))
+    return Interval.point(float(value))
+
+
+# math's functions are accurate to within an ulp or two; their results are
+# widened by this many ulps on each side.
+_FUNCTION_ULPS = 4
+
+
+def _monotonic(function: Callable[[float], float], domain: Tuple[float, float] = (-math.inf, math.inf),
+               floor: float = -math.inf, increasing: bool = True) -> Callable[[Interval], Interval]:
+    # For a function monotonic on domain whose values are never below floor.
+    def call(x: Interval) -> Interval:
+        if x.low < domain[0] or x.high > domain[1]:
+            raise ValueError("math domain error")
+        low, high = function(x.low), function(x.high)
+        if not increasing:
+            low, high = high, low
+        low, high = _outward(low, high, _FUNCTION_ULPS)
+        return Interval(max(low, floor), high)
+    return call
+
+
+def _sqrt_bounds(value: float) -> Tuple[float, float]:
+    # math.sqrt is correctly rounded, so squaring the result exactly tells
+    # which side of the true root it lies on.
+    root = math.sqrt(value)
+    if math.isinf(root):
+        return root, root
+    square = Fraction(root) ** 2
+    if square == value:
+        return root, root
+    if square > value:
+        return math.nextafter(root, -math.inf), root
+    return root, math.nextafter(root, math.inf)
+
+
+def _interval_sqrt(x: Interval) -> Interval:
+    if x.low < 0:
+        raise ValueError("math domain error")
+    return Interval(_sqrt_bounds(x.low)[0], _sqrt_bounds(x.high)[1])
+
+
+def _reaches(x: Interval, offset: float, period: float) -> bool:
+    # Whether offset + k*period lies in x for some integer k. Errs towards
+    # yes near the ends, which only makes the result wider.
+    slack = 1e-9 * max(1.0, abs(x.low), abs(x.high))
+    k = math.ceil((x.low - slack - offset) / period)
+    return offset + k * period <= x.high + slack
+
+
+def _periodic(function: Callable[[float], float], peak: float) -> Callable[[Interval], Interval]:
+    # sin and cos: 1 at peak + 2k*pi, -1 half a period later, monotonic in
+    # between.
+    def call(x: Interval) -> Interval:
+        if x.width >= 2 * math.pi or max(abs(x.low), abs(x.high)) > 2 ** 50:
+            return Interval(-1.0, 1.0)
+        a, b = function(x.low), function(x.high)
+        low, high = _outward(min(a, b), max(a, b), _FUNCTION_ULPS)
+        if _reaches(x, peak, 2 * math.pi):
+            high = 1.0
+        if _reaches(x, peak + math.pi, 2 * math.pi):
+            low = -1.0
+        return Interval(max(low, -1.0), min(high, 1.0))
+    return call
+
+
+def _interval_tan(x: Interval) -> Interval:
+    if x.width >= math.pi or _reaches(x, math.pi / 2, math.pi):
+        raise ValueError("tan is unbounded on the interval")
+    return Interval(*_outward(math.tan(x.low), math.tan(x.high), _FUNCTION_ULPS))
+
+
+INTERVAL_FUNCTION_MAP: Dict[str, Callable[[Interval], Interval]] = {
+    'sin': _periodic(math.sin, math.pi / 2),
+    'cos': _periodic(math.cos, 0.0),
+    'tan': _interval_tan,
+    'asin': _monotonic(math.asin, (-1.0, 1.0)),
+    'acos': _monotonic(math.acos, (-1.0, 1.0), floor=0.0, increasing=False),
+    'atan': _monotonic(math.atan),
+    'sqrt': _interval_sqrt,
+    'log': _monotonic(math.log10, (0.0, math.inf)),
+    'ln': _monotonic(math.log, (0.0, math.inf)),
+    'exp': _monotonic(math.exp, floor=0.0),
+}
+
+
+@dataclass(frozen=True)
+class IntervalBackend:
+    # Guaranteed bounds: the result contains the exact value of the
+    # expression for every choice of inputs within their intervals. Inputs
+    # may be Interval instances, (low, high) pairs or numbers; decimal
+    # literals such as 0.1 and the constants pi and e, which floats cannot
+    # hold exactly, become the two floats either side of them.
+    real_results = False
+    name = 'interval'
+    functions = INTERVAL_FUNCTION_MAP
+
+    def number(self, value: Any) -> Interval:
+        if isinstance(value, str):
+            # The source text of a literal: a point when the float is exact,
+            # and widened otherwise, however many digits the text has.
+            approx = float(value)
+            if not math.isfinite(approx):
+                return _as_interval(approx)
+            if Fraction(value) == approx:
+                return Interval.point(approx)
+            return Interval(*_outward(approx, approx))
+        if isinstance(value, float) and math.isfinite(value):
+            # A literal is exact when its shortest repr is the float itself;
+            # pi and e never are.
+            if value not in (math.pi, math.e) and Fraction(repr(value)) == value:
+                return Interval.point(value)
+            return Interval(*_outward(value, value))
+        return _as_interval(value)
+
+    def factorial(self, value: Interval) -> Interval:
+        # Only the integers in the interval have a factorial.
+        first, last = math.ceil(value.low), math.floor(value.high)
+        if first > last or first < 0:
+            raise ValueError("Factorial requires non-negative integers")
+        low = _rounded(Fraction(math.factorial(_check_factorial(first, _FLOAT_DIGITS))),
+                       float(math.factorial(first)))[0]
+        high = _rounded(Fraction(math.factorial(_check_factorial(last, _FLOAT_DIGITS))),
+                        float(math.factorial(last)))[1]
+        return Interval(low, high)
+
+    def power(self, base: Interval, exponent: Interval) -> Interval:
+        if exponent.low == exponent.high and exponent.low.is_integer():
+            n = int(exponent.low)
+            if n < 0:
+                return Interval.point(1.0) / self._integer_power(base, -n)
+            return self._integer_power(base, n)
+        if base.low < 0:
+            raise ValueError("Negative base requires an integer exponent")
+        # x^y is monotonic in each argument for x >= 0, so the extremes are
+        # at the corners.
+        corners = [self._corner(b, e) for b in (base.low, base.high) for e in (exponent.low, exponent.high)]
+        return Interval(max(0.0, min(low for low, _ in corners)), max(high for _, high in corners))
+
+    def _integer_power(self, base: Interval, n: int) -> Interval:
+        if n == 0:
+            return Interval.point(1.0)
+        magnitude = max(abs(base.low), abs(base.high))
+        if magnitude > 1 and n * math.log10(magnitude) > _FLOAT_DIGITS:
+            raise OverflowError(f"Result too large: about 10^{n * math.log10(magnitude):.0f}")
+        low, high = self._power_bounds(base.low, n), self._power_bounds(base.high, n)
+        if n % 2:
+            return Interval(low[0], high[1])
+        if base.low >= 0:
+            return Interval(low[0], high[1])
+        if base.high <= 0:
+            return Interval(high[0], low[1])
+        return Interval(0.0, max(low[1], high[1]))
+
+    @staticmethod
+    def _corner(base: float, exponent: float) -> Tuple[float, float]:
+        value = base ** exponent
+        return _outward(value, value, _FUNCTION_ULPS)
+
+    @staticmethod
+    def _power_bounds(value: float, n: int) -> Tuple[float, float]:
+        approximate = value ** n
+        if n <= 64:
+            return _rounded(Fraction(value) ** n, approximate)
+        return _outward(approximate, approximate, _FUNCTION_ULPS)
+
+    def context(self):
+        return nullcontext()
+
+
+BACKENDS = {
+    'decimal': DecimalBackend,
+    'fraction': FractionBackend,
+    'complex': ComplexBackend,
+    'interval': IntervalBackend,
+}
@@ -0,0 +1,118 @@
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from calculator import CalculatorEngine, CalculationError
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class BulkResult(NamedTuple):
+    expression: str
+    value: Optional[float]
+    error: Optional[CalculationError]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# One engine per worker process, so each worker keeps its own warm
+# compiled-expression cache across the chunks it is handed.
+_worker_engine: Optional[CalculatorEngine] = None
+
+
+def evaluate_chunk(expressions: List[str]) -> List[BulkResult]:
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = CalculatorEngine()
+    results = []
+    for expression in expressions:
+        try:
+            value = _worker_engine.compile(expression).evaluate()
+        except CalculationError as e:
+            results.append(BulkResult(expression, None, e))
+        else:
+            results.append(BulkResult(expression, value, None))
+    return results
+
+
+def read_expressions(lines: Iterable[str]) -> Iterator[str]:
+    # One expression per line; blank lines are skipped.
+    for line in lines:
+        expression = line.strip()
+        if expression:
+            yield expression
+
+
+def _chunks(expressions: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    iterator = iter(expressions)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_bulk(expressions: Iterable[str], workers: Optional[int] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  executor: Optional[Executor] = None) -> Iterator[BulkResult]:
+    # Arguments are checked here, when called; the work happens in a generator.
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive")
+    workers = workers or os.cpu_count() or 1
+    return _evaluate_chunks(_chunks(expressions, chunk_size), workers, executor)
+
+
+def _evaluate_chunks(chunks: Iterator[List[str]], workers: int,
+                     executor: Optional[Executor]) -> Iterator[BulkResult]:
+    if workers == 1 and executor is None:
+        for chunk in chunks:
+            yield from evaluate_chunk(chunk)
+        return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # Only a bounded number of chunks is in flight, so the input can be an
+        # arbitrarily long stream; results are yielded in submission order.
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(evaluate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate expressions in bulk on all cores.")
+    parser.add_argument('input', nargs='?', type=argparse.FileType('r', encoding='utf-8'),
+                        default=sys.stdin, help="file with one expression per line (default: stdin)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('-c', '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="expressions sent to a worker at a time")
+    args = parser.parse_args(argv)
+
+    expressions = read_expressions(args.input)
+    errors = 0
+    for result in evaluate_bulk(expressions, args.workers, args.chunk_size):
+        if result.ok:
+            print(f"{result.expression}\t{result.value}")
+        else:
+            errors += 1
+            print(f"{result.expression}\tError: {result.error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
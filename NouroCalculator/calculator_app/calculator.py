@@ -1,15 +1,58 @@
 import math
 import re
-from collections import deque
-from typing import List, Tuple, Optional
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import (Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Mapping, NamedTuple,
+                    Optional, Set, Tuple)
+
+from backends import BACKENDS
+from history_store import HistoryStore
+from metrics import EngineMetrics
+
+# NumPy is optional and only used for batch evaluation. Importing it takes
+# longer than everything else the calculator loads, so that happens on the
+# first batch evaluation (see _load_numpy).
+np = None
+_numpy_loaded = False
 
 class CalculatorEngine:
     MAX_HISTORY = 10
     
-    def __init__(self):
+    def __init__(self, cache_size: Optional[int] = None,
+                 limits: Optional['EvaluationLimits'] = None, metrics: bool = False,
+                 memo_size: int = 0, history_store: Optional[HistoryStore] = None,
+                 backend: Any = None):
         self.history: deque[Tuple[str, float]] = deque(maxlen=self.MAX_HISTORY)
+        # Optional unbounded on-disk history; the deque keeps the recent entries.
+        self.history_store = history_store
         self._current_expression = ""
         self._last_result = 0.0
+        self.limits = limits or DEFAULT_LIMITS
+        # Engines share the module-wide cache unless they have a cache size or
+        # limits of their own; constant folding depends on the limits in force.
+        if cache_size is None and limits is None:
+            self._cache = _shared_cache
+        else:
+            self._cache = ExpressionCache(SHARED_CACHE_SIZE if cache_size is None else cache_size)
+        self._compiler = partial(_compile, limits=self.limits)
+        self.metrics: Optional[EngineMetrics] = EngineMetrics() if metrics else None
+        # Function results are only memoized on request (memo_size > 0).
+        self.functions = memoized_functions(memo_size) if memo_size else FUNCTION_MAP
+        # None computes with floats; otherwise a backend instance such as
+        # DecimalBackend(precision=50), or the name of one ('decimal', 'fraction').
+        self.backend = BACKENDS[backend]() if isinstance(backend, str) else backend
+        # The on-disk history keeps every result as a double.
+        if history_store is not None and not getattr(self.backend, 'real_results', True):
+            raise CalculationError(f"The history store only holds real numbers; results of the "
+                                   f"'{self.backend.name}' backend cannot be stored")
+        # User-defined variables and functions; see define().
+        self.workspace = Workspace(self.limits, self.backend, self.functions)
 
     @property
     def current_expression(self) -> str:
@@ -21,11 +64,24 @@ class CalculatorEngine:
 
     def add_to_history(self, expression: str, result: float):
         self.history.append((expression, result))
+        if self.history_store is not None:
+            self.history_store.append(expression, result)
         self._last_result = result
 
     def get_history(self) -> List[Tuple[str, float]]:
         return list(self.history)[::-1]
 
+    def history_size(self) -> int:
+        if self.history_store is not None:
+            return len(self.history_store)
+        return len(self.history)
+
+    def history_entry(self, position: int) -> Tuple[str, float]:
+        # Position 0 is the most recent calculation, as in get_history().
+        if self.history_store is not None:
+            return self.history_store[-1 - position]
+        return self.history[-1 - position]
+
     def clear(self):
         self._current_expression = ""
 
@@ -36,128 +92,88 @@ class CalculatorEngine:
         if not self._current_expression:
             return 0.0
 
-        try:
-            expr = self._preprocess_expression(self._current_expression)
-            self._validate_expression(expr)
-            tokens = self._tokenize(expr)
-            result = self._calculate(tokens)
-        except (SyntaxError, ValueError, ArithmeticError) as e:
-            raise CalculationError(str(e))
-        
+        if self.metrics is None:
+            result = self._run(self.compile(self._current_expression))
+        else:
+            result = self._evaluate_instrumented(self._current_expression)
         self.add_to_history(self._current_expression, result)
         return result
 
-    def _preprocess_expression(self, expr: str) -> str:
-        expr = expr.replace('×', '*').replace('÷', '/')
-        expr = expr.replace('π', str(math.pi)).replace('e', str(math.e))
-        expr = re.sub(r'\s+', '', expr)
-        
-        expr = re.sub(r'(\d)([a-zπ(])', r'\1*\2', expr)
-        expr = re.sub(r'(\))(\d)', r'\1*\2', expr)
-        expr = re.sub(r'(\))([a-z(])', r'\1*\2', expr)
-        
-        return expr
-
-    def _validate_expression(self, expr: str):
-        if re.search(r'[^0-9a-z+\-*/^!().πe]', expr, re.I):
-            raise SyntaxError("Invalid characters in expression")
-        
-        stack = []
-        for char in expr:
-            if char == '(':
-                stack.append(char)
-            elif char == ')':
-                if not stack:
-                    raise SyntaxError("Unbalanced parentheses")
-                stack.pop()
-        if stack:
-            raise SyntaxError("Unbalanced parentheses")
+    def define(self, statement: str):
+        # "rate = 0.05" or "f(x) = x^(2)+1"; later expressions can use them.
+        self.workspace.define(statement)
 
-    def _tokenize(self, expr: str) -> List[str]:
-        tokens = []
-        current = ''
-        
-        for char in expr:
-            if char in '()^*/+-!':
-                if current:
-                    tokens.append(current)
-                    current = ''
-                tokens.append(char)
-            else:
-                current += char
-        if current:
-            tokens.append(current)
-            
-        return tokens
-
-    def _calculate(self, tokens: List[str]) -> float:
-        def parse_expression():
-            left = parse_term()
-            while tokens and tokens[0] in '+-':
-                op = tokens.pop(0)
-                right = parse_term()
-                left = left + right if op == '+' else left - right
-            return left
-
-        def parse_term():
-            left = parse_factor()
-            while tokens and tokens[0] in '*/':
-                op = tokens.pop(0)
-                right = parse_factor()
-                left = left * right if op == '*' else left / right
-            return left
-
-        def parse_factor():
-            if tokens[0] == '(':
-                tokens.pop(0)
-                result = parse_expression()
-                if tokens and tokens[0] == ')':
-                    tokens.pop(0)
-                return result
-            elif tokens[0] == '-':
-                tokens.pop(0)
-                return -parse_factor()
-            else:
-                return parse_function()
-
-        def parse_function():
-            token = tokens.pop(0)
-            if token == '^':
-                base = parse_factor()
-                if tokens and tokens[0] == '(':
-                    tokens.pop(0)
-                    exponent = parse_expression()
-                    if tokens and tokens[0] == ')':
-                        tokens.pop(0)
-                    return base ** exponent
-                else:
-                    raise SyntaxError("Exponent requires parentheses")
-            
-            if token in FUNCTION_MAP:
-                if not tokens or tokens[0] != '(':
-                    raise SyntaxError(f"Function '{token}' requires parentheses")
-                tokens.pop(0)
-                arg = parse_expression()
-                if not tokens or tokens[0] != ')':
-                    raise SyntaxError(f"Missing closing parenthesis for '{token}'")
-                tokens.pop(0)
-                return FUNCTION_MAP[token](arg)
-            
-            if token.endswith('!'):
-                num = float(token[:-1])
-                if not num.is_integer() or num < 0:
-                    raise ValueError("Factorial requires non-negative integers")
-                return math.factorial(int(num))
-            
-            if token in CONSTANT_MAP:
-                return CONSTANT_MAP[token]
+    def enable_metrics(self, slowest: int = 10, slow_threshold: Optional[float] = None,
+                       on_slow: Optional[Callable[[str, float], None]] = None):
+        self.metrics = EngineMetrics(slowest, slow_threshold, on_slow)
+
+    def disable_metrics(self):
+        self.metrics = None
+
+    def memo_info(self) -> dict:
+        return {name: (function.hits, function.misses, function.hit_rate)
+                for name, function in self.functions.items()
+                if isinstance(function, MemoizedFunction)}
+
+    def stats(self) -> dict:
+        return self.metrics.snapshot() if self.metrics is not None else {}
+
+    def _evaluate_instrumented(self, expression: str) -> float:
+        metrics = self.metrics
+        missed = False
+        # Expressions that may use definitions are compiled and cached by the
+        # workspace, which allows calls to user functions.
+        workspace = bool(self.workspace)
+        cache = self.workspace._cache if workspace else self._cache
+
+        def compiler(text: str) -> 'CompiledExpression':
+            nonlocal missed
+            missed = True
+            return _compile(text, limits=self.limits, observe=metrics.observe,
+                            user_functions=workspace)
+
+        start = time.perf_counter()
+        try:
+            compiled = cache.get_or_compile(expression, compiler)
+            metrics.record_cache(not missed)
+            executed = time.perf_counter()
             try:
-                return float(token)
-            except ValueError:
-                raise SyntaxError(f"Invalid token: {token}")
+                result = self._run(compiled)
+            finally:
+                metrics.observe('execute', time.perf_counter() - executed)
+        except CalculationError as e:
+            metrics.record_evaluation(expression, time.perf_counter() - start, e)
+            raise
+        metrics.record_evaluation(expression, time.perf_counter() - start)
+        return result
+
+    def compile(self, expression: str) -> 'CompiledExpression':
+        if self.workspace:
+            return self.workspace.compile(expression)
+        return self._cache.get_or_compile(expression, self._compiler)
+
+    def _run(self, compiled: 'CompiledExpression') -> Any:
+        if self.workspace:
+            return self.workspace.evaluate_compiled(compiled)
+        return compiled.evaluate(limits=self.limits, functions=self.functions, backend=self.backend)
+
+    def cache_info(self) -> 'CacheInfo':
+        return self._cache.info()
+
+    def evaluate_batch(self, expression: str, columns: Optional[Mapping[str, Any]] = None, /,
+                       chunk_size: Optional[int] = None, out: Any = None, **values: Any) -> Any:
+        compiled = self.compile(expression)
+        functions = self.functions
+        if self.workspace:
+            # Defined variables are broadcast like scalar columns, which
+            # take precedence over them.
+            defined, functions = self.workspace.inputs(compiled)
+            columns = {**defined, **(columns or {})}
+        return compiled.evaluate_batch(columns, chunk_size=chunk_size, out=out, limits=self.limits,
+                                       functions=functions, backend=self.backend, **values)
 
-        tokens = tokens.copy()
-        return parse_expression()
+    def _calculate(self, tokens: Iterable['Token']) -> float:
+        return _execute(parse(tokens))
 
 FUNCTION_MAP = {
     'sin': math.sin,
@@ -177,5 +193,1305 @@ CONSTANT_MAP = {
     'e': math.e,
 }
 
+NUMPY_FUNCTION_MAP = {}
+
+
+def _load_numpy() -> Any:
+    # Returns the numpy module, or None when it is not installed.
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        try:
+            import numpy
+        except ImportError:
+            return None
+        NUMPY_FUNCTION_MAP.update({
+            'sin': numpy.sin,
+            'cos': numpy.cos,
+            'tan': numpy.tan,
+            'asin': numpy.arcsin,
+            'acos': numpy.arccos,
+            'atan': numpy.arctan,
+            'sqrt': numpy.sqrt,
+            'log': numpy.log10,
+            'ln': numpy.log,
+            'exp': numpy.exp,
+        })
+        np = numpy
+    return np
+
 class CalculationError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+# A compiled expression is a flat postfix program: each instruction is an
+# (opcode, argument) pair run against a value stack by _execute().
+Instruction = Tuple[str, Any]
+
+OP_NUM = 'num'
+OP_VAR = 'var'
+OP_NEG = 'neg'
+OP_ADD = 'add'
+OP_SUB = 'sub'
+OP_MUL = 'mul'
+OP_DIV = 'div'
+OP_POW = 'pow'
+OP_FACT = 'fact'
+OP_CALL = 'call'
+
+# Parser-only markers for open parentheses on the operator stack.
+PAREN = '('
+FUNC = 'func'
+
+BINARY_OPERATORS = {
+    '+': OP_ADD,
+    '-': OP_SUB,
+    '*': OP_MUL,
+    '/': OP_DIV,
+    '^': OP_POW,
+}
+
+PRECEDENCE = {
+    OP_ADD: 1,
+    OP_SUB: 1,
+    OP_MUL: 2,
+    OP_DIV: 2,
+    OP_NEG: 3,
+    OP_POW: 4,
+}
+
+RIGHT_ASSOCIATIVE = {OP_POW}
+
+
+TOKEN_NUMBER = 'number'
+TOKEN_NAME = 'name'
+TOKEN_OPERATOR = 'operator'
+TOKEN_PAREN = 'paren'
+
+
+class Token(NamedTuple):
+    kind: str
+    value: Any
+    offset: int
+
+
+_KINDS = (TOKEN_NUMBER, TOKEN_NAME, TOKEN_OPERATOR, TOKEN_PAREN)
+_KIND_CODES = {kind: code for code, kind in enumerate(_KINDS)}
+
+
+class TokenList:
+    # Tokens stored column-wise: one byte for the kind, packed float values
+    # and offsets, and a shared string for every non-number. That is about
+    # 21 bytes per token against over 100 for a list of Token tuples, and
+    # appending allocates nothing per token. Indexing and iteration still
+    # produce Token tuples; rows() yields plain triples for the parser.
+    __slots__ = ('_kinds', '_numbers', '_texts', '_offsets')
+
+    def __init__(self, tokens: Iterable[Token] = ()):
+        self._kinds = bytearray()
+        self._numbers = array('d')
+        self._texts: List[Optional[str]] = []
+        self._offsets = array('I')
+        for token in tokens:
+            self.append(*token)
+
+    def append(self, kind: str, value: Any, offset: int):
+        self._kinds.append(_KIND_CODES[kind])
+        if kind == TOKEN_NUMBER:
+            self._numbers.append(value)
+            self._texts.append(None)
+        else:
+            self._numbers.append(0.0)
+            self._texts.append(value)
+        self._offsets.append(offset)
+
+    def rows(self) -> Iterator[Tuple[str, Any, int]]:
+        kinds = _KINDS
+        for code, number, text, offset in zip(self._kinds, self._numbers, self._texts, self._offsets):
+            yield kinds[code], number if text is None else text, offset
+
+    def copy(self) -> 'TokenList':
+        copied = TokenList()
+        copied._kinds = self._kinds[:]
+        copied._numbers = self._numbers[:]
+        copied._texts = self._texts[:]
+        copied._offsets = self._offsets[:]
+        return copied
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def __getitem__(self, index: int) -> Token:
+        text = self._texts[index]
+        return Token(_KINDS[self._kinds[index]],
+                     self._numbers[index] if text is None else text, self._offsets[index])
+
+    def __delitem__(self, index: slice):
+        del self._kinds[index], self._numbers[index], self._texts[index], self._offsets[index]
+
+    def __iter__(self) -> Iterator[Token]:
+        return map(Token._make, self.rows())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (TokenList, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"TokenList({list(self)!r})"
+
+
+_TOKEN_PATTERN = re.compile(r"""
+      (?P<space>\s+)
+    | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<name>[A-Za-z_][A-Za-z0-9_]*|π)
+    | (?P<operator>[-+*/^!×÷])
+    | (?P<paren>[()])
+""", re.VERBOSE)
+
+_ALIASES = {'×': '*', '÷': '/', 'π': 'pi'}
+
+
+def tokenize(expression: str) -> TokenList:
+    # Single scan: normalises ×, ÷ and π, checks characters and parenthesis
+    # balance, and inserts the '*' of implicit multiplication (2pi, 3(4), (1)(2)).
+    tokens = TokenList()
+    if _scan(expression, 0, tokens, 0):
+        raise SyntaxError("Unbalanced parentheses")
+    return tokens
+
+
+def _scan(expression: str, position: int, tokens: TokenList, depth: int,
+          ends: Optional[array] = None, depths: Optional[array] = None) -> int:
+    # Appends to tokens from position onwards and returns the final nesting
+    # depth. When ends/depths are given, the end offset and depth after every
+    # token are recorded too, so a later scan can resume mid-expression.
+    # The columns of the TokenList are appended to directly; this loop is
+    # the hot path of every cache miss.
+    kinds = tokens._kinds.append
+    numbers = tokens._numbers.append
+    texts = tokens._texts.append
+    offsets = tokens._offsets.append
+    codes = _KIND_CODES
+    match = _TOKEN_PATTERN.match
+    length = len(expression)
+    record = ends is not None
+    if tokens:
+        last_kind, last_value, _ = tokens[-1]
+        ends_operand = last_kind == TOKEN_NUMBER or last_kind == TOKEN_NAME or last_value in (')', '!')
+    else:
+        ends_operand = False
+
+    while position < length:
+        found = match(expression, position)
+        if found is None:
+            raise SyntaxError(f"Invalid character '{expression[position]}' at position {position}")
+        kind = found.lastgroup
+        offset = position
+        position = found.end()
+        if kind == 'space':
+            continue
+
+        text = found.group()
+        if kind == TOKEN_NUMBER:
+            if position < length and expression[position] == '.':
+                raise SyntaxError(f"Invalid number at position {offset}")
+            value = float(text)
+        else:
+            value = _ALIASES.get(text, text)
+            if kind == TOKEN_NAME:
+                # Every 'x' in a long expression shares one string.
+                value = sys.intern(value)
+            elif value == '(':
+                depth += 1
+            elif value == ')':
+                depth -= 1
+                if depth < 0:
+                    raise SyntaxError(f"Unbalanced parentheses at position {offset}")
+
+        if ends_operand and (kind == TOKEN_NUMBER or kind == TOKEN_NAME or value == '('):
+            # A name directly followed by '(' is a call, unless it is a constant.
+            if not (value == '(' and last_kind == TOKEN_NAME
+                    and last_value not in CONSTANT_MAP):
+                kinds(codes[TOKEN_OPERATOR])
+                numbers(0.0)
+                texts('*')
+                offsets(offset)
+                if record:
+                    ends.append(offset)
+                    depths.append(depth - (value == '('))
+        kinds(codes[kind])
+        if kind == TOKEN_NUMBER:
+            numbers(value)
+            texts(None)
+        else:
+            numbers(0.0)
+            texts(value)
+        offsets(offset)
+        last_kind = kind
+        last_value = value
+        if record:
+            ends.append(position)
+            depths.append(depth)
+        ends_operand = kind == TOKEN_NUMBER or kind == TOKEN_NAME or value == ')' or value == '!'
+
+    return depth
+
+
+class IncrementalTokenizer:
+    # Keeps the tokens of the last expression it saw. On update, tokens lying
+    # entirely inside the unchanged prefix are reused and only the tail is
+    # scanned again, which keeps per-keystroke cost independent of length.
+    def __init__(self):
+        self.text = ""
+        self.tokens = TokenList()
+        self.rescanned = 0
+        self._ends = array('I')
+        self._depths = array('I')
+
+    def update(self, expression: str) -> TokenList:
+        prefix = 0
+        limit = min(len(expression), len(self.text))
+        while prefix < limit and expression[prefix] == self.text[prefix]:
+            prefix += 1
+
+        # A token ending at the prefix may still grow ("12" -> "123"), and a
+        # number can absorb an exponent already lexed as a name ("2e" ->
+        # "2e+5"), so tokens ending within two characters of it are rescanned.
+        keep = bisect_left(self._ends, prefix - 2)
+        if keep < len(self.tokens):
+            boundary = self.tokens[keep].offset
+            while keep and self.tokens[keep - 1].offset >= boundary:
+                keep -= 1
+        del self.tokens[keep:], self._ends[keep:], self._depths[keep:]
+
+        self.text = expression
+        position = self._ends[-1] if keep else 0
+        depth = self._depths[-1] if keep else 0
+        self.rescanned = len(expression) - position
+        depth = _scan(expression, position, self.tokens, depth, self._ends, self._depths)
+        if depth:
+            raise SyntaxError("Unbalanced parentheses")
+        return self.tokens
+
+
+def parse(tokens: Iterable[Token], user_functions: bool = False) -> Tuple[Instruction, ...]:
+    # Shunting-yard over a single pass of the token list: operators wait on
+    # an explicit stack instead of the Python call stack, so parsing is
+    # linear in the number of tokens and nesting depth is unbounded. With
+    # user_functions, any other name directly followed by '(' is a call to
+    # a function supplied at evaluation time.
+    program: List[Instruction] = []
+    emit = program.append
+    operators: List[Tuple[str, Any]] = []
+    expect_operand = True
+    function = None
+
+    rows = tokens.rows() if isinstance(tokens, TokenList) else tokens
+    for kind, value, offset in rows:
+        if function is not None:
+            if value != '(':
+                raise SyntaxError(f"Function '{function}' requires parentheses")
+            operators.append((FUNC, function))
+            function = None
+            continue
+
+        if expect_operand:
+            if kind == TOKEN_NUMBER:
+                emit((OP_NUM, value))
+                expect_operand = False
+            elif kind == TOKEN_NAME:
+                if value in FUNCTION_MAP:
+                    function = value
+                elif value in CONSTANT_MAP:
+                    emit((OP_NUM, CONSTANT_MAP[value]))
+                    expect_operand = False
+                else:
+                    emit((OP_VAR, value))
+                    expect_operand = False
+            elif value == '(':
+                operators.append((PAREN, None))
+            elif value == '-':
+                operators.append((OP_NEG, None))
+            else:
+                raise SyntaxError(f"Unexpected '{value}' at position {offset}")
+            continue
+
+        if kind == TOKEN_OPERATOR and value in BINARY_OPERATORS:
+            op = BINARY_OPERATORS[value]
+            precedence = PRECEDENCE[op]
+            while operators:
+                top = operators[-1][0]
+                top_precedence = PRECEDENCE.get(top)
+                if top_precedence is None:
+                    break
+                if top_precedence > precedence or (
+                        top_precedence == precedence and op not in RIGHT_ASSOCIATIVE):
+                    emit(operators.pop())
+                else:
+                    break
+            operators.append((op, None))
+            expect_operand = True
+        elif value == '!':
+            emit((OP_FACT, None))
+        elif value == '(' and program[-1][0] == OP_VAR:
+            if not user_functions:
+                raise SyntaxError(f"Unknown function '{program[-1][1]}'")
+            operators.append((FUNC, program.pop()[1]))
+            expect_operand = True
+        elif value == ')':
+            while operators and operators[-1][0] not in (PAREN, FUNC):
+                emit(operators.pop())
+            if not operators:
+                raise SyntaxError("Unbalanced parentheses")
+            top, name = operators.pop()
+            if top == FUNC:
+                emit((OP_CALL, name))
+        else:
+            raise SyntaxError(f"Unexpected '{value}' at position {offset}")
+
+    if function is not None:
+        raise SyntaxError(f"Function '{function}' requires parentheses")
+    if expect_operand:
+        raise SyntaxError("Unexpected end of expression")
+    while operators:
+        top, name = operators.pop()
+        if top == FUNC:
+            raise SyntaxError(f"Missing closing parenthesis for '{name}'")
+        if top == PAREN:
+            raise SyntaxError("Unbalanced parentheses")
+        emit((top, name))
+    return tuple(program)
+
+
+def _execute(program: Tuple[Instruction, ...], variables: Optional[Mapping[str, Any]] = None,
+             functions: Mapping[str, Callable] = FUNCTION_MAP,
+             factorial: Optional[Callable] = None, power: Optional[Callable] = None) -> Any:
+    # The same loop serves scalar floats and NumPy arrays; only the function
+    # table and the factorial and power implementations differ between the two.
+    factorial = factorial or DEFAULT_LIMITS.factorial
+    power = power or DEFAULT_LIMITS.power
+    stack: List[Any] = []
+    push = stack.append
+    pop = stack.pop
+    for op, arg in program:
+        if op == OP_NUM:
+            push(arg)
+        elif op == OP_VAR:
+            push(variables[arg])
+        elif op == OP_ADD:
+            right = pop()
+            stack[-1] = stack[-1] + right
+        elif op == OP_SUB:
+            right = pop()
+            stack[-1] = stack[-1] - right
+        elif op == OP_MUL:
+            right = pop()
+            stack[-1] = stack[-1] * right
+        elif op == OP_DIV:
+            right = pop()
+            stack[-1] = stack[-1] / right
+        elif op == OP_POW:
+            right = pop()
+            stack[-1] = power(stack[-1], right)
+        elif op == OP_NEG:
+            stack[-1] = -stack[-1]
+        elif op == OP_CALL:
+            stack[-1] = functions[arg](stack[-1])
+        elif op == OP_FACT:
+            stack[-1] = factorial(stack[-1])
+        else:
+            raise SyntaxError(f"Unknown opcode: {op}")
+    return stack.pop()
+
+
+# Generated code nests at most this deep; deeper operands are assigned to
+# temporaries first, which keeps long expressions within the limits of the
+# Python compiler.
+_MAX_NESTING = 32
+
+_NATIVE_OPERATORS = {OP_ADD: '+', OP_SUB: '-', OP_MUL: '*', OP_DIV: '/'}
+
+
+class _NativeCode(NamedTuple):
+    source: str
+    factory: Callable[..., Callable]
+    functions: Tuple[str, ...]
+    constants: Tuple[Any, ...]
+
+    def bind(self, functions: Mapping[str, Callable], factorial: Callable,
+             power: Callable) -> Callable:
+        return self.factory(power, factorial, *[functions[name] for name in self.functions],
+                            *self.constants)
+
+
+def _generate(program: Tuple[Instruction, ...], variables: Tuple[str, ...]) -> _NativeCode:
+    # Translates a program into a Python function with one parameter per
+    # variable, in the order of `variables`. Only generated names (v0, _f0,
+    # t0, ...) and float reprs appear in the source, never text from the
+    # expression; functions, factorial, power and non-finite constants are
+    # bound when the factory is called and become default arguments, so the
+    # generated code reads nothing but locals.
+    parameters = {name: f"v{index}" for index, name in enumerate(variables)}
+    functions: Dict[str, str] = {}
+    constants: List[Any] = []
+    lines: List[str] = []
+    stack: List[Tuple[str, int]] = []
+
+    def spill():
+        # Operands lower on the stack come first in postfix order, so they
+        # are assigned first as well and errors surface in the same order.
+        for index, (text, depth) in enumerate(stack):
+            if depth:
+                name = f"t{len(lines)}"
+                lines.append(f"{name} = {text}")
+                stack[index] = (name, 0)
+
+    for op, arg in program:
+        if op == OP_NUM:
+            if type(arg) is float and math.isfinite(arg):
+                text = repr(arg)
+                stack.append((f"({text})" if text.startswith('-') else text, 0))
+            else:
+                stack.append((f"_c{len(constants)}", 0))
+                constants.append(arg)
+        elif op == OP_VAR:
+            stack.append((parameters[arg], 0))
+        elif op in _NATIVE_OPERATORS or op == OP_POW:
+            right, right_depth = stack.pop()
+            left, left_depth = stack.pop()
+            depth = max(left_depth, right_depth) + 1
+            if op == OP_POW:
+                stack.append((f"_power({left}, {right})", depth))
+            else:
+                stack.append((f"({left} {_NATIVE_OPERATORS[op]} {right})", depth))
+        elif op == OP_NEG:
+            operand, depth = stack.pop()
+            stack.append((f"(-{operand})", depth + 1))
+        elif op == OP_CALL:
+            operand, depth = stack.pop()
+            name = functions.setdefault(arg, f"_f{len(functions)}")
+            stack.append((f"{name}({operand})", depth + 1))
+        elif op == OP_FACT:
+            operand, depth = stack.pop()
+            stack.append((f"_factorial({operand})", depth + 1))
+        else:
+            raise SyntaxError(f"Unknown opcode: {op}")
+        if stack[-1][1] > _MAX_NESTING:
+            spill()
+    if len(stack) != 1:
+        raise SyntaxError("Invalid program")
+
+    bound = ['_power', '_factorial', *functions.values(), *(f"_c{i}" for i in range(len(constants)))]
+    signature = ", ".join([*parameters.values(), *(f"{name}={name}" for name in bound)])
+    source = "\n".join([f"def _bind({', '.join(bound)}):",
+                        f"    def native({signature}):",
+                        *(f"        {line}" for line in lines),
+                        f"        return {stack[0][0]}",
+                        "    return native"])
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, '<native>', 'exec'), {'__builtins__': {}}, namespace)
+    return _NativeCode(source, namespace['_bind'], tuple(functions), tuple(constants))
+
+
+_LOG10_FLOAT_MAX = math.log10(sys.float_info.max)
+
+# Every factorial that fits in a float (up to 170!), so n! is a lookup.
+_FACTORIALS = tuple(float(math.factorial(n)) for n in range(171))
+
+
+@dataclass(frozen=True)
+class EvaluationLimits:
+    # Factorials and powers are checked against these bounds before they are
+    # computed, using log-magnitude estimates that take constant time however
+    # large the operands are. Results beyond them either raise or become inf.
+    max_factorial: int = 170
+    max_power_digits: float = _LOG10_FLOAT_MAX
+    overflow: str = 'raise'
+
+    def __post_init__(self):
+        if self.overflow not in ('raise', 'inf'):
+            raise ValueError("overflow must be 'raise' or 'inf'")
+
+    def factorial(self, value: float) -> float:
+        if not float(value).is_integer() or value < 0:
+            raise ValueError("Factorial requires non-negative integers")
+        if value > self.max_factorial:
+            digits = math.lgamma(value + 1) / math.log(10)
+            return self._overflow(f"{value:g}! is about 10^{digits:.0f}")
+        if value < len(_FACTORIALS):
+            return _FACTORIALS[int(value)]
+        return float(math.factorial(int(value)))
+
+    def power(self, base: float, exponent: float) -> float:
+        if base < 0 and not float(exponent).is_integer():
+            raise ValueError("Negative base requires an integer exponent")
+        # An infinite exponent overflows too, unless the base is 1 or -1
+        # (digits is NaN) or it shrinks the result (digits is -inf).
+        if base and math.isfinite(base) and not math.isnan(exponent):
+            digits = exponent * math.log10(abs(base))
+            if digits > self.max_power_digits:
+                return self._overflow(f"{base:g}^{exponent:g} is about 10^{digits:.0f}")
+        return base ** exponent
+
+    def _overflow(self, description: str) -> float:
+        if self.overflow == 'inf':
+            return math.inf
+        raise OverflowError(f"Result too large: {description}")
+
+
+DEFAULT_LIMITS = EvaluationLimits()
+
+
+_NOT_CONSTANT = object()
+
+_IDENTITIES = {
+    # opcode: (left operand that can be dropped, right operand that can be dropped)
+    OP_ADD: (0.0, 0.0),
+    OP_SUB: (None, 0.0),
+    OP_MUL: (1.0, 1.0),
+    OP_DIV: (None, 1.0),
+    OP_POW: (None, 1.0),
+}
+
+
+def _fold(instructions: Tuple[Instruction, ...], limits: 'EvaluationLimits') -> Any:
+    try:
+        value = _execute(instructions, None, FUNCTION_MAP, limits.factorial, limits.power)
+    except (ValueError, ArithmeticError, TypeError):
+        # Leave it to evaluation time, where the error is reported as usual.
+        return _NOT_CONSTANT
+    return value if isinstance(value, float) else _NOT_CONSTANT
+
+
+def optimize(program: Tuple[Instruction, ...],
+             limits: Optional['EvaluationLimits'] = None) -> Tuple[Instruction, ...]:
+    # Postfix operands always sit at the end of the output, left before right,
+    # so each stack entry only records where its code starts and, for
+    # constants (always a single 'num' instruction), its value.
+    limits = limits or DEFAULT_LIMITS
+    output: List[Instruction] = []
+    stack: List[Tuple[int, Any]] = []
+    for instruction in program:
+        op = instruction[0]
+        if op == OP_NUM:
+            stack.append((len(output), instruction[1]))
+            output.append(instruction)
+        elif op == OP_VAR:
+            stack.append((len(output), _NOT_CONSTANT))
+            output.append(instruction)
+        elif op in (OP_NEG, OP_CALL, OP_FACT):
+            start, value = stack.pop()
+            # User-defined functions can change, so calls to them never fold.
+            if value is not _NOT_CONSTANT and (op != OP_CALL or instruction[1] in FUNCTION_MAP):
+                value = _fold((output[start], instruction), limits)
+                if value is not _NOT_CONSTANT:
+                    output[start] = (OP_NUM, value)
+                    stack.append((start, value))
+                    continue
+            if op == OP_NEG and output[-1][0] == OP_NEG:
+                output.pop()
+            else:
+                output.append(instruction)
+            stack.append((start, _NOT_CONSTANT))
+        else:
+            right_start, right = stack.pop()
+            left_start, left = stack.pop()
+            if left is not _NOT_CONSTANT and right is not _NOT_CONSTANT:
+                value = _fold((output[left_start], output[right_start], instruction), limits)
+                if value is not _NOT_CONSTANT:
+                    del output[left_start:]
+                    output.append((OP_NUM, value))
+                    stack.append((left_start, value))
+                    continue
+            drop_left, drop_right = _IDENTITIES.get(op, (None, None))
+            if drop_right is not None and right == drop_right:
+                del output[right_start:]
+            elif drop_left is not None and left == drop_left:
+                del output[left_start]
+            elif op == OP_SUB and left == 0.0:
+                del output[left_start]
+                if output[-1][0] == OP_NEG:
+                    output.pop()
+                else:
+                    output.append((OP_NEG, None))
+            else:
+                output.append(instruction)
+            stack.append((left_start, _NOT_CONSTANT))
+    return tuple(output)
+
+
+def _numpy_factorial(values: Any, limits: 'EvaluationLimits' = DEFAULT_LIMITS) -> Any:
+    def factorial(value: float) -> float:
+        try:
+            return limits.factorial(value)
+        except (ValueError, OverflowError):
+            return math.inf if value >= 0 and float(value).is_integer() else math.nan
+    return np.vectorize(factorial, otypes=[float])(values)
+
+
+def _numpy_power(base: Any, exponent: Any, limits: 'EvaluationLimits' = DEFAULT_LIMITS) -> Any:
+    result = np.power(base, exponent)
+    if limits.max_power_digits < _LOG10_FLOAT_MAX:
+        # Within the range of floats, so np.power does not overflow by
+        # itself; results beyond the limit become NaN and are checked again.
+        digits = exponent * np.log10(np.abs(base))
+        result = np.where(digits > limits.max_power_digits, math.nan, result)
+    return result
+
+
+@lru_cache(maxsize=1024)
+def _literal_texts(expression: str) -> Tuple[Optional[str], ...]:
+    # The text of every number in expression, in order, with None for the
+    # named constants, which the parser turns into numbers as well.
+    try:
+        tokens = tokenize(expression)
+    except SyntaxError:
+        return ()
+    texts: List[Optional[str]] = []
+    for kind, value, offset in tokens.rows():
+        if kind == TOKEN_NUMBER:
+            texts.append(_TOKEN_PATTERN.match(expression, offset).group())
+        elif kind == TOKEN_NAME and value in CONSTANT_MAP:
+            texts.append(None)
+    return tuple(texts)
+
+
+def _literal(value: Any, text: Optional[str]) -> Any:
+    # Expressions that did not come from the parser, such as derivatives,
+    # may not line up with their text; a literal that does not read back as
+    # the value in the program keeps the value.
+    if text is not None and float(text) == value:
+        return text
+    return value
+
+
+class MemoizedFunction:
+    # Bounded LRU memo for a pure one-argument function, keyed by the exact
+    # float argument. Zeros and NaN bypass the memo: -0.0 == 0.0 would share
+    # an entry, and NaN never compares equal to itself.
+    def __init__(self, function: Callable[[float], float], maxsize: int = 128):
+        self.function = function
+        self.maxsize = maxsize
+        self._cached = lru_cache(maxsize=maxsize)(function)
+
+    def __call__(self, value: float) -> float:
+        if value == 0 or value != value:
+            return self.function(value)
+        return self._cached(value)
+
+    @property
+    def hits(self) -> int:
+        return self._cached.cache_info().hits
+
+    @property
+    def misses(self) -> int:
+        return self._cached.cache_info().misses
+
+    @property
+    def hit_rate(self) -> float:
+        info = self._cached.cache_info()
+        total = info.hits + info.misses
+        return info.hits / total if total else 0.0
+
+    def clear(self):
+        self._cached.cache_clear()
+
+
+def memoized_functions(maxsize: int = 128) -> dict:
+    return {name: MemoizedFunction(function, maxsize) for name, function in FUNCTION_MAP.items()}
+
+
+# A compiled expression evaluated this many times with floats is translated
+# into a Python function (see _generate), which runs without the
+# per-instruction dispatch of _execute. 0 keeps every expression interpreted.
+NATIVE_THRESHOLD = 64
+
+
+class _NativeTier:
+    # The mutable part of a CompiledExpression. Threads may race on it
+    # harmlessly: the count is approximate, and at worst the same code is
+    # generated or bound twice.
+    __slots__ = ('count', 'code', 'binding')
+
+    def __init__(self):
+        self.count = 0
+        self.code: Optional[_NativeCode] = None
+        # (functions, limits, function) for the most recent binding.
+        self.binding: Optional[Tuple[Mapping[str, Callable], EvaluationLimits, Callable]] = None
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    source: str
+    program: Tuple[Instruction, ...]
+    variables: Tuple[str, ...] = ()
+    # The program before constant folding, which is done in floats; numeric
+    # backends run this one so they never inherit float rounding.
+    unfolded: Tuple[Instruction, ...] = ()
+    # The limits factorials and powers were folded under, if any were; other
+    # limits run the unfolded program so that they are checked as well.
+    folding_limits: Optional[EvaluationLimits] = None
+    _tier: _NativeTier = field(default_factory=_NativeTier, init=False, repr=False, compare=False)
+
+    BATCH_CHUNK_SIZE = 1 << 16
+
+    def evaluate(self, variables: Optional[Mapping[str, float]] = None, /,
+                 limits: Optional[EvaluationLimits] = None,
+                 functions: Optional[Mapping[str, Callable]] = None, backend: Any = None,
+                 **values: float) -> float:
+        # Variables may be given as a mapping, as keywords, or both.
+        if variables is not None:
+            values = {**variables, **values} if values else variables
+        if backend is not None:
+            self._check_variables(values)
+            return self._evaluate_with(backend, values, functions, limits)
+        limits = limits or DEFAULT_LIMITS
+        functions = functions or FUNCTION_MAP
+        program = self._program_for(limits)
+        binding = self._tier.binding
+        if program is not self.program:
+            native = None
+        elif binding is not None and binding[0] is functions and binding[1] is limits:
+            native = binding[2]
+        else:
+            native = self._tier_up(functions, limits)
+        if native is None:
+            self._check_variables(values)
+        else:
+            try:
+                arguments = [values[name] for name in self.variables]
+            except KeyError:
+                self._check_variables(values)
+                raise
+        try:
+            if native is not None:
+                return native(*arguments)
+            return _execute(program, values, functions, limits.factorial, limits.power)
+        except (SyntaxError, ValueError, ArithmeticError) as e:
+            raise CalculationError(str(e)) from e
+
+    def native(self, functions: Optional[Mapping[str, Callable]] = None,
+               limits: Optional[EvaluationLimits] = None) -> Callable[..., float]:
+        # The generated function for hot loops: it takes the values of
+        # self.variables positionally and skips the checks evaluate() does.
+        functions = functions or FUNCTION_MAP
+        limits = limits or DEFAULT_LIMITS
+        program = self._program_for(limits)
+        if program is not self.program:
+            return _generate(program, self.variables).bind(functions, limits.factorial, limits.power)
+        tier = self._tier
+        if tier.code is None:
+            tier.code = _generate(self.program, self.variables)
+        function = tier.code.bind(functions, limits.factorial, limits.power)
+        tier.binding = (functions, limits, function)
+        return function
+
+    def evaluate_batch(self, columns: Optional[Mapping[str, Any]] = None, /,
+                       chunk_size: Optional[int] = None, out: Any = None,
+                       limits: Optional[EvaluationLimits] = None,
+                       functions: Optional[Mapping[str, Callable]] = None, backend: Any = None,
+                       **values: Any) -> Any:
+        # Columns may be given as a mapping, which allows any variable name
+        # (including 'out' and 'chunk_size'), as keywords, or both. Rows that
+        # fail come back as NaN on either path. With a backend, every row is
+        # evaluated with its numbers and the results are a list of them.
+        # User-defined functions cannot be vectorized and also run row by row.
+        if columns is not None:
+            values = {**columns, **values}
+        columns = values
+        self._check_variables(columns)
+        chunk_size = chunk_size or self.BATCH_CHUNK_SIZE
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be positive")
+        limits = limits or DEFAULT_LIMITS
+        functions = functions or FUNCTION_MAP
+        if (backend is not None or not functions.keys() <= FUNCTION_MAP.keys()
+                or _load_numpy() is None):
+            return self._evaluate_rows(columns, out, limits, functions=functions, backend=backend)
+        return self._evaluate_arrays(columns, chunk_size, out, limits)
+
+    def dump(self) -> str:
+        lines = [f"# {self.source}"]
+        for index, (op, arg) in enumerate(self.program):
+            lines.append(f"{index:4d}  {op:<5} {'' if arg is None else arg}".rstrip())
+        return "\n".join(lines)
+
+    def _evaluate_with(self, backend: Any, values: Mapping[str, Any],
+                       functions: Optional[Mapping[str, Callable]],
+                       limits: Optional[EvaluationLimits] = None) -> Any:
+        if (getattr(backend, 'real_fast_path', False)
+                and all(type(value) in (int, float) for value in values.values())
+                and (not functions or functions.keys() <= FUNCTION_MAP.keys())):
+            # Real inputs usually give a real result: try the float program,
+            # with its native tier, before the backend's slower numbers.
+            try:
+                return self.evaluate(values, limits=limits, functions=functions)
+            except CalculationError:
+                pass
+        # Literals are converted on every call, inside the backend's context,
+        # so the same compiled program serves any backend and precision.
+        number = backend.number
+        # Only user-defined functions are taken from the table passed in; the
+        # built-in ones come from the backend.
+        table = backend.functions
+        if functions:
+            table = {**table, **{name: function for name, function in functions.items()
+                                 if name not in FUNCTION_MAP}}
+        program = self.unfolded or self.program
+        # Literals are converted from their source text where it is known, so
+        # exact backends keep digits beyond the 17 that survive a float.
+        texts = _literal_texts(self.source)
+        if len(texts) != sum(op == OP_NUM for op, _ in program):
+            texts = ()
+        texts = iter(texts)
+        try:
+            with backend.context():
+                program = [(op, number(_literal(arg, next(texts, None)))) if op == OP_NUM else (op, arg)
+                           for op, arg in program]
+                values = {name: number(value) for name, value in values.items()}
+                return _execute(program, values, table, backend.factorial, backend.power)
+        except (SyntaxError, ValueError, ArithmeticError) as e:
+            raise CalculationError(str(e)) from e
+
+    def _program_for(self, limits: EvaluationLimits) -> Tuple[Instruction, ...]:
+        folded = self.folding_limits
+        if folded is None or limits is folded or limits == folded:
+            return self.program
+        return self.unfolded
+
+    def _tier_up(self, functions: Mapping[str, Callable],
+                 limits: EvaluationLimits) -> Optional[Callable]:
+        tier = self._tier
+        tier.count += 1
+        if not NATIVE_THRESHOLD or tier.count < NATIVE_THRESHOLD:
+            return None
+        try:
+            return self.native(functions, limits)
+        except KeyError:
+            # A function the table does not have; the interpreter reports it.
+            return None
+
+    def _check_variables(self, variables: Mapping[str, Any]):
+        missing = [name for name in self.variables if name not in variables]
+        if missing:
+            raise CalculationError(f"Unknown variable '{missing[0]}'")
+
+    def _evaluate_arrays(self, columns: Mapping[str, Any], chunk_size: int, out: Any,
+                         limits: EvaluationLimits) -> Any:
+        arrays = {name: np.asarray(column, dtype=float) for name, column in columns.items()}
+        if any(array.ndim > 1 for array in arrays.values()):
+            raise ValueError("Batch columns must be one-dimensional")
+        size = np.broadcast_shapes(*(array.shape for array in arrays.values()), (1,))[0]
+        if out is None:
+            out = np.empty(size, dtype=float)
+        elif len(out) != size:
+            raise ValueError(f"Output has length {len(out)}, expected {size}")
+
+        program = self._program_for(limits)
+        factorial = partial(_numpy_factorial, limits=limits)
+        power = partial(_numpy_power, limits=limits)
+        # Columns may be memory-mapped; only one chunk of each is materialised
+        # at a time, together with the intermediate results for that chunk.
+        with np.errstate(all='ignore'):
+            for start in range(0, size, chunk_size):
+                stop = min(start + chunk_size, size)
+                chunk = {name: array if array.ndim == 0 or len(array) == 1 else array[start:stop]
+                         for name, array in arrays.items()}
+                out[start:stop] = _execute(program, chunk, NUMPY_FUNCTION_MAP, factorial, power)
+                # NumPy turns 1/0, overflowing powers and the like into inf
+                # where evaluate() raises. Non-finite rows are rare, so they
+                # are evaluated again one by one, as _evaluate_rows would.
+                failed = np.flatnonzero(~np.isfinite(out[start:stop]))
+                if len(failed):
+                    rows = {name: float(array.reshape(-1)[0]) if array.ndim == 0 or len(array) == 1
+                            else array[start:stop][failed].tolist() for name, array in arrays.items()}
+                    out[start + failed] = self._evaluate_rows(rows, None, limits, len(failed))
+        return out
+
+    def _evaluate_rows(self, columns: Mapping[str, Any], out: Any, limits: EvaluationLimits,
+                       size: Optional[int] = None, functions: Mapping[str, Callable] = FUNCTION_MAP,
+                       backend: Any = None) -> List[Any]:
+        # Anything with a length is a column, except 0-d arrays; numbers of
+        # any type (Decimal, Interval, ...) are broadcast.
+        sequences = {name: column for name, column in columns.items()
+                     if hasattr(column, '__len__') and getattr(column, 'ndim', 1)}
+        scalars = {name: column for name, column in columns.items() if name not in sequences}
+        lengths = {len(column) for column in sequences.values()}
+        if len(lengths) > 1:
+            raise ValueError("Batch columns must have the same length")
+        size = lengths.pop() if lengths else size or 1
+        results = out if out is not None else [0.0] * size
+        row = dict(scalars)
+        program = self._program_for(limits)
+        native = None
+        if backend is None and size >= NATIVE_THRESHOLD > 0:
+            native = self.native(functions, limits)
+        for index in range(size):
+            for name, column in sequences.items():
+                row[name] = column[index]
+            try:
+                if backend is not None:
+                    results[index] = self.evaluate(row, limits=limits, functions=functions,
+                                                   backend=backend)
+                elif native is not None:
+                    results[index] = float(native(*[row[name] for name in self.variables]))
+                else:
+                    results[index] = float(_execute(program, row, functions, limits.factorial,
+                                                    limits.power))
+            except (ValueError, ArithmeticError, CalculationError):
+                results[index] = math.nan
+        return results
+
+
+@dataclass(frozen=True)
+class CacheInfo:
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class ExpressionCache:
+    # Safe to share between threads: entries are immutable and the LRU
+    # bookkeeping happens under a lock. Compilation itself runs outside the
+    # lock, so a slow compile never blocks lookups of other expressions.
+    def __init__(self, maxsize: int = 256):
+        if maxsize < 0:
+            raise ValueError("Cache size must be non-negative")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CompiledExpression] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, expression: str) -> bool:
+        return expression in self._entries
+
+    def get_or_compile(self, expression: str,
+                       compiler: Callable[[str], CompiledExpression]) -> CompiledExpression:
+        with self._lock:
+            compiled = self._entries.get(expression)
+            if compiled is not None:
+                self.hits += 1
+                self._entries.move_to_end(expression)
+                return compiled
+            self.misses += 1
+
+        compiled = compiler(expression)
+        if self.maxsize:
+            with self._lock:
+                self._entries[expression] = compiled
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return compiled
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+SHARED_CACHE_SIZE = 1024
+
+_shared_cache = ExpressionCache(SHARED_CACHE_SIZE)
+
+
+def _timed(observe: Callable[[str, float], None], stage: str, function: Callable, *args) -> Any:
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def _compile(expression: str, tokens: Optional[Iterable[Token]] = None,
+             limits: Optional[EvaluationLimits] = None,
+             observe: Optional[Callable[[str, float], None]] = None,
+             user_functions: bool = False) -> CompiledExpression:
+    try:
+        if observe is None:
+            if tokens is None:
+                tokens = tokenize(expression)
+            unfolded = parse(tokens, user_functions)
+            program = optimize(unfolded, limits)
+        else:
+            if tokens is None:
+                tokens = _timed(observe, 'tokenize', tokenize, expression)
+            unfolded = _timed(observe, 'parse', parse, tokens, user_functions)
+            program = _timed(observe, 'optimize', optimize, unfolded, limits)
+    except (SyntaxError, ValueError, ArithmeticError) as e:
+        raise CalculationError(str(e)) from e
+    variables = tuple(dict.fromkeys(arg for op, arg in program if op == OP_VAR))
+    if len(unfolded) == len(program):
+        # Only kept when folding changed something.
+        return CompiledExpression(expression, program, variables)
+    guarded = sum(op in (OP_FACT, OP_POW) for op, _ in unfolded) \
+        != sum(op in (OP_FACT, OP_POW) for op, _ in program)
+    return CompiledExpression(expression, program, variables, unfolded,
+                              (limits or DEFAULT_LIMITS) if guarded else None)
+
+
+def compile_expression(expression: str) -> CompiledExpression:
+    return _shared_cache.get_or_compile(expression, _compile)
+
+
+def compile_tokens(expression: str, tokens: Iterable[Token],
+                   cache: Optional[ExpressionCache] = None) -> CompiledExpression:
+    # For callers that already hold the tokens of expression, such as an
+    # IncrementalTokenizer; the result is cached under the expression text,
+    # in the shared cache unless another one is given.
+    cache = _shared_cache if cache is None else cache
+    return cache.get_or_compile(expression, lambda text: _compile(text, tokens))
+
+
+def evaluate_expression(expression: str, limits: Optional[EvaluationLimits] = None,
+                        **variables: float) -> float:
+    # Stateless and reentrant: nothing is recorded, so it is safe to call from
+    # any number of threads. CalculatorEngine layers history on top of this.
+    return compile_expression(expression).evaluate(variables, limits)
+
+
+def shared_cache_info() -> CacheInfo:
+    return _shared_cache.info()
+
+
+_DEFINITION = re.compile(r"\s*([A-Za-z_][A-Za-z0-9_]*)\s*(?:\(\s*([A-Za-z_][A-Za-z0-9_]*)\s*\))?\s*=(.*)\Z", re.S)
+
+
+class _Definition(NamedTuple):
+    compiled: Optional[CompiledExpression]  # None for values given to Workspace.set
+    parameter: Optional[str]  # Only functions have one
+    variables: FrozenSet[str]
+    calls: FrozenSet[str]
+
+    @property
+    def depends(self) -> FrozenSet[str]:
+        return self.variables | self.calls
+
+
+def _references(compiled: CompiledExpression,
+                parameter: Optional[str] = None) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    variables = frozenset(compiled.variables) - {parameter}
+    calls = frozenset(arg for op, arg in compiled.program if op == OP_CALL and arg not in FUNCTION_MAP)
+    return variables, calls
+
+
+class Workspace:
+    # Named variables and one-argument functions on top of CONSTANT_MAP and
+    # FUNCTION_MAP, e.g. "rate = 0.05" or "f(x) = x^(2)+1". Definitions form
+    # a dependency graph: a change marks everything that depends on it,
+    # directly or not, as dirty, and reading a value re-evaluates only the
+    # dirty definitions it needs, dependencies first.
+    def __init__(self, limits: Optional[EvaluationLimits] = None, backend: Any = None,
+                 functions: Optional[Mapping[str, Callable]] = None):
+        self.limits = limits or DEFAULT_LIMITS
+        self.backend = backend
+        # The built-in functions, e.g. an engine's memoized table.
+        self.functions = functions or FUNCTION_MAP
+        self.recomputed = 0
+        self._cache = ExpressionCache(SHARED_CACHE_SIZE)
+        self._compiler = partial(_compile, limits=self.limits, user_functions=True)
+        self._definitions: Dict[str, _Definition] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        self._dirty: Set[str] = set()
+        self._values: Dict[str, Any] = {}
+        self._functions: Dict[str, Callable] = {}
+        self._errors: Dict[str, CalculationError] = {}
+
+    def __len__(self) -> int:
+        return len(self._definitions)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._definitions
+
+    def __getitem__(self, name: str) -> Any:
+        definition = self._definitions.get(name)
+        if definition is None or definition.parameter is not None:
+            raise KeyError(name)
+        self._refresh((name,))
+        if name in self._errors:
+            raise self._errors[name]
+        return self._values[name]
+
+    def names(self) -> List[str]:
+        return list(self._definitions)
+
+    def values(self) -> Dict[str, Any]:
+        # Every variable that currently evaluates without an error.
+        self._refresh(self._definitions)
+        return {name: self._values[name] for name in self._definitions if name in self._values}
+
+    def define(self, statement: str):
+        found = _DEFINITION.match(statement)
+        if found is None:
+            raise CalculationError("Expected 'name = expression' or 'name(x) = expression'")
+        name, parameter, formula = found.groups()
+        if parameter is not None:
+            self._check_name(parameter)
+        compiled = self._cache.get_or_compile(formula.strip(), self._compiler)
+        self._replace(name, _Definition(compiled, parameter, *_references(compiled, parameter)))
+
+    def set(self, name: str, value: Any):
+        # For input cells: no formula to compile or re-evaluate.
+        self._replace(name, _Definition(None, None, frozenset(), frozenset()))
+        self._dirty.discard(name)
+        self._values[name] = value
+
+    def remove(self, name: str):
+        if name not in self._definitions:
+            raise KeyError(name)
+        self._invalidate(name)
+        self._unlink(name, self._definitions.pop(name))
+        self._dirty.discard(name)
+        self._forget(name)
+
+    def compile(self, expression: str) -> CompiledExpression:
+        return self._cache.get_or_compile(expression, self._compiler)
+
+    def evaluate(self, expression: str) -> Any:
+        return self.evaluate_compiled(self.compile(expression))
+
+    def evaluate_compiled(self, compiled: CompiledExpression) -> Any:
+        variables, calls = _references(compiled)
+        self._refresh(variables | calls)
+        return self._evaluate(compiled, variables, calls)
+
+    def inputs(self, compiled: CompiledExpression) -> Tuple[Dict[str, Any], Mapping[str, Callable]]:
+        # The current values of the variables compiled uses and the function
+        # table with the user functions it calls, e.g. for batch evaluation.
+        variables, calls = _references(compiled)
+        self._refresh(variables | calls)
+        return self._inputs(variables, calls)
+
+    def _check_name(self, name: str):
+        if name in FUNCTION_MAP or name in CONSTANT_MAP:
+            raise CalculationError(f"'{name}' is a built-in name")
+
+    def _replace(self, name: str, definition: _Definition):
+        self._check_name(name)
+        if self._reaches(definition.depends, name):
+            raise CalculationError(f"Circular reference to '{name}'")
+        previous = self._definitions.get(name)
+        if previous is not None:
+            self._unlink(name, previous)
+        for dependency in definition.depends:
+            self._dependents.setdefault(dependency, set()).add(name)
+        self._definitions[name] = definition
+        self._invalidate(name)
+
+    def _unlink(self, name: str, definition: _Definition):
+        for dependency in definition.depends:
+            dependents = self._dependents[dependency]
+            dependents.discard(name)
+            if not dependents:
+                del self._dependents[dependency]
+
+    def _reaches(self, names: Iterable[str], target: str) -> bool:
+        stack = list(names)
+        seen = set()
+        while stack:
+            name = stack.pop()
+            if name == target:
+                return True
+            if name in seen or name not in self._definitions:
+                continue
+            seen.add(name)
+            stack.extend(self._definitions[name].depends)
+        return False
+
+    def _invalidate(self, name: str):
+        # Dependents of a dirty definition are always dirty as well, so the
+        # walk stops at anything already marked.
+        self._dirty.add(name)
+        stack = list(self._dependents.get(name, ()))
+        while stack:
+            current = stack.pop()
+            if current not in self._dirty:
+                self._dirty.add(current)
+                stack.extend(self._dependents.get(current, ()))
+
+    def _refresh(self, names: Iterable[str]):
+        # Post-order walk over the dirty part of the graph, which has no
+        # cycles, so every definition comes after its dependencies.
+        order: List[str] = []
+        visited = set()
+        stack = [(name, False) for name in names]
+        while stack:
+            name, expanded = stack.pop()
+            if expanded:
+                order.append(name)
+            elif name in self._dirty and name not in visited:
+                visited.add(name)
+                stack.append((name, True))
+                stack.extend((dependency, False) for dependency in self._definitions[name].depends)
+        for name in order:
+            self._dirty.discard(name)
+            self._recompute(name, self._definitions[name])
+
+    def _recompute(self, name: str, definition: _Definition):
+        if definition.compiled is None:
+            return
+        self._forget(name)
+        for dependency in definition.depends:
+            if dependency in self._errors:
+                self._errors[name] = self._errors[dependency]
+                return
+        if definition.parameter is not None:
+            self._functions[name] = self._function(definition)
+            return
+        self.recomputed += 1
+        try:
+            self._values[name] = self._evaluate(definition.compiled, definition.variables,
+                                                definition.calls)
+        except CalculationError as e:
+            self._errors[name] = e
+
+    def _forget(self, name: str):
+        self._values.pop(name, None)
+        self._functions.pop(name, None)
+        self._errors.pop(name, None)
+
+    def _function(self, definition: _Definition) -> Callable[[Any], Any]:
+        compiled, parameter = definition.compiled, definition.parameter
+
+        def call(argument: Any) -> Any:
+            # Reads the current values: the function is rebuilt whenever one
+            # of its dependencies changes.
+            return self._evaluate(compiled, definition.variables, definition.calls,
+                                  {parameter: argument})
+        return call
+
+    def _evaluate(self, compiled: CompiledExpression, variables: FrozenSet[str],
+                  calls: FrozenSet[str], arguments: Optional[Dict[str, Any]] = None) -> Any:
+        values, functions = self._inputs(variables, calls)
+        if arguments:
+            values.update(arguments)
+        return compiled.evaluate(values, limits=self.limits, functions=functions, backend=self.backend)
+
+    def _inputs(self, variables: FrozenSet[str],
+                calls: FrozenSet[str]) -> Tuple[Dict[str, Any], Mapping[str, Callable]]:
+        for name in (*variables, *calls):
+            if name in self._errors:
+                raise self._errors[name]
+        # The shared table unless there are user functions, so the native
+        # tier can keep its binding between calls.
+        functions = dict(self.functions) if calls else self.functions
+        for name in calls:
+            if name not in self._functions:
+                raise CalculationError(f"Unknown function '{name}'")
+            functions[name] = self._functions[name]
+        return {name: self._values[name] for name in variables if name in self._values}, functions
+
+
+if __name__ == "__main__":
+    from cli import main
+    sys.exit(main())
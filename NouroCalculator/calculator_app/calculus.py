@@ -0,0 +1,399 @@
+import math
+import sys
+from functools import lru_cache
+from typing import Callable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from calculator import (CONSTANT_MAP, OP_ADD, OP_CALL, OP_DIV, OP_FACT, OP_MUL, OP_NEG, OP_NUM,
+                        OP_POW, OP_SUB, OP_VAR, PRECEDENCE, CalculationError, CompiledExpression,
+                        EvaluationLimits, Instruction, compile_expression, optimize, parse, tokenize)
+
+# d/du f(u) for each built-in function, in terms of its argument u; the
+# chain rule multiplies by the derivative of the argument.
+DERIVATIVE_RULES = {
+    'sin': "cos(u)",
+    'cos': "-sin(u)",
+    'tan': "1/cos(u)^2",
+    'asin': "1/sqrt(1-u^2)",
+    'acos': "-1/sqrt(1-u^2)",
+    'atan': "1/(1+u^2)",
+    'sqrt': "0.5/sqrt(u)",
+    'log': "1/(u*ln(10))",
+    'ln': "1/u",
+    'exp': "exp(u)",
+}
+
+DEFAULT_TOLERANCE = 1e-12
+DEFAULT_MAX_ITERATIONS = 100
+
+_EPSILON = sys.float_info.epsilon
+_SQRT_EPSILON = math.sqrt(_EPSILON)
+_GOLDEN = (3 - math.sqrt(5)) / 2
+
+
+class Solution(NamedTuple):
+    x: float
+    # f(x): close to zero for solve(), the minimum for minimize().
+    value: float
+    iterations: int
+    method: str
+
+
+@lru_cache(maxsize=None)
+def _rule(name: str) -> Tuple[Instruction, ...]:
+    return parse(tokenize(DERIVATIVE_RULES[name]))
+
+
+def _chain(name: str, operand: Tuple[Instruction, ...]) -> List[Instruction]:
+    if name not in DERIVATIVE_RULES:
+        raise CalculationError(f"Cannot differentiate '{name}'")
+    code: List[Instruction] = []
+    for instruction in _rule(name):
+        if instruction == (OP_VAR, 'u'):
+            code.extend(operand)
+        else:
+            code.append(instruction)
+    return code
+
+
+def _differentiate(program: Tuple[Instruction, ...], variable: str) -> List[Instruction]:
+    # The code of every stack entry is a contiguous slice of the program, so
+    # entries only record where their code starts, plus their derivative as
+    # postfix code, or None where it is identically zero.
+    stack: List[Tuple[int, Optional[List[Instruction]]]] = []
+    for index, (op, arg) in enumerate(program):
+        if op == OP_NUM:
+            stack.append((index, None))
+        elif op == OP_VAR:
+            stack.append((index, [(OP_NUM, 1.0)] if arg == variable else None))
+        elif op in (OP_NEG, OP_CALL, OP_FACT):
+            start, d = stack.pop()
+            if d is not None:
+                if op == OP_NEG:
+                    d.append((OP_NEG, None))
+                elif op == OP_CALL:
+                    d = _times(_chain(arg, program[start:index]), d)
+                else:
+                    raise CalculationError("Cannot differentiate a factorial")
+            stack.append((start, d))
+        else:
+            right_start, dg = stack.pop()
+            left_start, df = stack.pop()
+            f = program[left_start:right_start]
+            g = program[right_start:index]
+            stack.append((left_start, _binary(op, f, g, df, dg)))
+    (_, d), = stack
+    return d or [(OP_NUM, 0.0)]
+
+
+def _binary(op: str, f: Tuple[Instruction, ...], g: Tuple[Instruction, ...],
+            df: Optional[List[Instruction]], dg: Optional[List[Instruction]]) -> Optional[List[Instruction]]:
+    if op in (OP_ADD, OP_SUB):
+        if dg is None:
+            return df
+        if df is None:
+            return dg + [(OP_NEG, None)] if op == OP_SUB else dg
+        return df + dg + [(op, None)]
+    if op == OP_MUL:
+        # f'g + fg'
+        return _sum(df and [*df, *g, (OP_MUL, None)], dg and [*f, *dg, (OP_MUL, None)])
+    if op == OP_DIV:
+        if dg is None:
+            return df and [*df, *g, (OP_DIV, None)]
+        # (f'g - fg') / g^2
+        numerator = _sum(df and [*df, *g, (OP_MUL, None)], [*f, *dg, (OP_MUL, None), (OP_NEG, None)])
+        return [*numerator, *g, (OP_NUM, 2.0), (OP_POW, None), (OP_DIV, None)]
+    if dg is None:
+        # g f^(g-1) f'
+        return df and _times([*g, *f, *g, (OP_NUM, 1.0), (OP_SUB, None), (OP_POW, None), (OP_MUL, None)],
+                             df)
+    # f^g (g' ln(f) + g f'/f)
+    inner = _sum([*dg, *f, (OP_CALL, 'ln'), (OP_MUL, None)],
+                 df and [*g, *df, (OP_MUL, None), *f, (OP_DIV, None)])
+    return [*f, *g, (OP_POW, None), *inner, (OP_MUL, None)]
+
+
+def _times(code: List[Instruction], d: List[Instruction]) -> List[Instruction]:
+    # Keeps the chain rule's factor out of the result when it is 1 or -1.
+    if d == [(OP_NUM, 1.0)]:
+        return code
+    if d in ([(OP_NUM, -1.0)], [(OP_NUM, 1.0), (OP_NEG, None)]):
+        return code + [(OP_NEG, None)]
+    return code + d + [(OP_MUL, None)]
+
+
+def _sum(left: Optional[List[Instruction]], right: Optional[List[Instruction]]) -> Optional[List[Instruction]]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if right[-1] == (OP_NEG, None):
+        return left + right[:-1] + [(OP_SUB, None)]
+    return left + right + [(OP_ADD, None)]
+
+
+def _number(value: float) -> str:
+    for name, constant in CONSTANT_MAP.items():
+        if value == constant:
+            return name
+    if value.is_integer() and abs(value) < 1e16:
+        return str(int(value))
+    return repr(value)
+
+
+def render(program: Tuple[Instruction, ...]) -> str:
+    # Infix text for a program, in the calculator's own syntax, with only
+    # the parentheses needed to parse back to the same program.
+    atom = max(PRECEDENCE.values()) + 1
+    stack: List[Tuple[str, int]] = []
+    for op, arg in program:
+        if op == OP_NUM:
+            text = _number(abs(arg))
+            stack.append(("-" + text, PRECEDENCE[OP_NEG]) if math.copysign(1, arg) < 0 else (text, atom))
+        elif op == OP_VAR:
+            stack.append((arg, atom))
+        elif op == OP_CALL:
+            stack.append((f"{arg}({stack.pop()[0]})", atom))
+        elif op == OP_FACT:
+            text, precedence = stack.pop()
+            stack.append((f"{text}!" if precedence == atom else f"({text})!", atom))
+        elif op == OP_NEG:
+            text, precedence = stack.pop()
+            stack.append((f"-{text}" if precedence >= PRECEDENCE[OP_NEG] else f"-({text})",
+                          PRECEDENCE[OP_NEG]))
+        else:
+            right, right_precedence = stack.pop()
+            left, left_precedence = stack.pop()
+            precedence = PRECEDENCE[op]
+            if left_precedence < precedence or (op == OP_POW and left_precedence == precedence):
+                left = f"({left})"
+            if op == OP_POW:
+                stack.append((f"{left}^({right})", precedence))
+                continue
+            if right_precedence <= precedence:
+                right = f"({right})"
+            symbol = {OP_ADD: " + ", OP_SUB: " - ", OP_MUL: "*", OP_DIV: "/"}[op]
+            stack.append((f"{left}{symbol}{right}", precedence))
+    (text, _), = stack
+    return text
+
+
+@lru_cache(maxsize=256)
+def _derivative(compiled: CompiledExpression, variable: str) -> CompiledExpression:
+    program = optimize(tuple(_differentiate(compiled.program, variable)))
+    variables = tuple(dict.fromkeys(arg for op, arg in program if op == OP_VAR))
+    return CompiledExpression(render(program), program, variables)
+
+
+def derivative(expression: Union[str, CompiledExpression], variable: str = 'x') -> CompiledExpression:
+    # The derivative with respect to variable, compiled; other variables are
+    # treated as constants. Its source is the simplified derivative as text.
+    compiled = compile_expression(expression) if isinstance(expression, str) else expression
+    return _derivative(compiled, variable)
+
+
+def _function_of(compiled: CompiledExpression, variable: str, values: Optional[Mapping[str, float]],
+                 limits: Optional[EvaluationLimits]) -> Callable[[float], float]:
+    # compiled as a function of variable alone, running the generated code.
+    values = dict(values or {})
+    values[variable] = 0.0
+    missing = [name for name in compiled.variables if name not in values]
+    if missing:
+        raise CalculationError(f"Unknown variable '{missing[0]}'")
+    native = compiled.native(limits=limits)
+    arguments = [values[name] for name in compiled.variables]
+    position = compiled.variables.index(variable) if variable in compiled.variables else None
+
+    def function(x: float) -> float:
+        if position is not None:
+            arguments[position] = x
+        try:
+            return native(*arguments)
+        except (ValueError, ArithmeticError) as e:
+            raise CalculationError(str(e)) from e
+    return function
+
+
+def solve(expression: Union[str, CompiledExpression], variable: str = 'x',
+          bracket: Optional[Tuple[float, float]] = None, guess: Optional[float] = None,
+          values: Optional[Mapping[str, float]] = None, tolerance: float = DEFAULT_TOLERANCE,
+          max_iterations: int = DEFAULT_MAX_ITERATIONS,
+          limits: Optional[EvaluationLimits] = None) -> Solution:
+    # A root of expression in variable. With a bracket [a, b] where the
+    # expression changes sign, Newton's method on the symbolic derivative,
+    # falling back to bisection whenever a step would leave the bracket, or
+    # Brent's method if the expression has no derivative. With only a guess,
+    # plain Newton iteration from there.
+    compiled = compile_expression(expression) if isinstance(expression, str) else expression
+    f = _function_of(compiled, variable, values, limits)
+    try:
+        df = _function_of(derivative(compiled, variable), variable, values, limits)
+    except CalculationError:
+        df = None
+
+    if bracket is None:
+        if guess is None:
+            raise CalculationError("solve needs a bracket or a starting guess")
+        if df is None:
+            raise CalculationError("Without a bracket the expression must be differentiable")
+        return _newton(f, df, guess, tolerance, max_iterations)
+
+    a, b = map(float, bracket)
+    fa, fb = f(a), f(b)
+    if fa == 0:
+        return Solution(a, fa, 0, 'bracket')
+    if fb == 0:
+        return Solution(b, fb, 0, 'bracket')
+    if (fa > 0) == (fb > 0):
+        raise CalculationError(f"The expression has the same sign at {a:g} and {b:g}")
+    if df is None:
+        return _brent_root(f, a, fa, b, fb, tolerance, max_iterations)
+    return _safe_newton(f, df, a, fa, b, tolerance, max_iterations)
+
+
+def _newton(f: Callable[[float], float], df: Callable[[float], float], x: float,
+            tolerance: float, max_iterations: int) -> Solution:
+    x = float(x)
+    for iteration in range(1, max_iterations + 1):
+        fx = f(x)
+        if fx == 0:
+            return Solution(x, fx, iteration, 'newton')
+        slope = df(x)
+        if slope == 0 or not math.isfinite(slope):
+            raise CalculationError(f"Newton's method stalled at {x:g}; give a bracket")
+        step = fx / slope
+        x -= step
+        if abs(step) <= tolerance + 4 * _EPSILON * abs(x):
+            return Solution(x, f(x), iteration, 'newton')
+    raise CalculationError(f"No root found within {max_iterations} iterations")
+
+
+def _safe_newton(f: Callable[[float], float], df: Callable[[float], float], a: float, fa: float,
+                 b: float, tolerance: float, max_iterations: int) -> Solution:
+    # low and high keep f(low) < 0 < f(high) throughout.
+    low, high = (a, b) if fa < 0 else (b, a)
+    x = (low + high) / 2
+    step = previous_step = abs(high - low)
+    fx = f(x)
+    for iteration in range(1, max_iterations + 1):
+        try:
+            slope = df(x)
+        except CalculationError:
+            slope = math.nan
+        newton_ok = (slope == slope and slope != 0
+                     and ((x - high) * slope - fx) * ((x - low) * slope - fx) < 0
+                     and abs(2 * fx) <= abs(previous_step * slope))
+        previous_step = step
+        if newton_ok:
+            step = fx / slope
+            x -= step
+        else:
+            step = (high - low) / 2
+            x = low + step
+        fx = f(x)
+        if fx == 0 or abs(step) <= tolerance + 4 * _EPSILON * abs(x):
+            return Solution(x, fx, iteration, 'newton')
+        if fx < 0:
+            low = x
+        else:
+            high = x
+    raise CalculationError(f"No root found within {max_iterations} iterations")
+
+
+def _brent_root(f: Callable[[float], float], a: float, fa: float, b: float, fb: float,
+                tolerance: float, max_iterations: int) -> Solution:
+    # Brent's method: inverse quadratic or secant steps while they shrink
+    # the bracket fast enough, bisection otherwise.
+    previous, f_previous, current, f_current = a, fa, b, fb
+    block = f_block = 0.0
+    step_previous = step_current = 0.0
+    for iteration in range(1, max_iterations + 1):
+        if f_previous * f_current < 0:
+            block, f_block = previous, f_previous
+            step_previous = step_current = current - previous
+        if abs(f_block) < abs(f_current):
+            previous, current, block = current, block, current
+            f_previous, f_current, f_block = f_current, f_block, f_current
+
+        delta = (tolerance + 4 * _EPSILON * abs(current)) / 2
+        bisect = (block - current) / 2
+        if f_current == 0 or abs(bisect) < delta:
+            return Solution(current, f_current, iteration, 'brent')
+
+        if abs(step_previous) > delta and abs(f_current) < abs(f_previous):
+            if previous == block:
+                trial = -f_current * (current - previous) / (f_current - f_previous)
+            else:
+                d_previous = (f_previous - f_current) / (previous - current)
+                d_block = (f_block - f_current) / (block - current)
+                trial = -f_current * (f_block * d_block - f_previous * d_previous) / (
+                    d_block * d_previous * (f_block - f_previous))
+            if 2 * abs(trial) < min(abs(step_previous), 3 * abs(bisect) - delta):
+                step_previous, step_current = step_current, trial
+            else:
+                step_previous = step_current = bisect
+        else:
+            step_previous = step_current = bisect
+
+        previous, f_previous = current, f_current
+        current += step_current if abs(step_current) > delta else math.copysign(delta, bisect)
+        f_current = f(current)
+    raise CalculationError(f"No root found within {max_iterations} iterations")
+
+
+def minimize(expression: Union[str, CompiledExpression], variable: str = 'x',
+             bracket: Tuple[float, float] = (0.0, 1.0), values: Optional[Mapping[str, float]] = None,
+             tolerance: float = DEFAULT_TOLERANCE, max_iterations: int = DEFAULT_MAX_ITERATIONS,
+             limits: Optional[EvaluationLimits] = None) -> Solution:
+    # A local minimum of expression in variable within bracket, by Brent's
+    # method (golden-section search with parabolic steps). Locating x finer
+    # than about sqrt(epsilon) relative to its size is not possible in
+    # floats, so that bounds the precision whatever the tolerance.
+    compiled = compile_expression(expression) if isinstance(expression, str) else expression
+    f = _function_of(compiled, variable, values, limits)
+    a, b = sorted(map(float, bracket))
+    x = w = v = a + _GOLDEN * (b - a)
+    fx = fw = fv = f(x)
+    d = e = 0.0
+    for iteration in range(1, max_iterations + 1):
+        middle = (a + b) / 2
+        tol1 = _SQRT_EPSILON * abs(x) + tolerance
+        tol2 = 2 * tol1
+        if abs(x - middle) <= tol2 - (b - a) / 2:
+            return Solution(x, fx, iteration, 'brent')
+        parabolic = False
+        if abs(e) > tol1:
+            r = (x - w) * (fx - fv)
+            q = (x - v) * (fx - fw)
+            p = (x - v) * q - (x - w) * r
+            q = 2 * (q - r)
+            if q > 0:
+                p = -p
+            q = abs(q)
+            if abs(p) < abs(q * e / 2) and q * (a - x) < p < q * (b - x):
+                e, d = d, p / q
+                parabolic = True
+                if (x + d) - a < tol2 or b - (x + d) < tol2:
+                    d = math.copysign(tol1, middle - x)
+        if not parabolic:
+            e = (a if x >= middle else b) - x
+            d = _GOLDEN * e
+        u = x + (d if abs(d) >= tol1 else math.copysign(tol1, d))
+        fu = f(u)
+        if fu <= fx:
+            if u >= x:
+                a = x
+            else:
+                b = x
+            v, w, x = w, x, u
+            fv, fw, fx = fw, fx, fu
+        else:
+            if u < x:
+                a = u
+            else:
+                b = u
+            if fu <= fw or w == x:
+                v, w = w, u
+                fv, fw = fw, fu
+            elif fu <= fv or v == x or v == w:
+                v, fv = u, fu
+    raise CalculationError(f"No minimum found within {max_iterations} iterations")
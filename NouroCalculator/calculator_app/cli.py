@@ -0,0 +1,91 @@
+import argparse
+import fileinput
+import json
+import math
+import sys
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+from bulk import BulkResult, evaluate_bulk, read_expressions
+from calculator import CalculationError, compile_expression
+
+WRITE_BATCH_SIZE = 512
+
+
+def evaluate_stream(expressions: Iterable[str]) -> Iterator[BulkResult]:
+    for expression in expressions:
+        try:
+            value = compile_expression(expression).evaluate()
+        except CalculationError as e:
+            yield BulkResult(expression, None, e)
+        else:
+            yield BulkResult(expression, value, None)
+
+
+def format_text(result: BulkResult) -> str:
+    if result.ok:
+        return f"{result.expression}\t{result.value}\n"
+    return f"{result.expression}\tError: {result.error}\n"
+
+
+def to_record(result: BulkResult) -> dict:
+    # JSON has no infinities or NaN; such results are written as null.
+    if result.ok:
+        value = result.value if math.isfinite(result.value) else None
+        return {'expression': result.expression, 'result': value}
+    return {'expression': result.expression, 'error': str(result.error)}
+
+
+def format_json(result: BulkResult) -> str:
+    return json.dumps(to_record(result), ensure_ascii=False, allow_nan=False) + "\n"
+
+
+def write_batched(lines: Iterable[str], out: TextIO, batch_size: int = WRITE_BATCH_SIZE):
+    batch: List[str] = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            out.write(''.join(batch))
+            out.flush()
+            batch.clear()
+    if batch:
+        out.write(''.join(batch))
+    out.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m calculator",
+        description="Evaluate newline-delimited expressions from files or stdin.")
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help="input files; '-' or none reads stdin")
+    parser.add_argument('--json', action='store_true', help="write JSON lines instead of tab-separated text")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="evaluate on a pool of worker processes (default: 1, in-process)")
+    parser.add_argument('--line-buffered', action='store_true',
+                        help="write each result immediately, for interactive use")
+    args = parser.parse_args(argv)
+
+    errors = 0
+
+    def count_errors(results: Iterable[BulkResult]) -> Iterator[BulkResult]:
+        nonlocal errors
+        for result in results:
+            if not result.ok:
+                errors += 1
+            yield result
+
+    # Every stage is a generator, so memory use does not grow with the input.
+    with fileinput.input(args.files, encoding='utf-8') as lines:
+        expressions = read_expressions(lines)
+        if args.workers > 1:
+            results = evaluate_bulk(expressions, workers=args.workers)
+        else:
+            results = evaluate_stream(expressions)
+        formatter = format_json if args.json else format_text
+        output = map(formatter, count_errors(results))
+        write_batched(output, sys.stdout, 1 if args.line_buffered else WRITE_BATCH_SIZE)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+# Three append-only files per store:
+#   <name>.dat   records: result (float64), expression length (uint32), UTF-8 expression
+#   <name>.idx   one uint64 offset into .dat per record, for O(1) access by position
+#   <name>.key   the first KEY_SIZE bytes of each expression, NUL padded, scanned
+#                at C speed by prefix searches
+# The index is written last, so it decides how many records a store holds.
+RECORD_HEADER = struct.Struct('<dI')
+OFFSET = struct.Struct('<Q')
+KEY_SIZE = 8
+
+HistoryEntry = Tuple[str, float]
+
+
+class _MappedFile:
+    # A read-only memory map of a file that only ever grows; the map is
+    # recreated when a read reaches past its end.
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map: Optional[mmap.mmap] = None
+
+    def view(self, needed: int) -> mmap.mmap:
+        if self._map is None or len(self._map) < needed:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class HistoryStore:
+    def __init__(self, path: Union[str, Path]):
+        base = Path(path)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        self._paths = [base.with_suffix(suffix) for suffix in ('.dat', '.idx', '.key')]
+        for file_path in self._paths:
+            file_path.touch(exist_ok=True)
+        self._count = self._recover()
+
+        data_path, index_path, key_path = self._paths
+        self._data_end = os.path.getsize(data_path)
+        self._writers = [open(file_path, 'ab') for file_path in self._paths]
+        self._data, self._index, self._keys = (_MappedFile(file_path) for file_path in self._paths)
+
+    def _recover(self) -> int:
+        # Drop whatever a crash left behind after the last complete record.
+        data_path, index_path, key_path = self._paths
+        count = min(os.path.getsize(index_path) // OFFSET.size, os.path.getsize(key_path) // KEY_SIZE)
+        data_end = 0
+        if count:
+            with open(index_path, 'rb') as f:
+                f.seek((count - 1) * OFFSET.size)
+                last = OFFSET.unpack(f.read(OFFSET.size))[0]
+            with open(data_path, 'rb') as f:
+                f.seek(last)
+                header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return self._truncate(count - 1)
+            data_end = last + RECORD_HEADER.size + RECORD_HEADER.unpack(header)[1]
+            if data_end > os.path.getsize(data_path):
+                return self._truncate(count - 1)
+        for file_path, size in zip(self._paths, (data_end, count * OFFSET.size, count * KEY_SIZE)):
+            if os.path.getsize(file_path) != size:
+                os.truncate(file_path, size)
+        return count
+
+    def _truncate(self, count: int) -> int:
+        os.truncate(self._paths[1], count * OFFSET.size)
+        os.truncate(self._paths[2], count * KEY_SIZE)
+        return self._recover()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> 'HistoryStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, expression: str, result: float) -> int:
+        encoded = expression.encode('utf-8')
+        data, index, keys = self._writers
+        data.write(RECORD_HEADER.pack(result, len(encoded)) + encoded)
+        data.flush()
+        keys.write(encoded[:KEY_SIZE].ljust(KEY_SIZE, b'\0'))
+        keys.flush()
+        index.write(OFFSET.pack(self._data_end))
+        index.flush()
+        self._data_end += RECORD_HEADER.size + len(encoded)
+        self._count += 1
+        return self._count - 1
+
+    def __getitem__(self, position: int) -> HistoryEntry:
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("history position out of range")
+        index = self._index.view((position + 1) * OFFSET.size)
+        offset = OFFSET.unpack_from(index, position * OFFSET.size)[0]
+        data = self._data.view(offset + RECORD_HEADER.size)
+        result, length = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        data = self._data.view(start + length)
+        return data[start:start + length].decode('utf-8'), result
+
+    def recent(self, count: int) -> List[HistoryEntry]:
+        return [self[position] for position in range(self._count - 1, max(self._count - count, 0) - 1, -1)]
+
+    def search(self, prefix: str, limit: Optional[int] = None) -> Iterator[Tuple[int, str, float]]:
+        # Newest matches first. Candidates come from scanning the fixed-width
+        # key column backwards with mmap.rfind; longer prefixes are then
+        # confirmed against the full expression.
+        if not self._count or limit == 0:
+            return
+        encoded = prefix.encode('utf-8')
+        key = encoded[:KEY_SIZE]
+        keys = self._keys.view(self._count * KEY_SIZE)
+        found = 0
+        end = self._count * KEY_SIZE
+        while end > 0:
+            if key:
+                at = keys.rfind(key, 0, end)
+                if at < 0:
+                    return
+                if at % KEY_SIZE:
+                    end = at + len(key) - 1
+                    continue
+            else:
+                at = end - KEY_SIZE
+            end = at
+            position = at // KEY_SIZE
+            expression, result = self[position]
+            if len(encoded) > KEY_SIZE and not expression.startswith(prefix):
+                continue
+            yield position, expression, result
+            found += 1
+            if limit is not None and found >= limit:
+                return
+
+    def close(self):
+        for writer in self._writers:
+            writer.close()
+        for mapped in (self._data, self._index, self._keys):
+            mapped.close()
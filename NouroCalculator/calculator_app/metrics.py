@@ -0,0 +1,128 @@
+import heapq
+import math
+import threading
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Upper bounds in seconds, from a microsecond to a second; a final +Inf bucket
+# catches everything slower.
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+
+STAGES = ('tokenize', 'parse', 'optimize', 'execute', 'total')
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {'count': self.count, 'sum': self.sum, 'buckets': cumulative}
+
+
+class EngineMetrics:
+    # Updated by CalculatorEngine only while metrics are enabled; snapshots
+    # may be taken from any thread, e.g. by a metrics endpoint.
+    def __init__(self, slowest: int = 10, slow_threshold: Optional[float] = None,
+                 on_slow: Optional[Callable[[str, float], None]] = None):
+        self.slowest = slowest
+        self.slow_threshold = slow_threshold
+        self.on_slow = on_slow
+        self.evaluations = 0
+        self.errors: Counter = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency = {stage: LatencyHistogram() for stage in STAGES}
+        self._slowest: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self.latency[stage].observe(seconds)
+
+    def record_cache(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def record_evaluation(self, expression: str, seconds: float, error: Optional[BaseException] = None):
+        with self._lock:
+            self.evaluations += 1
+            if error is not None:
+                cause = error.__cause__ or error
+                self.errors[type(cause).__name__] += 1
+            self.latency['total'].observe(seconds)
+            if self.slowest:
+                entry = (seconds, expression)
+                if len(self._slowest) < self.slowest:
+                    heapq.heappush(self._slowest, entry)
+                elif entry > self._slowest[0]:
+                    heapq.heapreplace(self._slowest, entry)
+        if self.on_slow is not None and self.slow_threshold is not None \
+                and seconds >= self.slow_threshold:
+            self.on_slow(expression, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'evaluations': self.evaluations,
+                'errors': dict(self.errors),
+                'cache': {'hits': self.cache_hits, 'misses': self.cache_misses},
+                'latency': {stage: histogram.snapshot() for stage, histogram in self.latency.items()},
+                'slowest': [(expression, seconds)
+                            for seconds, expression in sorted(self._slowest, reverse=True)],
+            }
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def to_prometheus(stats: Dict[str, Any], prefix: str = 'calculator') -> str:
+    lines = [
+        f"# HELP {prefix}_evaluations_total Expressions evaluated.",
+        f"# TYPE {prefix}_evaluations_total counter",
+        f"{prefix}_evaluations_total {stats['evaluations']}",
+        f"# HELP {prefix}_errors_total Failed evaluations by error type.",
+        f"# TYPE {prefix}_errors_total counter",
+    ]
+    for error, count in sorted(stats['errors'].items()):
+        lines.append(f'{prefix}_errors_total{{type="{_label(error)}"}} {count}')
+    for outcome in ('hits', 'misses'):
+        lines += [
+            f"# HELP {prefix}_cache_{outcome}_total Compiled-expression cache {outcome}.",
+            f"# TYPE {prefix}_cache_{outcome}_total counter",
+            f"{prefix}_cache_{outcome}_total {stats['cache'][outcome]}",
+        ]
+    lines += [
+        f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    for stage, histogram in stats['latency'].items():
+        for bound, count in histogram['buckets']:
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{_number(bound)}"}} {count}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {_number(histogram["sum"])}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+    return "\n".join(lines) + "\n"
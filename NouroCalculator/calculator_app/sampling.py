@@ -0,0 +1,97 @@
+import math
+from heapq import merge
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+from calculator import CompiledExpression, compile_expression
+
+DEFAULT_POINTS = 65
+# A point is refined when it is further than this fraction of the value
+# range from the straight line through its neighbours.
+DEFAULT_TOLERANCE = 0.002
+MAX_DEPTH = 10
+MAX_POINTS = 5000
+
+Samples = Tuple[List[float], List[float]]
+
+
+def value_range(ys: List[float]) -> Tuple[float, float]:
+    # The range of the finite values, ignoring the top and bottom 2% so a
+    # pole does not flatten the rest of the curve.
+    finite = sorted(y for y in ys if math.isfinite(y))
+    if not finite:
+        return (-1.0, 1.0)
+    cut = len(finite) // 50
+    low, high = finite[cut], finite[-1 - cut]
+    if low == high:
+        return (low - 1.0, high + 1.0)
+    return (low, high)
+
+
+def _evaluate(compiled: CompiledExpression, variable: str, xs: List[float],
+              values: Mapping[str, float]) -> List[float]:
+    # One batch per pass: vectorized with NumPy when it is installed, and
+    # through the generated code otherwise. Failed points come back as NaN.
+    return [float(y) for y in compiled.evaluate_batch({**values, variable: xs})]
+
+
+def sample_passes(expression: Union[str, CompiledExpression], start: float, stop: float,
+                  variable: str = 'x', values: Optional[Mapping[str, float]] = None,
+                  points: int = DEFAULT_POINTS, tolerance: float = DEFAULT_TOLERANCE,
+                  max_depth: int = MAX_DEPTH, max_points: int = MAX_POINTS) -> Iterator[Samples]:
+    # Samples expression over [start, stop]: an even grid first, then up to
+    # max_depth passes that halve the intervals around points where the
+    # curve bends, or where it stops being defined. Yields all points so
+    # far, sorted by x, after every pass.
+    if points < 2:
+        raise ValueError("Sampling needs at least two points")
+    if not start < stop:
+        raise ValueError("The start of the range must be below its end")
+    compiled = compile_expression(expression) if isinstance(expression, str) else expression
+    values = dict(values or {})
+    step = (stop - start) / (points - 1)
+    xs = [start + step * i for i in range(points - 1)] + [stop]
+    ys = _evaluate(compiled, variable, xs, values)
+    yield xs, ys
+
+    for _ in range(max_depth):
+        low, high = value_range(ys)
+        threshold = tolerance * (high - low)
+        # Interval index -> how badly it needs splitting.
+        scores: Dict[int, float] = {}
+        for i in range(1, len(xs) - 1):
+            y0, y1, y2 = ys[i - 1], ys[i], ys[i + 1]
+            if math.isfinite(y0) and math.isfinite(y1) and math.isfinite(y2):
+                chord = y0 + (y2 - y0) * (xs[i] - xs[i - 1]) / (xs[i + 1] - xs[i - 1])
+                deviation = abs(y1 - chord)
+                if deviation > threshold:
+                    for interval in (i - 1, i):
+                        scores[interval] = max(scores.get(interval, 0.0), deviation)
+        for i in range(len(xs) - 1):
+            if math.isfinite(ys[i]) != math.isfinite(ys[i + 1]):
+                scores[i] = math.inf
+        # The worst intervals first when the point budget runs out.
+        candidates = sorted(scores, key=scores.get, reverse=True)[:max_points - len(xs)]
+        midpoints = []
+        for i in sorted(candidates):
+            x = (xs[i] + xs[i + 1]) / 2
+            # Intervals already as narrow as floats allow have no midpoint.
+            if xs[i] < x < xs[i + 1]:
+                midpoints.append(x)
+        if not midpoints:
+            return
+        new_ys = _evaluate(compiled, variable, midpoints, values)
+        merged = list(merge(zip(xs, ys), zip(midpoints, new_ys)))
+        xs = [x for x, _ in merged]
+        ys = [y for _, y in merged]
+        yield xs, ys
+
+
+def sample(expression: Union[str, CompiledExpression], start: float, stop: float,
+           variable: str = 'x', values: Optional[Mapping[str, float]] = None,
+           points: int = DEFAULT_POINTS, tolerance: float = DEFAULT_TOLERANCE,
+           max_depth: int = MAX_DEPTH, max_points: int = MAX_POINTS) -> Samples:
+    # The final pass of sample_passes(): (xs, ys), sorted by x.
+    for samples in sample_passes(expression, start, stop, variable, values, points, tolerance,
+                                 max_depth, max_points):
+        pass
+    return samples
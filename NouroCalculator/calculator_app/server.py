@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bulk import BulkResult, evaluate_chunk
+from calculator import shared_cache_info
+from cli import to_record
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+BATCH_DELAY = 0.002
+MAX_BATCH = 256
+# Expressions longer than this always go to the worker pool, and at most
+# INLINE_BUDGET characters are evaluated on the event loop per batch, which
+# bounds how long one batch can keep the loop from serving other requests.
+HEAVY_LENGTH = 2000
+INLINE_BUDGET = 20_000
+KEEP_ALIVE_TIMEOUT = 15.0
+MAX_BODY_SIZE = 1 << 20
+MAX_HEADER_SIZE = 1 << 14
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error',
+           501: 'Not Implemented'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    # Expressions from concurrent requests are collected for up to `delay`
+    # seconds, or until max_batch of them are waiting, and evaluated
+    # together: cheap ones directly on the event loop, the rest as one job
+    # per chunk on the worker pool. At most max_jobs chunks are on the pool
+    # at once; later ones wait for a free slot.
+    def __init__(self, executor: Executor, delay: float = BATCH_DELAY,
+                 max_batch: int = MAX_BATCH, max_jobs: int = 4):
+        self.executor = executor
+        self.delay = delay
+        self.max_batch = max_batch
+        self.batches = 0
+        self.offloaded = 0
+        self._jobs = asyncio.Semaphore(max_jobs)
+        self._waiting: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def evaluate(self, expressions: List[str]) -> List[BulkResult]:
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in expressions]
+        self._waiting.extend(zip(expressions, futures))
+        if len(self._waiting) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.delay, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        waiting, self._waiting = self._waiting, []
+        self.batches += 1
+
+        inline: List[Tuple[str, asyncio.Future]] = []
+        offload: List[Tuple[str, asyncio.Future]] = []
+        budget = INLINE_BUDGET
+        for expression, future in waiting:
+            if len(expression) <= HEAVY_LENGTH and len(expression) <= budget:
+                budget -= len(expression)
+                inline.append((expression, future))
+            else:
+                offload.append((expression, future))
+
+        if inline:
+            try:
+                results = evaluate_chunk([expression for expression, _ in inline])
+            except Exception as e:
+                _fail(inline, e)
+            else:
+                _resolve(inline, results)
+        for start in range(0, len(offload), self.max_batch):
+            task = asyncio.create_task(self._offload(offload[start:start + self.max_batch]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _offload(self, chunk: List[Tuple[str, asyncio.Future]]):
+        async with self._jobs:
+            self.offloaded += len(chunk)
+            loop = asyncio.get_running_loop()
+            try:
+                results = await loop.run_in_executor(self.executor, evaluate_chunk,
+                                                     [expression for expression, _ in chunk])
+            except Exception as e:
+                _fail(chunk, e)
+                return
+        _resolve(chunk, results)
+
+
+def _resolve(waiting: List[Tuple[str, asyncio.Future]], results: List[BulkResult]):
+    for (_, future), result in zip(waiting, results):
+        if not future.done():
+            future.set_result(result)
+
+
+def _fail(waiting: List[Tuple[str, asyncio.Future]], error: Exception):
+    for _, future in waiting:
+        if not future.done():
+            future.set_exception(error)
+
+
+class EvaluationServer:
+    # HTTP/1.1 with keep-alive, JSON in and out:
+    #   POST /evaluate  {"expression": "2+2"}        -> {"expression": ..., "result": 4.0}
+    #   POST /batch     {"expressions": ["1", "2"]}  -> {"results": [{...}, {...}]}
+    #   GET  /health                                 -> status and cache statistics
+    # Every request shares the process-wide compiled-expression cache.
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 workers: Optional[int] = None, executor: Optional[Executor] = None,
+                 delay: float = BATCH_DELAY, max_batch: int = MAX_BATCH):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self._own_executor = executor is None
+        self._executor = executor
+        self._delay = delay
+        self._max_batch = max_batch
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.batcher: Optional[MicroBatcher] = None
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    async def start(self) -> 'EvaluationServer':
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.batcher = MicroBatcher(self._executor, self._delay, self._max_batch,
+                                    max_jobs=self.workers * 2)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=MAX_HEADER_SIZE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Idle keep-alive connections are closed rather than left to be
+            # cancelled when the loop shuts down.
+            for writer in self._connections:
+                writer.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await self._server.wait_closed()
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    async def __aenter__(self) -> 'EvaluationServer':
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except HTTPError as e:
+                    writer.write(_response(e.status, {'error': str(e)}, False))
+                    await writer.drain()
+                    return
+                method, path, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                try:
+                    status, payload = await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        if path == '/health':
+            if method != 'GET':
+                raise HTTPError(405, "Use GET")
+            cache = shared_cache_info()
+            return 200, {'status': 'ok', 'batches': self.batcher.batches,
+                         'offloaded': self.batcher.offloaded,
+                         'cache': {'hits': cache.hits, 'misses': cache.misses,
+                                   'size': cache.currsize, 'maxsize': cache.maxsize}}
+        if path not in ('/evaluate', '/batch'):
+            raise HTTPError(404, f"No such endpoint: {path}")
+        if method != 'POST':
+            raise HTTPError(405, "Use POST")
+        try:
+            document = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON")
+
+        if path == '/evaluate':
+            expression = document.get('expression') if isinstance(document, dict) else None
+            if not isinstance(expression, str):
+                raise HTTPError(400, "Expected {\"expression\": \"...\"}")
+            result, = await self.batcher.evaluate([expression])
+            return (200 if result.ok else 422), to_record(result)
+
+        expressions = document.get('expressions') if isinstance(document, dict) else None
+        if not isinstance(expressions, list) or not all(isinstance(e, str) for e in expressions):
+            raise HTTPError(400, "Expected {\"expressions\": [\"...\", ...]}")
+        results = await self.batcher.evaluate(expressions) if expressions else []
+        return 200, {'results': [to_record(result) for result in results]}
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, str, Dict[str, str], bytes]:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, "Request headers too large")
+    lines = head.decode('latin-1').split("\r\n")
+    try:
+        method, path, version = lines[0].split(" ")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+    except ValueError:
+        raise HTTPError(400, "Malformed request")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "Content-Length is not an integer")
+    if length < 0:
+        raise HTTPError(400, "Content-Length is negative")
+    if 'transfer-encoding' in headers:
+        raise HTTPError(501, "Chunked request bodies are not supported")
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(413, f"Request body is larger than {MAX_BODY_SIZE} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?", 1)[0], version, headers, body
+
+
+def _response(status: int, payload: Any, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False, allow_nan=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: Optional[int] = None,
+                delay: float = BATCH_DELAY, max_batch: int = MAX_BATCH):
+    async with EvaluationServer(host, port, workers, delay=delay, max_batch=max_batch) as server:
+        print(f"Serving on http://{server.host}:{server.port}", file=sys.stderr)
+        await server.serve_forever()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve expression evaluation over HTTP/JSON.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT,
+                        help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes for long expressions (default: CPU count)")
+    parser.add_argument('--batch-delay', type=float, default=BATCH_DELAY * 1000,
+                        help="milliseconds to collect requests into one batch (default: 2)")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH,
+                        help="expressions per batch (default: 256)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.batch_delay / 1000, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backends import DecimalBackend, FractionBackend
+from calculator import compile_expression
+
+WORKLOADS = {
+    'ledger': "19.99*3 + 4.75*12 - 0.15*(19.99*3 + 4.75*12) + x",
+    'ratios': "(1/3 + 2/7)*x - (5/11)^(3) + 1/(x+1)",
+    'scientific': "sqrt(2)*cos(1.2)+ln(10)-exp(0.5)*tan(0.3)+asin(0.5)*x",
+    'factorial_power': "20!/(18!*2) + 1.5^(20) + x",
+}
+
+BACKENDS = {
+    'float': None,
+    'decimal-28': DecimalBackend(),
+    'decimal-50': DecimalBackend(precision=50),
+    'fraction': FractionBackend(),
+}
+
+MIN_TIME = 0.2
+
+
+def evaluations_per_second(expression: str, backend) -> float:
+    compiled = compile_expression(expression)
+    count = 0
+    start = time.perf_counter()
+    while True:
+        for x in range(100):
+            compiled.evaluate(x=x, backend=backend)
+        count += 100
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME:
+            return count / elapsed
+
+
+def main():
+    print(f"{'workload':<16}" + "".join(f"{name:>14}" for name in BACKENDS) + "   evals/sec")
+    for workload, expression in WORKLOADS.items():
+        rates = [evaluations_per_second(expression, backend) for backend in BACKENDS.values()]
+        print(f"{workload:<16}" + "".join(f"{rate:>14.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
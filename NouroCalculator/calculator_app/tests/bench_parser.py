@@ -0,0 +1,40 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calculator import CalculatorEngine
+
+SIZES = [1000, 2000, 4000, 8000, 16000, 32000, 64000]
+
+
+def generated_sum(terms: int) -> str:
+    return "+".join(str(i % 97 + 1) for i in range(terms))
+
+
+def nested_parentheses(depth: int) -> str:
+    return "(" * depth + "1" + ")" * depth
+
+
+def time_compile(expression: str, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        engine = CalculatorEngine(cache_size=0)
+        start = time.perf_counter()
+        engine.compile(expression).evaluate()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for label, build in (("sum terms", generated_sum), ("nesting depth", nested_parentheses)):
+        print(f"{label:>14} {'seconds':>10} {'us/unit':>10}")
+        for size in SIZES:
+            elapsed = time_compile(build(size))
+            print(f"{size:>14} {elapsed:>10.4f} {elapsed / size * 1e6:>10.3f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
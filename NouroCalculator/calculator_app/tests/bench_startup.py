@@ -0,0 +1,73 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in a fresh interpreter each time, so imports are measured cold (apart
+# from the OS file cache). First paint is the first update() after the
+# window is built: the point where the calculator is on screen.
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {app_dir!r})
+import tkinter as tk
+imported_tk = time.perf_counter()
+import ui
+imported = time.perf_counter()
+root = tk.Tk()
+app = ui.NouroCalculatorUI(root)
+built = time.perf_counter()
+root.update()
+painted = time.perf_counter()
+app.toggle_scientific_mode()
+root.update()
+scientific = time.perf_counter()
+root.destroy()
+print(json.dumps({{
+    'import_tkinter': imported_tk - start,
+    'import_ui': imported - imported_tk,
+    'build': built - imported,
+    'first_paint': painted - built,
+    'time_to_first_paint': painted - start,
+    'first_scientific_toggle': scientific - painted,
+}}))
+"""
+
+STAGES = ('import_tkinter', 'import_ui', 'build', 'first_paint', 'time_to_first_paint',
+          'first_scientific_toggle')
+
+
+def measure(runs: int) -> dict:
+    samples = {stage: [] for stage in STAGES}
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, '-c', PROBE.format(app_dir=str(APP_DIR))],
+                                   capture_output=True, text=True)
+        if completed.returncode:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+        timings = json.loads(completed.stdout.strip().splitlines()[-1])
+        for stage in STAGES:
+            samples[stage].append(timings[stage])
+    return {stage: statistics.median(values) for stage, values in samples.items()}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure calculator start-up time to first paint.")
+    parser.add_argument('-n', '--runs', type=int, default=10, help="fresh processes to start (default: 10)")
+    args = parser.parse_args(argv)
+    try:
+        medians = measure(args.runs)
+    except RuntimeError as e:
+        print(f"Could not start the calculator: {e}", file=sys.stderr)
+        return 1
+    print(f"median of {args.runs} runs")
+    for stage in STAGES:
+        print(f"{stage:<26}{medians[stage] * 1e3:>9.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
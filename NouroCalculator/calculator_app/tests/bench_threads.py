@@ -0,0 +1,34 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calculator import evaluate_expression
+
+EXPRESSIONS = [f"sin({i % 50})*x + sqrt({i % 50 + 1})^(2) - {i % 7}!" for i in range(200)]
+EVALUATIONS = 200_000
+THREAD_COUNTS = [1, 2, 4, 8]
+
+
+def work(count: int) -> int:
+    for i in range(count):
+        evaluate_expression(EXPRESSIONS[i % len(EXPRESSIONS)], x=i)
+    return count
+
+
+def main():
+    work(len(EXPRESSIONS))  # warm the shared compile cache
+    print(f"{'threads':>8} {'seconds':>10} {'evals/sec':>12}")
+    for threads in THREAD_COUNTS:
+        share = EVALUATIONS // threads
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            start = time.perf_counter()
+            total = sum(pool.map(work, [share] * threads))
+            elapsed = time.perf_counter() - start
+        print(f"{threads:>8} {elapsed:>10.3f} {total / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
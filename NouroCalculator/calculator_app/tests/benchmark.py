@@ -0,0 +1,172 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calculator import (CalculationError, _compile, _execute, compile_expression,
+                        optimize, parse, tokenize)
+
+# Scenario: (variable values, expressions). Expressions depend on their
+# variables so that optimize() cannot fold them away and the execute and
+# native stages do real work; constant_folding is the exception, on purpose.
+SCENARIOS = {
+    'interactive': ({'x': 0.7}, ["2+3*x", "(x+2)×3", "sqrt(16x)+x^(3)", "sin(π/2*x)", "10÷x-1", "5!-x"]),
+    'long_sum': ({'x': 0.7}, ["+".join(f"{i % 97}.5*x" for i in range(5000))]),
+    'nested_parens': ({'x': 0.7}, ["(" * 2000 + "x+2" + ")" * 2000]),
+    'scientific': ({'x': 0.7}, ["sqrt(2x)*cos(1.2x)+ln(10x)-exp(0.5x)*tan(0.3x)+asin(0.5x)",
+                                "log(1000x)*atan(x)+acos(0.2x)^(2)-sin(e*x)"]),
+    'factorial_power': ({'n': 170, 'x': 2}, ["n!", "(n-150)!^(x)", "x^(1000)", "(n^(4))!",
+                                            "9^(n^(4))"]),
+    'constant_folding': ({}, ["2+3*4", "sqrt(16)+2^(3)", "sin(π/2)", "170!",
+                              "+".join(f"{i % 97}.5" for i in range(500))]),
+}
+
+STAGES = ('tokenize', 'parse', 'optimize', 'execute')
+REGRESSION_THRESHOLD = 0.10
+
+
+def _time_per_call(function, min_time: float) -> float:
+    # Grow the loop count until one run takes at least min_time, then report
+    # the best of three runs divided by the loop count.
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+    best = elapsed
+    for _ in range(2):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / number
+
+
+def _swallow(function, *args):
+    def call():
+        try:
+            function(*args)
+        except (SyntaxError, ValueError, ArithmeticError, CalculationError):
+            pass
+    return call
+
+
+def benchmark_expression(expression: str, values: dict, min_time: float) -> dict:
+    tokens = tokenize(expression)
+    program = parse(tokens)
+    optimized = optimize(program)
+    compiled = _compile(expression)
+    function = compiled.native()
+    arguments = [values[name] for name in compiled.variables]
+    compile_expression(expression)
+    timings = {
+        'tokenize': _time_per_call(_swallow(tokenize, expression), min_time),
+        'parse': _time_per_call(_swallow(parse, tokens), min_time),
+        'optimize': _time_per_call(_swallow(optimize, program), min_time),
+        'execute': _time_per_call(_swallow(_execute, optimized, values), min_time),
+    }
+    uncached = _time_per_call(_swallow(lambda: _compile(expression).evaluate(values)), min_time)
+    cached = _time_per_call(_swallow(lambda: compile_expression(expression).evaluate(values)), min_time)
+    evaluated = _time_per_call(_swallow(compiled.evaluate, values), min_time)
+    native = _time_per_call(_swallow(function, *arguments), min_time)
+    return {
+        'stages': timings,
+        'ops_per_sec_uncached': 1 / uncached,
+        'ops_per_sec_cached': 1 / cached,
+        'ops_per_sec_compiled': 1 / evaluated,
+        'ops_per_sec_native': 1 / native,
+    }
+
+
+def run(min_time: float) -> dict:
+    results = {}
+    for scenario, (values, expressions) in SCENARIOS.items():
+        per_expression = [benchmark_expression(expression, values, min_time)
+                          for expression in expressions]
+        count = len(per_expression)
+        results[scenario] = {
+            'stages': {stage: sum(r['stages'][stage] for r in per_expression) / count
+                       for stage in STAGES},
+            **{metric: sum(r[metric] for r in per_expression) / count
+               for metric in ('ops_per_sec_uncached', 'ops_per_sec_cached', 'ops_per_sec_compiled',
+                              'ops_per_sec_native')},
+        }
+    return {'meta': _metadata(), 'results': results}
+
+
+def _metadata() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+    }
+
+
+def print_report(report: dict):
+    print(f"{'scenario':<16}" + "".join(f"{stage + ' us':>13}" for stage in STAGES)
+          + f"{'uncached/s':>13}{'cached/s':>13}{'native/s':>13}")
+    for scenario, result in report['results'].items():
+        stages = "".join(f"{result['stages'][stage] * 1e6:>13.2f}" for stage in STAGES)
+        print(f"{scenario:<16}{stages}{result['ops_per_sec_uncached']:>13.0f}"
+              f"{result['ops_per_sec_cached']:>13.0f}{result['ops_per_sec_native']:>13.0f}")
+
+
+def compare(report: dict, baseline: dict) -> int:
+    # Stage timings regress when they grow; throughputs when they shrink.
+    regressions = 0
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for scenario, result in report['results'].items():
+        previous = baseline['results'].get(scenario)
+        if previous is None:
+            continue
+        changes = [(f"{stage} time", result['stages'][stage], previous['stages'][stage], True)
+                   for stage in STAGES if stage in previous['stages']]
+        changes += [(metric, result[metric], previous[metric], False)
+                    for metric in ('ops_per_sec_uncached', 'ops_per_sec_cached') if metric in previous]
+        for name, now, before, lower_is_better in changes:
+            if not before:
+                continue
+            change = (now - before) / before
+            worse = change > REGRESSION_THRESHOLD if lower_is_better else change < -REGRESSION_THRESHOLD
+            if worse:
+                regressions += 1
+            print(f"  {'REGRESSION' if worse else 'ok':<10} {scenario:<16} {name:<22} {change:+.1%}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the CalculatorEngine pipeline.")
+    parser.add_argument('-o', '--output', type=Path, help="write the results to this JSON file")
+    parser.add_argument('-c', '--compare', type=Path, help="JSON results of an earlier run")
+    parser.add_argument('--quick', action='store_true', help="shorter timing runs, for smoke tests")
+    args = parser.parse_args(argv)
+
+    report = run(0.02 if args.quick else 0.2)
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding='utf-8')
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        return 1 if compare(report, baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
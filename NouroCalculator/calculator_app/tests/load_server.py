@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server import EvaluationServer
+
+EXPRESSIONS = [f"sin({i % 50})*{i} + sqrt({i % 50 + 1})^(2) - {i % 7}!" for i in range(200)]
+# A slow one now and then, so the worker pool is exercised as well.
+HEAVY = "+".join(f"{i % 9}!" for i in range(1500))
+
+
+async def client(host: str, port: int, requests: int, heavy_every: int, latencies: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(requests):
+            expression = HEAVY if heavy_every and i % heavy_every == heavy_every - 1 \
+                else EXPRESSIONS[i % len(EXPRESSIONS)]
+            body = json.dumps({'expression': expression}).encode()
+            start = time.perf_counter()
+            writer.write(f"POST /evaluate HTTP/1.1\r\nHost: {host}\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = next(int(line.split(b":", 1)[1]) for line in head.split(b"\r\n")
+                          if line.lower().startswith(b"content-length:"))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run(host: str, port: int, connections: int, requests: int, heavy_every: int) -> int:
+    latencies: list = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, requests, heavy_every, latencies)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e3
+    print(f"{len(latencies)} requests over {connections} connections in {elapsed:.2f} s")
+    print(f"{'requests/sec':<14}{len(latencies) / elapsed:>10.0f}")
+    print(f"{'p50':<14}{percentile(0.50):>10.2f} ms")
+    print(f"{'p99':<14}{percentile(0.99):>10.2f} ms")
+    print(f"{'mean':<14}{statistics.fmean(latencies) * 1e3:>10.2f} ms")
+    return len(latencies)
+
+
+async def run_local(args) -> int:
+    async with EvaluationServer(port=0, workers=args.workers) as server:
+        await run(server.host, server.port, args.connections, args.requests, args.heavy_every)
+        print(f"{'batches':<14}{server.batcher.batches:>10}")
+        print(f"{'offloaded':<14}{server.batcher.offloaded:>10}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the evaluation server.")
+    parser.add_argument('url', nargs='?', help="server to target, e.g. http://127.0.0.1:8765 "
+                                               "(default: start one in this process)")
+    parser.add_argument('-c', '--connections', type=int, default=50,
+                        help="concurrent keep-alive connections (default: 50)")
+    parser.add_argument('-n', '--requests', type=int, default=200,
+                        help="requests per connection (default: 200)")
+    parser.add_argument('--heavy-every', type=int, default=100,
+                        help="every Nth request is a long expression; 0 disables (default: 100)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes for a local server (default: CPU count)")
+    args = parser.parse_args(argv)
+    if args.url is None:
+        return asyncio.run(run_local(args))
+    target = urlsplit(args.url)
+    asyncio.run(run(target.hostname, target.port or 80, args.connections, args.requests, args.heavy_every))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
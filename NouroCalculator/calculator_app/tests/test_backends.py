@@ -0,0 +1,193 @@
+import math
+import random
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+from unittest import mock
+
+import calculator
+from backends import ComplexBackend, DecimalBackend, FractionBackend, Interval, IntervalBackend
+from calculator import CalculatorEngine, CalculationError, compile_expression
+
+class TestDecimalBackend(unittest.TestCase):
+    def test_no_float_rounding(self):
+        compiled = compile_expression("0.1+0.2")
+        self.assertEqual(compiled.program, (('num', 0.1 + 0.2),))
+        self.assertEqual(compiled.evaluate(backend=DecimalBackend()), Decimal('0.3'))
+        self.assertEqual(compiled.evaluate(), 0.1 + 0.2)
+
+    def test_precision(self):
+        third = compile_expression("1/3").evaluate(backend=DecimalBackend(precision=50))
+        self.assertEqual(third, Decimal('0.' + '3' * 50))
+        self.assertEqual(compile_expression("19.99*3").evaluate(backend=DecimalBackend()), Decimal('59.97'))
+
+    def test_long_literals(self):
+        backend = DecimalBackend(precision=50)
+        for expression, expected in [("10000000000000001 + 1", Decimal('10000000000000002')),
+                                     ("123456789012345678.25 - 123456789012345678", Decimal('0.25')),
+                                     ("0.12345678901234567890123*10", Decimal('1.2345678901234567890123'))]:
+            self.assertEqual(compile_expression(expression).evaluate(backend=backend), expected,
+                             msg=expression)
+
+    def test_functions_match_float(self):
+        backend = DecimalBackend()
+        for name in ('sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'sqrt', 'log', 'ln', 'exp'):
+            for value in (0.1, 0.5, 0.9, 3.5, 12.0):
+                try:
+                    expected = calculator.FUNCTION_MAP[name](value)
+                except ValueError:
+                    with self.assertRaises(CalculationError):
+                        compile_expression(f"{name}({value})").evaluate(backend=backend)
+                    continue
+                result = compile_expression(f"{name}({value})").evaluate(backend=backend)
+                self.assertAlmostEqual(float(result), expected, places=12, msg=f"{name}({value})")
+
+    def test_errors_match_float(self):
+        backend = DecimalBackend()
+        for expression, cause in [("1/0", ZeroDivisionError), ("sqrt(-1)", ValueError),
+                                  ("(-8)^(1/3)", ValueError), ("99999!", OverflowError),
+                                  ("10^(99999)", OverflowError), ("2.5!", ValueError)]:
+            with self.assertRaises(CalculationError, msg=expression) as caught:
+                compile_expression(expression).evaluate(backend=backend)
+            self.assertIsInstance(caught.exception.__cause__, cause)
+
+class TestFractionBackend(unittest.TestCase):
+    def test_exact_where_possible(self):
+        backend = FractionBackend()
+        for expression, expected in [("1/3*3", Fraction(1)), ("0.1+0.2", Fraction(3, 10)),
+                                     ("sqrt(9/4)", Fraction(3, 2)), ("4^(1/2)", Fraction(2)),
+                                     ("2^(-3)", Fraction(1, 8)), ("log(1000)", Fraction(3)),
+                                     ("25!", Fraction(math.factorial(25)))]:
+            result = compile_expression(expression).evaluate(backend=backend)
+            self.assertIsInstance(result, Fraction, msg=expression)
+            self.assertEqual(result, expected, msg=expression)
+
+    def test_long_literals(self):
+        backend = FractionBackend()
+        for expression, expected in [("10000000000000001 + 1", Fraction(10000000000000002)),
+                                     ("123456789012345678.25 - 123456789012345678", Fraction(1, 4)),
+                                     ("x - 0.333333333333333333333", Fraction(1, 3 * 10 ** 21))]:
+            result = compile_expression(expression).evaluate(backend=backend, x=Fraction(1, 3))
+            self.assertEqual(result, expected, msg=expression)
+
+    def test_falls_back_to_float(self):
+        result = compile_expression("sqrt(2)+1/2").evaluate(backend=FractionBackend())
+        self.assertIsInstance(result, float)
+        self.assertAlmostEqual(result, math.sqrt(2) + 0.5)
+
+    def test_irrational_constants_stay_float(self):
+        backend = FractionBackend()
+        for expression, expected in [("e^(2)", math.e ** 2), ("2*pi", 2 * math.pi), ("pi-pi", 0.0)]:
+            result = compile_expression(expression).evaluate(backend=backend)
+            self.assertIsInstance(result, float, msg=expression)
+            self.assertAlmostEqual(result, expected, msg=expression)
+        self.assertEqual(compile_expression("3.14159*2").evaluate(backend=backend), Fraction(314159, 50000))
+
+    def test_division_by_zero(self):
+        with self.assertRaises(CalculationError) as caught:
+            compile_expression("1/(3-3)").evaluate(backend=FractionBackend())
+        self.assertEqual(str(caught.exception), "division by zero")
+
+class TestComplexBackend(unittest.TestCase):
+    def test_principal_values(self):
+        backend = ComplexBackend()
+        cases = {"sqrt(-1)": 1j, "sqrt(-4)*2": 4j, "ln(-1)": math.pi * 1j, "(-1)^(0.5)": 1j}
+        for expression, expected in cases.items():
+            result = compile_expression(expression).evaluate(backend=backend)
+            self.assertAlmostEqual(result, expected, msg=expression)
+        self.assertAlmostEqual(compile_expression("asin(2)").evaluate(backend=backend).imag,
+                               math.log(2 + math.sqrt(3)))
+
+    def test_real_fast_path(self):
+        backend = ComplexBackend()
+        compiled = compile_expression("sqrt(x)+1")
+        with mock.patch.object(ComplexBackend, 'number', side_effect=AssertionError):
+            self.assertEqual(compiled.evaluate(x=9, backend=backend), 4.0)
+        self.assertEqual(compiled.evaluate(x=-9, backend=backend), 1 + 3j)
+        self.assertAlmostEqual(compiled.evaluate(x=2j, backend=backend), 2 + 1j)
+
+    def test_errors(self):
+        backend = ComplexBackend()
+        for expression in ("1/0", "(-1)!", "2^(100000)", "0^(-1)"):
+            with self.assertRaises(CalculationError, msg=expression):
+                compile_expression(expression).evaluate(backend=backend)
+
+class TestIntervalBackend(unittest.TestCase):
+    def evaluate(self, expression, **values):
+        return compile_expression(expression).evaluate(backend=IntervalBackend(), **values)
+
+    def test_exact_results_stay_points(self):
+        self.assertEqual(self.evaluate("2+2*3"), Interval(8.0, 8.0))
+        self.assertEqual(self.evaluate("sqrt(16)"), Interval(4.0, 4.0))
+        self.assertEqual(self.evaluate("x^2", x=(2, 3)), Interval(4.0, 9.0))
+        self.assertEqual(self.evaluate("x^2", x=(-2, 1)), Interval(0.0, 4.0))
+
+    def test_inexact_literals_and_constants_are_enclosed(self):
+        result = self.evaluate("0.1+0.2")
+        self.assertIn(Fraction(3, 10), Interval(Fraction(result.low), Fraction(result.high)))
+        self.assertLess(result.low, 0.3)
+        self.assertLess(0.3, result.high)
+        self.assertIn(math.pi, self.evaluate("pi"))
+        self.assertIn(0.0, self.evaluate("sin(pi)"))
+
+    def test_long_literals_are_enclosed(self):
+        result = self.evaluate("123456789012345678.25 - 123456789012345678")
+        self.assertIn(0.25, result)
+        self.assertIn(2.0, self.evaluate("10000000000000001 + 1 - 1e16"))
+
+    def test_bounds_contain_every_point(self):
+        expressions = ["x*y-x/y", "sin(x)*cos(y)", "exp(x)-ln(y)", "x^(3)+sqrt(y)", "atan(x)/y",
+                       "tan(x/4)", "y^(x)", "(x-y)^2"]
+        rng = random.Random(7)
+        x, y = Interval(-1.5, 0.5), Interval(0.25, 2.0)
+        for expression in expressions:
+            bounds = self.evaluate(expression, x=x, y=y)
+            compiled = compile_expression(expression)
+            for _ in range(200):
+                point = {'x': rng.uniform(x.low, x.high), 'y': rng.uniform(y.low, y.high)}
+                self.assertIn(compiled.evaluate(point), bounds, msg=expression)
+
+    def test_periodic_extremes(self):
+        self.assertEqual(self.evaluate("sin(x)", x=(1, 2)).high, 1.0)
+        self.assertEqual(self.evaluate("cos(x)", x=(3, 4)).low, -1.0)
+        self.assertEqual(self.evaluate("sin(x)", x=(0, 10)), Interval(-1.0, 1.0))
+
+    def test_errors(self):
+        for expression, values in (("1/x", {'x': (-1, 1)}), ("sqrt(x)", {'x': (-1, 1)}),
+                                   ("tan(x)", {'x': (1, 2)}), ("x^(0.5)", {'x': (-1, 1)}),
+                                   ("x!", {'x': (0.2, 0.8)})):
+            with self.assertRaises(CalculationError, msg=expression):
+                self.evaluate(expression, **values)
+        with self.assertRaises(ValueError):
+            Interval(2.0, 1.0)
+
+class TestEngineBackends(unittest.TestCase):
+    def test_one_compiled_expression_for_all_backends(self):
+        compiled = compile_expression("x*0.1+2^(-1)")
+        with mock.patch.object(calculator, 'parse', side_effect=AssertionError):
+            self.assertAlmostEqual(compiled.evaluate(x=3), 0.8)
+            self.assertEqual(compiled.evaluate(x=3, backend=DecimalBackend()), Decimal('0.8'))
+            self.assertEqual(compiled.evaluate(x=3, backend=FractionBackend()), Fraction(4, 5))
+
+    def test_engine_backend_by_name(self):
+        calc = CalculatorEngine(backend='decimal')
+        calc.current_expression = "1.1*1.1"
+        self.assertEqual(calc.evaluate(), Decimal('1.21'))
+        self.assertEqual(calc.get_history()[0], ("1.1*1.1", Decimal('1.21')))
+        self.assertIsInstance(CalculatorEngine(backend='fraction').backend, FractionBackend)
+        calc = CalculatorEngine(backend='complex')
+        calc.current_expression = "sqrt(-9)"
+        self.assertEqual(calc.evaluate(), 3j)
+        self.assertIsNone(CalculatorEngine().backend)
+
+    def test_batch_uses_engine_backend(self):
+        result = CalculatorEngine(backend='decimal').evaluate_batch("x/3+0.1", x=[1.5, 3.0, 0.0])
+        self.assertEqual(result, [Decimal('0.6'), Decimal('1.1'), Decimal('0.1')])
+        result = CalculatorEngine(backend='fraction').evaluate_batch("1/x", {'x': [Fraction(1, 3), 0]})
+        self.assertEqual(result[0], Fraction(3))
+        self.assertTrue(math.isnan(result[1]))
+        result = CalculatorEngine(backend='interval').evaluate_batch("x*y", x=[Interval(1.0, 2.0)], y=3)
+        self.assertEqual(result, [Interval(3.0, 6.0)])
+
+if __name__ == "__main__":
+    unittest.main()
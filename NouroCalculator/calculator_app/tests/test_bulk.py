@@ -0,0 +1,38 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+from bulk import evaluate_bulk, main
+from calculator import CalculationError
+
+class TestBulkEvaluation(unittest.TestCase):
+    EXPRESSIONS = ["1+1", "2*3", "1/0", "sqrt(16)", "2++3", "5!"]
+
+    def check_results(self, results):
+        self.assertEqual([r.expression for r in results], self.EXPRESSIONS)
+        self.assertEqual([r.value for r in results if r.ok], [2.0, 6.0, 4.0, 120.0])
+        failed = [r for r in results if not r.ok]
+        self.assertEqual([r.expression for r in failed], ["1/0", "2++3"])
+        for result in failed:
+            self.assertIsInstance(result.error, CalculationError)
+            self.assertIsNone(result.value)
+
+    def test_serial(self):
+        self.check_results(list(evaluate_bulk(self.EXPRESSIONS, workers=1, chunk_size=4)))
+
+    def test_process_pool_preserves_order(self):
+        self.check_results(list(evaluate_bulk(iter(self.EXPRESSIONS), workers=2, chunk_size=1)))
+
+    def test_blank_lines_are_skipped(self):
+        out = io.StringIO()
+        with mock.patch('sys.stdin', io.StringIO("1+1\n\n   \n2*3\n")), redirect_stdout(out):
+            status = main(['-w', '1'])
+        self.assertEqual(status, 0)
+        self.assertEqual(out.getvalue().splitlines(), ["1+1\t2.0", "2*3\t6.0"])
+
+    def test_invalid_chunk_size(self):
+        with self.assertRaises(ValueError):
+            evaluate_bulk(self.EXPRESSIONS, chunk_size=0)
+
+if __name__ == "__main__":
+    unittest.main()
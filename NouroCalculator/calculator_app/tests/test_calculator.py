@@ -1,6 +1,12 @@
 import unittest
 import math
-from calculator import CalculatorEngine, CalculationError
+import tracemalloc
+from unittest import mock
+import calculator
+from concurrent.futures import ThreadPoolExecutor
+from calculator import (CalculatorEngine, CalculationError, CompiledExpression, Token, TokenList, tokenize,
+                        IncrementalTokenizer, EvaluationLimits, MemoizedFunction, Workspace,
+                        compile_expression, evaluate_expression)
 
 class TestCalculatorEngine(unittest.TestCase):
     def setUp(self):
@@ -113,5 +119,492 @@ class TestCalculatorEngine(unittest.TestCase):
         self.assertEqual(history[0][0], "3*4")
         self.assertEqual(history[1][0], "2+2")
 
+class TestTokenizer(unittest.TestCase):
+    def test_typed_tokens_with_offsets(self):
+        self.assertEqual(tokenize("12 × (x-3)"), [
+            Token('number', 12.0, 0),
+            Token('operator', '*', 3),
+            Token('paren', '(', 5),
+            Token('name', 'x', 6),
+            Token('operator', '-', 7),
+            Token('number', 3.0, 8),
+            Token('paren', ')', 9),
+        ])
+
+    def test_token_list_is_compact(self):
+        expression = "+".join(f"{i}*x" for i in range(20000))
+        tracemalloc.start()
+        try:
+            tokens = tokenize(expression)
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(tokens), 79999)
+        self.assertLess(size / len(tokens), 32)
+
+    def test_token_list_round_trip(self):
+        tokens = TokenList([Token('name', 'x', 0), Token('operator', '^', 1), Token('number', 2.0, 2)])
+        copied = tokens.copy()
+        del tokens[1:]
+        self.assertEqual(tokens, [Token('name', 'x', 0)])
+        self.assertEqual(copied[-1], Token('number', 2.0, 2))
+        self.assertEqual(list(copied.rows()), [('name', 'x', 0), ('operator', '^', 1), ('number', 2.0, 2)])
+
+    def test_implicit_multiplication(self):
+        kinds = [token.value for token in tokenize("2π(1)sin(0)")]
+        self.assertEqual(kinds, [2.0, '*', 'pi', '*', '(', 1.0, ')', '*', 'sin', '(', 0.0, ')'])
+
+    def test_e_inside_names_is_not_replaced(self):
+        calc = CalculatorEngine()
+        calc.current_expression = "exp(1)"
+        self.assertAlmostEqual(calc.evaluate(), math.e)
+        calc.current_expression = "2e"
+        self.assertAlmostEqual(calc.evaluate(), 2 * math.e)
+
+    def test_invalid_input(self):
+        for expression in ["2#3", "1.2.3", "(1", "1)"]:
+            with self.assertRaises(SyntaxError, msg=expression):
+                tokenize(expression)
+
+class TestIncrementalTokenizer(unittest.TestCase):
+    def test_matches_full_tokenize_while_typing(self):
+        tokenizer = IncrementalTokenizer()
+        edits = ["1", "12", "12×", "12×(", "12×(s", "12×(sin(", "12×(sin(2", "12×(sin(2e", "12×(sin(2e+",
+                 "12×(sin(2e+5", "12×(sin(2e+5)", "12×(sin(2e+5))", "12×(sin(2e+5))π", "12×(sin(2e+5))",
+                 "12×(sin(2e5))", "12 (sin(2.5))", "(sin(2.5))"]
+        for text in edits:
+            try:
+                expected = tokenize(text)
+            except SyntaxError:
+                with self.assertRaises(SyntaxError, msg=text):
+                    tokenizer.update(text)
+            else:
+                self.assertEqual(tokenizer.update(text), expected, msg=text)
+
+    def test_only_the_tail_is_rescanned(self):
+        tokenizer = IncrementalTokenizer()
+        text = "+".join(["123"] * 1000)
+        tokenizer.update(text)
+        tokenizer.update(text + "+4")
+        self.assertLess(tokenizer.rescanned, 10)
+
+class TestParser(unittest.TestCase):
+    def setUp(self):
+        self.calc = CalculatorEngine()
+
+    def evaluate(self, expression):
+        return self.calc.compile(expression).evaluate()
+
+    def test_precedence_and_associativity(self):
+        self.assertAlmostEqual(self.evaluate("-2^2"), -4.0)
+        self.assertAlmostEqual(self.evaluate("2^3^2"), 512.0)
+        self.assertAlmostEqual(self.evaluate("2^-1"), 0.5)
+        self.assertAlmostEqual(self.evaluate("10-4-3"), 3.0)
+        self.assertAlmostEqual(self.evaluate("2*-3"), -6.0)
+        self.assertAlmostEqual(self.evaluate("-3!+1"), -5.0)
+
+    def test_deep_nesting(self):
+        depth = 20000
+        self.assertAlmostEqual(self.evaluate("(" * depth + "1" + ")" * depth), 1.0)
+
+    def test_long_sum(self):
+        self.assertAlmostEqual(self.evaluate("+".join(["1"] * 50000)), 50000.0)
+
+    def test_malformed_expressions(self):
+        for expression in ["2+", "()", "(1+2))", "((1)", "sqrt", "*2", "2!!("]:
+            with self.assertRaises(CalculationError, msg=expression):
+                self.calc.compile(expression)
+
+class TestCompiledExpressions(unittest.TestCase):
+    def setUp(self):
+        self.calc = CalculatorEngine(cache_size=2)
+
+    def test_compile_returns_reusable_expression(self):
+        compiled = self.calc.compile("(2+3)*4")
+        self.assertIsInstance(compiled, CompiledExpression)
+        self.assertAlmostEqual(compiled.evaluate(), 20.0)
+        self.assertAlmostEqual(compiled.evaluate(), 20.0)
+        with self.assertRaises(AttributeError):
+            compiled.source = "1+1"
+
+    def test_cache_hits_and_misses(self):
+        first = self.calc.compile("2+3")
+        second = self.calc.compile("2+3")
+        self.assertIs(first, second)
+        info = self.calc.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+
+    def test_cache_eviction(self):
+        self.calc.compile("1+1")
+        self.calc.compile("2+2")
+        self.calc.compile("1+1")
+        self.calc.compile("3+3")
+        info = self.calc.cache_info()
+        self.assertEqual(info.currsize, 2)
+        self.calc.compile("1+1")
+        self.calc.compile("2+2")
+        self.assertEqual(self.calc.cache_info().misses, 4)
+
+    def test_compile_errors(self):
+        with self.assertRaises(CalculationError):
+            self.calc.compile("2++3")
+        self.assertEqual(self.calc.cache_info().currsize, 0)
+
+    def test_evaluate_uses_cache(self):
+        self.calc.current_expression = "6*7"
+        self.calc.evaluate()
+        self.calc.evaluate()
+        self.assertEqual(self.calc.cache_info().hits, 1)
+
+class TestNativeTier(unittest.TestCase):
+    EXPRESSIONS = ["x*2+1", "sin(x)^(2)+cos(x)^(2)", "-(x-y)/y", "(x+3)!/y", "sqrt(x)*pi-e",
+                   "+".join(["x"] * 500), "(" * 150 + "x+1" + ")" * 150]
+
+    def test_matches_interpreter(self):
+        for expression in self.EXPRESSIONS:
+            compiled = calculator._compile(expression)
+            native = compiled.native()
+            for x, y in ((2.0, 3.0), (1.0, -0.5)):
+                values = {'x': x, 'y': y}
+                arguments = [values[name] for name in compiled.variables]
+                self.assertEqual(native(*arguments), calculator._execute(compiled.program, values),
+                                 msg=expression)
+
+    def test_errors_match_interpreter(self):
+        for expression, values in (("x/(y-y)", {'x': 1.0, 'y': 2.0}), ("sqrt(x)", {'x': -1.0}),
+                                   ("(x)!", {'x': 200.0}), ("x^(y)", {'x': 10.0, 'y': 400.0})):
+            compiled = calculator._compile(expression)
+            with self.assertRaises(CalculationError) as interpreted:
+                compiled.evaluate(values)
+            native = compiled.native()
+            with self.assertRaises(CalculationError) as generated:
+                compiled.evaluate(values)
+            self.assertIs(compiled._tier.binding[2], native)
+            self.assertEqual(str(generated.exception), str(interpreted.exception))
+
+    def test_tiers_up_after_threshold(self):
+        compiled = calculator._compile("x*x+1")
+        with mock.patch.object(calculator, 'NATIVE_THRESHOLD', 3):
+            for x in range(2):
+                compiled.evaluate(x=x)
+            self.assertIsNone(compiled._tier.code)
+            self.assertEqual(compiled.evaluate(x=3.0), 10.0)
+            self.assertIsNotNone(compiled._tier.code)
+            with self.assertRaises(CalculationError):
+                compiled.evaluate(y=1.0)
+
+    def test_limits_and_functions_are_bound(self):
+        compiled = calculator._compile("x!+sin(x)")
+        lenient = EvaluationLimits(overflow='inf')
+        self.assertEqual(compiled.native(limits=lenient)(200.0), math.inf)
+        functions = {**calculator.FUNCTION_MAP, 'sin': lambda value: 0.0}
+        self.assertEqual(compiled.native(functions)(3.0), 6.0)
+        memoized = calculator.memoized_functions(8)
+        with mock.patch.object(calculator, 'NATIVE_THRESHOLD', 1):
+            self.assertEqual(compiled.evaluate(x=3.0, functions=memoized), 6.0 + math.sin(3.0))
+        self.assertEqual(memoized['sin'].misses, 1)
+
+    def test_source_contains_no_expression_text(self):
+        compiled = calculator._compile("__import__*secret+sin(-2.5)")
+        source = calculator._generate(compiled.program, compiled.variables).source
+        self.assertNotIn("__import__", source)
+        self.assertNotIn("secret", source)
+        self.assertNotIn("sin", source)
+        self.assertEqual(compiled.native()(2.0, 3.0), 6.0 + math.sin(-2.5))
+
+class TestOptimizer(unittest.TestCase):
+    def program(self, expression):
+        return CalculatorEngine(cache_size=0).compile(expression).program
+
+    def test_constant_subtrees_are_folded(self):
+        self.assertEqual(self.program("2*pi*x"), (('num', 2 * math.pi), ('var', 'x'), ('mul', None)))
+        self.assertEqual(self.program("sqrt(2)+5!"), (('num', math.sqrt(2) + 120.0),))
+
+    def test_identities(self):
+        for expression in ["x*1", "1*x", "x+0", "0+x", "x-0", "x/1", "x^1", "--x", "0-(0-x)"]:
+            self.assertEqual(self.program(expression), (('var', 'x'),), msg=expression)
+        self.assertEqual(self.program("0-x"), (('var', 'x'), ('neg', None)))
+
+    def test_errors_are_kept_for_evaluation(self):
+        compiled = CalculatorEngine(cache_size=0).compile("sqrt(-1)+x")
+        self.assertEqual(len(compiled.program), 4)
+        with self.assertRaises(CalculationError):
+            compiled.evaluate(x=1)
+
+    def test_dump(self):
+        dump = compile_expression("2*pi*x").dump()
+        self.assertEqual(dump.splitlines(), ["# 2*pi*x", "   0  num   6.283185307179586",
+                                             "   1  var   x", "   2  mul"])
+
+class TestEvaluationLimits(unittest.TestCase):
+    def test_huge_operands_fail_fast(self):
+        for expression in ["999999999999!", "9^(99999999)", "171!", "x!"]:
+            with self.assertRaisesRegex(CalculationError, "Result too large", msg=expression):
+                evaluate_expression(expression, x=10 ** 9)
+
+    def test_overflow_to_infinity(self):
+        limits = EvaluationLimits(overflow='inf')
+        self.assertEqual(evaluate_expression("x!", limits, x=1000), math.inf)
+        self.assertEqual(compile_expression("9^(x)").evaluate(limits=limits, x=1e8), math.inf)
+
+    def test_engine_limits(self):
+        calc = CalculatorEngine(limits=EvaluationLimits(max_factorial=20, max_power_digits=50))
+        calc.current_expression = "20!"
+        self.assertEqual(calc.evaluate(), float(math.factorial(20)))
+        for expression in ["21!", "10^(51)"]:
+            calc.current_expression = expression
+            with self.assertRaises(CalculationError, msg=expression):
+                calc.evaluate()
+
+    def test_constants_folded_under_other_limits(self):
+        strict = EvaluationLimits(max_factorial=50, max_power_digits=10)
+        for expression in ["100!", "10^(50)", "2*10^(50)+x"]:
+            self.assertGreaterEqual(evaluate_expression(expression, x=1), 1e50)
+            with self.assertRaisesRegex(CalculationError, "Result too large", msg=expression):
+                evaluate_expression(expression, strict, x=1)
+        with self.assertRaises(OverflowError):
+            compile_expression("2*10^(50)+x").native(limits=strict)(1.0)
+        self.assertEqual(evaluate_expression("10^(5)+1", strict), 100001.0)
+
+    def test_infinite_exponents(self):
+        for expression in ["2^(1e400)", "0.5^(-1e400)"]:
+            with self.assertRaisesRegex(CalculationError, "Result too large", msg=expression):
+                evaluate_expression(expression)
+        self.assertEqual(evaluate_expression("2^(1e400)", EvaluationLimits(overflow='inf')), math.inf)
+        self.assertEqual(evaluate_expression("0.5^(1e400)"), 0.0)
+        self.assertEqual(evaluate_expression("1^(1e400)"), 1.0)
+
+    def test_batch_uses_engine_limits(self):
+        calc = CalculatorEngine(limits=EvaluationLimits(max_factorial=5, max_power_digits=10))
+        for numpy in (calculator.np, None):
+            with mock.patch.object(calculator, 'np', numpy):
+                factorials = list(calc.evaluate_batch("x!", x=[6.0, 3.0]))
+                powers = list(calc.evaluate_batch("10^(x)", x=[50.0, 2.0]))
+            self.assertTrue(math.isnan(factorials[0]))
+            self.assertEqual(factorials[1], 6.0)
+            self.assertTrue(math.isnan(powers[0]))
+            self.assertEqual(powers[1], 100.0)
+
+    def test_negative_base_with_fractional_exponent(self):
+        self.assertEqual(evaluate_expression("(-2)^(3)"), -8.0)
+        with self.assertRaises(CalculationError):
+            evaluate_expression("(-8)^(1/3)")
+
+    def test_invalid_overflow_mode(self):
+        with self.assertRaises(ValueError):
+            EvaluationLimits(overflow='wrap')
+
+class TestMemoization(unittest.TestCase):
+    def test_memoized_function(self):
+        calls = []
+
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        memo = MemoizedFunction(square, maxsize=2)
+        self.assertEqual([memo(v) for v in (2.0, 3.0, 2.0, 4.0, 3.0)], [4.0, 9.0, 4.0, 16.0, 9.0])
+        self.assertEqual(calls, [2.0, 3.0, 4.0, 3.0])
+        self.assertEqual((memo.hits, memo.misses), (1, 4))
+        self.assertAlmostEqual(memo.hit_rate, 0.2)
+
+    def test_signed_zero_is_not_shared(self):
+        memo = MemoizedFunction(math.sin)
+        self.assertEqual(math.copysign(1, memo(0.0)), 1.0)
+        self.assertEqual(math.copysign(1, memo(-0.0)), -1.0)
+
+    def test_engine_memo(self):
+        calc = CalculatorEngine(memo_size=16)
+        compiled = calc.compile("sqrt(x)+ln(x)")
+        for x in (4, 9, 4, 4):
+            compiled.evaluate(functions=calc.functions, x=x)
+        hits, misses, rate = calc.memo_info()['sqrt']
+        self.assertEqual((hits, misses), (2, 2))
+        self.assertEqual(CalculatorEngine().memo_info(), {})
+
+    def test_factorial_table(self):
+        for n in (0, 1, 5, 20, 170):
+            self.assertEqual(evaluate_expression(f"{n}!"), float(math.factorial(n)))
+        self.assertEqual(evaluate_expression("x!", x=170), float(math.factorial(170)))
+
+class TestStatelessEvaluation(unittest.TestCase):
+    def test_evaluate_expression(self):
+        self.assertAlmostEqual(evaluate_expression("2*(3+4)"), 14.0)
+        self.assertAlmostEqual(evaluate_expression("x^(2)", x=3), 9.0)
+        with self.assertRaises(CalculationError):
+            evaluate_expression("1/0")
+
+    def test_engines_share_compiled_expressions(self):
+        compiled = compile_expression("7*6+1")
+        self.assertIs(CalculatorEngine().compile("7*6+1"), compiled)
+
+    def test_concurrent_evaluation(self):
+        expressions = [f"{i}*x+sqrt({i})" for i in range(50)]
+
+        def work(x):
+            return [evaluate_expression(expr, x=x) for expr in expressions]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(work, range(32)))
+        for x, values in enumerate(results):
+            self.assertEqual(values, [i * x + math.sqrt(i) for i in range(50)])
+
+class TestBatchEvaluation(unittest.TestCase):
+    def setUp(self):
+        self.calc = CalculatorEngine()
+
+    def test_free_variables(self):
+        compiled = self.calc.compile("x^2 + rate*x")
+        self.assertEqual(compiled.variables, ('x', 'rate'))
+        self.assertAlmostEqual(compiled.evaluate(x=3, rate=0.5), 10.5)
+        with self.assertRaises(CalculationError):
+            compiled.evaluate(x=3)
+
+    def test_unknown_function(self):
+        with self.assertRaisesRegex(CalculationError, "Unknown function 'invalid'"):
+            self.calc.compile("invalid(5)")
+
+    @unittest.skipIf(calculator._load_numpy() is None, "NumPy is not installed")
+    def test_numpy_columns(self):
+        np = calculator.np
+        x = np.linspace(0, 1, 101)
+        result = self.calc.evaluate_batch("sin(x)*rate + x!", chunk_size=7, x=x, rate=2.0)
+        expected = [math.sin(v) * 2.0 + (math.factorial(int(v)) if v.is_integer() else math.nan)
+                    for v in x.tolist()]
+        np.testing.assert_allclose(result, expected)
+
+    @unittest.skipIf(calculator._load_numpy() is None, "NumPy is not installed")
+    def test_numpy_output_buffer_and_invalid_rows(self):
+        np = calculator.np
+        out = np.zeros(3)
+        result = self.calc.evaluate_batch("sqrt(x)/x", out=out, x=[4.0, -1.0, 0.0])
+        self.assertIs(result, out)
+        self.assertAlmostEqual(result[0], 0.5)
+        self.assertTrue(math.isnan(result[1]))
+        self.assertTrue(math.isnan(result[2]))
+
+    def test_pure_python_fallback(self):
+        with mock.patch.object(calculator, 'np', None):
+            result = self.calc.evaluate_batch("x*y + 1", x=[1, 2, 3], y=2)
+            self.assertEqual(result, [3.0, 5.0, 7.0])
+            result = self.calc.evaluate_batch("1/x", x=[0, 2])
+            self.assertTrue(math.isnan(result[0]))
+            self.assertEqual(result[1], 0.5)
+
+    def test_paths_agree_on_failed_rows(self):
+        # NumPy when installed, and the pure-Python fallback.
+        cases = [("1/x", [0.0, 2.0]), ("x!", [171.0, 3.0, 2.5]), ("10^(x)", [400.0, 2.0]),
+                 ("ln(x)", [0.0, -1.0, 1.0]), ("exp(x)", [1000.0, 0.0]), ("x*1e308", [10.0, 1.0])]
+        for expression, x in cases:
+            expected = []
+            for value in x:
+                try:
+                    expected.append(compile_expression(expression).evaluate(x=value))
+                except CalculationError:
+                    expected.append(math.nan)
+            results = [list(self.calc.evaluate_batch(expression, {'x': x}))]
+            with mock.patch.object(calculator, 'np', None):
+                results.append(self.calc.evaluate_batch(expression, {'x': x}))
+            for result in results:
+                self.assertEqual(len(result), len(x))
+                for value, wanted in zip(result, expected):
+                    if math.isnan(wanted):
+                        self.assertTrue(math.isnan(value), msg=expression)
+                    else:
+                        self.assertEqual(value, wanted, msg=expression)
+
+    def test_batch_after_define(self):
+        self.calc.define("rate = 2")
+        self.calc.define("f(x) = x^(2)+rate")
+        for numpy in (calculator.np, None):
+            with mock.patch.object(calculator, 'np', numpy):
+                self.assertEqual(list(self.calc.evaluate_batch("f(x)", x=[1, 2])), [3.0, 6.0])
+                self.assertEqual(list(self.calc.evaluate_batch("x*rate", x=[1, 2])), [2.0, 4.0])
+                self.assertEqual(list(self.calc.evaluate_batch("x*rate", x=[1, 2], rate=3)), [3.0, 6.0])
+        with self.assertRaisesRegex(CalculationError, "Unknown function 'g'"):
+            self.calc.evaluate_batch("g(x)", x=[1, 2])
+
+    def test_columns_named_like_arguments(self):
+        result = self.calc.evaluate_batch("out + chunk_size", {'out': [1.0, 2.0], 'chunk_size': 3.0})
+        self.assertEqual(list(result), [4.0, 5.0])
+
+class TestWorkspace(unittest.TestCase):
+    def setUp(self):
+        self.workspace = Workspace()
+        self.workspace.set('price', 100.0)
+        self.workspace.define("rate = 0.25")
+        self.workspace.define("f(x) = x^(2)+1")
+        self.workspace.define("total = price*(1+rate)")
+        self.workspace.define("squared = f(total)")
+        self.workspace.define("unrelated = 2*3")
+
+    def test_values(self):
+        self.assertEqual(self.workspace.values(), {
+            'price': 100.0, 'rate': 0.25, 'total': 125.0, 'squared': 15626.0, 'unrelated': 6.0})
+        self.assertEqual(self.workspace.evaluate("f(2)*rate"), 1.25)
+
+    def test_only_dependents_are_recomputed(self):
+        self.workspace.values()
+        self.assertEqual(self.workspace.recomputed, 4)
+        self.workspace.set('price', 200.0)
+        self.assertEqual(self.workspace['squared'], 62501.0)
+        self.assertEqual(self.workspace.recomputed, 6)
+        self.workspace.values()
+        self.assertEqual(self.workspace.recomputed, 6)
+        self.workspace.define("f(x) = x")
+        self.assertEqual(self.workspace['squared'], 250.0)
+        self.assertEqual(self.workspace.recomputed, 7)
+
+    def test_definitions_in_any_order(self):
+        self.workspace.define("later = g(missing)")
+        with self.assertRaisesRegex(CalculationError, "Unknown function 'g'"):
+            self.workspace['later']
+        self.workspace.define("g(x) = -x")
+        with self.assertRaisesRegex(CalculationError, "Unknown variable 'missing'"):
+            self.workspace['later']
+        self.workspace.define("missing = 4")
+        self.assertEqual(self.workspace['later'], -4.0)
+        self.workspace.remove('missing')
+        with self.assertRaisesRegex(CalculationError, "Unknown variable 'missing'"):
+            self.workspace['later']
+
+    def test_errors_propagate_to_dependents(self):
+        self.workspace.define("rate = 1/0")
+        for name in ('total', 'squared'):
+            with self.assertRaisesRegex(CalculationError, "division by zero"):
+                self.workspace[name]
+        self.assertEqual(self.workspace['unrelated'], 6.0)
+        self.workspace.define("rate = 0")
+        self.assertEqual(self.workspace['total'], 100.0)
+
+    def test_rejected_definitions(self):
+        for statement, message in [("price = total", "Circular reference to 'price'"),
+                                   ("f(x) = squared", "Circular reference to 'f'"),
+                                   ("sin = 1", "'sin' is a built-in name"),
+                                   ("g(pi) = pi", "'pi' is a built-in name"),
+                                   ("1 + 2", "Expected")]:
+            with self.assertRaisesRegex(CalculationError, message, msg=statement):
+                self.workspace.define(statement)
+        self.assertEqual(self.workspace['total'], 125.0)
+
+    def test_engine_workspace(self):
+        calc = CalculatorEngine()
+        calc.define("rate = 0.05")
+        calc.define("grow(x) = x*(1+rate)")
+        calc.current_expression = "grow(200)"
+        self.assertEqual(calc.evaluate(), 210.0)
+        calc.define("rate = 0.5")
+        self.assertEqual(calc.evaluate(), 300.0)
+        with self.assertRaisesRegex(CalculationError, "Unknown function 'grow'"):
+            compile_expression("grow(200)")
+
+    def test_workspace_with_backend(self):
+        calc = CalculatorEngine(backend='fraction')
+        calc.define("third = 1/3")
+        calc.define("triple(x) = 3*x")
+        calc.current_expression = "triple(third)"
+        self.assertEqual(calc.evaluate(), 1)
+        self.assertEqual(type(calc.evaluate()).__name__, 'Fraction')
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
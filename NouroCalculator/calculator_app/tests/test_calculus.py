@@ -0,0 +1,89 @@
+import math
+import unittest
+
+import calculus
+from calculator import CalculationError, compile_expression, optimize, parse, tokenize
+from calculus import derivative, minimize, solve
+
+class TestDerivative(unittest.TestCase):
+    def test_simplified_source(self):
+        cases = {
+            "x^2": "2*x",
+            "x^(3)+2*x": "3*x^(2) + 2",
+            "sin(x)*x": "cos(x)*x + sin(x)",
+            "1/x": "-1/x^(2)",
+            "a*x+b": "a",
+            "5!*x": "120",
+            "sin(-x)": "-cos(-x)",
+            "y^2": "0",
+        }
+        for expression, expected in cases.items():
+            self.assertEqual(derivative(expression).source, expected, msg=expression)
+
+    def test_matches_finite_differences(self):
+        values = {'a': 2.0, 'x': 0.7}
+        for expression in ("x/(1+x)", "2^x", "x^x", "sqrt(x^2+1)", "ln(x)*exp(-x)", "-x^(2)",
+                           "log(x)", "tan(x)", "asin(x)", "acos(x)", "atan(a*x)", "cos(x)^(a)"):
+            compiled = compile_expression(expression)
+            h = 1e-6
+            estimate = (compiled.evaluate(values, x=0.7 + h) - compiled.evaluate(values, x=0.7 - h)) / (2 * h)
+            self.assertAlmostEqual(derivative(expression).evaluate(values), estimate, places=5, msg=expression)
+
+    def test_source_parses_back_to_the_same_program(self):
+        for expression in ("x^x", "ln(x)*exp(-x)", "sqrt(x^2+1)", "(x-1)/(x+1)", "-(x+1)^(3)"):
+            compiled = derivative(expression)
+            self.assertEqual(optimize(parse(tokenize(compiled.source))), compiled.program)
+
+    def test_other_variable_and_cache(self):
+        self.assertEqual(derivative("x*y", 'y').source, "x")
+        self.assertIs(derivative("x*y", 'y'), derivative(compile_expression("x*y"), 'y'))
+
+    def test_factorial_of_variable(self):
+        with self.assertRaises(CalculationError):
+            derivative("(x+1)!")
+
+class TestSolve(unittest.TestCase):
+    def test_bracketed_newton(self):
+        solution = solve("x^2-2", bracket=(0, 2))
+        self.assertAlmostEqual(solution.x, math.sqrt(2), places=12)
+        self.assertEqual(solution.method, 'newton')
+        self.assertLess(solution.iterations, 10)
+        self.assertAlmostEqual(solve("cos(x)-x", bracket=(0, 1)).x, 0.7390851332151607, places=12)
+
+    def test_break_even_rate(self):
+        solution = solve("100*(1+r)^(n)-150", 'r', (0, 1), values={'n': 10})
+        self.assertAlmostEqual(100 * (1 + solution.x) ** 10, 150, places=9)
+
+    def test_guess(self):
+        self.assertAlmostEqual(solve("x^3-27", guess=5).x, 3.0, places=12)
+        with self.assertRaises(CalculationError):
+            solve("x^2+1", guess=0)
+
+    def test_bad_input(self):
+        with self.assertRaises(CalculationError):
+            solve("x^2-2")
+        with self.assertRaises(CalculationError):
+            solve("x^2+1", bracket=(-1, 1))
+        with self.assertRaises(CalculationError):
+            solve("x-y", bracket=(0, 1))
+        self.assertEqual(solve("x-1", bracket=(1, 3)), (1.0, 0.0, 0, 'bracket'))
+
+    def test_brent(self):
+        f = lambda x: x ** 3 - 2 * x - 5
+        solution = calculus._brent_root(f, 2.0, f(2.0), 3.0, f(3.0), 1e-12, 100)
+        self.assertAlmostEqual(solution.x, 2.0945514815423265, places=12)
+        self.assertEqual(solution.method, 'brent')
+
+class TestMinimize(unittest.TestCase):
+    def test_minimum(self):
+        solution = minimize("(x-2)^2+1", bracket=(0, 5))
+        self.assertAlmostEqual(solution.x, 2.0, places=6)
+        self.assertAlmostEqual(solution.value, 1.0, places=12)
+        self.assertAlmostEqual(minimize("sin(x)", bracket=(0, 2 * math.pi)).x, 3 * math.pi / 2, places=6)
+
+    def test_other_variables(self):
+        solution = minimize("(t-a)^2", 't', (-10, 10), values={'a': -3})
+        self.assertAlmostEqual(solution.x, -3.0, places=6)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from cli import main, write_batched
+
+class TestStreamingCli(unittest.TestCase):
+    def run_cli(self, text, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write(text)
+        self.addCleanup(os.unlink, f.name)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            status = main([*args, f.name])
+        return status, out.getvalue()
+
+    def test_tab_separated_output(self):
+        status, output = self.run_cli("1+2\n\n2*π\n")
+        self.assertEqual(status, 0)
+        self.assertEqual(output.splitlines(), ["1+2\t3.0", "2*π\t6.283185307179586"])
+
+    def test_errors_are_reported_inline(self):
+        status, output = self.run_cli("1/0\n2+2\n", "--json")
+        self.assertEqual(status, 1)
+        records = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(records[0]['expression'], "1/0")
+        self.assertIn('error', records[0])
+        self.assertEqual(records[1], {'expression': "2+2", 'result': 4.0})
+
+    def test_non_finite_results_are_null(self):
+        def reject(constant):
+            raise ValueError(f"Not valid JSON: {constant}")
+        status, output = self.run_cli("1e308*10\n", "--json")
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(output, parse_constant=reject), {'expression': "1e308*10", 'result': None})
+
+    def test_write_batched(self):
+        out = io.StringIO()
+        write_batched((f"{i}\n" for i in range(5)), out, batch_size=2)
+        self.assertEqual(out.getvalue(), "0\n1\n2\n3\n4\n")
+
+if __name__ == "__main__":
+    unittest.main()
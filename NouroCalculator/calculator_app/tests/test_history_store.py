@@ -0,0 +1,88 @@
+import os
+import tempfile
+import tracemalloc
+import unittest
+from calculator import CalculatorEngine, CalculationError
+from history_store import HistoryStore
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'history')
+        self.store = HistoryStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_append_and_random_access(self):
+        for i in range(100):
+            self.assertEqual(self.store.append(f"{i}*2", i * 2.0), i)
+        self.assertEqual(len(self.store), 100)
+        self.assertEqual(self.store[0], ("0*2", 0.0))
+        self.assertEqual(self.store[57], ("57*2", 114.0))
+        self.assertEqual(self.store[-1], ("99*2", 198.0))
+        self.assertEqual(self.store.recent(2), [("99*2", 198.0), ("98*2", 196.0)])
+        with self.assertRaises(IndexError):
+            self.store[100]
+
+    def test_persistence(self):
+        self.store.append("sqrt(2)×π", 4.44)
+        self.store.close()
+        self.store = HistoryStore(self.path)
+        self.assertEqual(self.store[0], ("sqrt(2)×π", 4.44))
+
+    def test_prefix_search(self):
+        for expression in ["12+1", "sin(1)", "12+3", "sin(2)*sin(3)", "1", "sin(2)*cos(3)"]:
+            self.store.append(expression, 0.0)
+        self.assertEqual([e for _, e, _ in self.store.search("12+")], ["12+3", "12+1"])
+        self.assertEqual([e for _, e, _ in self.store.search("sin(2)*c")], ["sin(2)*cos(3)"])
+        self.assertEqual([p for p, _, _ in self.store.search("sin", limit=2)], [5, 3])
+        self.assertEqual(len(list(self.store.search(""))), 6)
+        self.assertEqual(list(self.store.search("cos")), [])
+
+    def test_recovers_from_partial_write(self):
+        self.store.append("1+1", 2.0)
+        self.store.close()
+        with open(self.path + '.dat', 'ab') as f:
+            f.write(b'\x00\x01')
+        with open(self.path + '.key', 'ab') as f:
+            f.write(b'2+2')
+        self.store = HistoryStore(self.path)
+        self.assertEqual(len(self.store), 1)
+        self.store.append("2+2", 4.0)
+        self.assertEqual(self.store.recent(2), [("2+2", 4.0), ("1+1", 2.0)])
+
+    def test_appends_do_not_grow_resident_memory(self):
+        self.store.append("warm", 1.0)
+        self.store[0]
+        tracemalloc.start()
+        try:
+            for i in range(20000):
+                self.store.append(f"{i}+1", i + 1.0)
+            self.store[-1]
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(size, 64 * 1024)
+
+    def test_engine_records_to_store(self):
+        calc = CalculatorEngine(history_store=self.store)
+        for expression in ["1+1", "2+2"]:
+            calc.current_expression = expression
+            calc.evaluate()
+        self.assertEqual(calc.history_size(), 2)
+        self.assertEqual(calc.history_entry(0), ("2+2", 4.0))
+        self.assertEqual(self.store[0], ("1+1", 2.0))
+
+    def test_backends_with_other_results_are_rejected(self):
+        for backend in ('complex', 'interval'):
+            with self.assertRaisesRegex(CalculationError, f"'{backend}' backend", msg=backend):
+                CalculatorEngine(history_store=self.store, backend=backend)
+        calc = CalculatorEngine(history_store=self.store, backend='fraction')
+        calc.current_expression = "1/4"
+        calc.evaluate()
+        self.assertEqual(self.store[0], ("1/4", 0.25))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from calculator import CalculatorEngine, CalculationError
+from metrics import LatencyHistogram, to_prometheus
+
+class TestEngineMetrics(unittest.TestCase):
+    def evaluate_all(self, calc, expressions):
+        for expression in expressions:
+            calc.current_expression = expression
+            try:
+                calc.evaluate()
+            except CalculationError:
+                pass
+
+    def test_disabled_by_default(self):
+        calc = CalculatorEngine()
+        self.evaluate_all(calc, ["1+1"])
+        self.assertIsNone(calc.metrics)
+        self.assertEqual(calc.stats(), {})
+
+    def test_counters_and_latency(self):
+        calc = CalculatorEngine(cache_size=8, metrics=True)
+        self.evaluate_all(calc, ["1+1", "1+1", "1/0", "2++3", "x"])
+        stats = calc.stats()
+        self.assertEqual(stats['evaluations'], 5)
+        self.assertEqual(stats['errors'], {'ZeroDivisionError': 1, 'SyntaxError': 1,
+                                           'CalculationError': 1})
+        self.assertEqual(stats['cache'], {'hits': 1, 'misses': 3})
+        self.assertEqual(stats['latency']['total']['count'], 5)
+        self.assertEqual(stats['latency']['tokenize']['count'], 4)
+        self.assertEqual(stats['latency']['execute']['count'], 4)
+
+    def test_workspace_evaluations_are_recorded(self):
+        calc = CalculatorEngine(metrics=True, memo_size=8)
+        calc.define("rate = 0.5")
+        calc.define("f(x) = sin(x)*2")
+        self.evaluate_all(calc, ["f(rate)+rate", "f(rate)+rate", "g(1)"])
+        stats = calc.stats()
+        self.assertEqual(stats['evaluations'], 3)
+        self.assertEqual(stats['errors'], {'CalculationError': 1})
+        self.assertEqual(stats['cache'], {'hits': 1, 'misses': 2})
+        self.assertEqual(stats['latency']['execute']['count'], 3)
+        self.assertEqual(calc.memo_info()['sin'][:2], (1, 1))
+
+    def test_slowest_expressions_and_hook(self):
+        calc = CalculatorEngine(cache_size=8)
+        seen = []
+        calc.enable_metrics(slowest=2, slow_threshold=0.0, on_slow=lambda expr, seconds: seen.append(expr))
+        nested = "(" * 3000 + "1" + ")" * 3000
+        self.evaluate_all(calc, ["1", nested, "2"])
+        slowest = calc.stats()['slowest']
+        self.assertEqual(len(slowest), 2)
+        self.assertEqual(slowest[0][0], nested)
+        self.assertEqual(seen, ["1", nested, "2"])
+
+    def test_histogram_buckets(self):
+        histogram = LatencyHistogram((0.1, 1.0))
+        for seconds in (0.05, 0.5, 5.0):
+            histogram.observe(seconds)
+        self.assertEqual(histogram.snapshot()['buckets'], [(0.1, 1), (1.0, 2), (float('inf'), 3)])
+
+    def test_prometheus_text(self):
+        calc = CalculatorEngine(metrics=True)
+        self.evaluate_all(calc, ["1/0", "2+2"])
+        text = to_prometheus(calc.stats())
+        self.assertIn("calculator_evaluations_total 2\n", text)
+        self.assertIn('calculator_errors_total{type="ZeroDivisionError"} 1\n', text)
+        self.assertIn('calculator_stage_seconds_bucket{stage="total",le="+Inf"} 2\n', text)
+        self.assertIn('calculator_stage_seconds_count{stage="execute"} 2\n', text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import math
+import unittest
+from unittest import mock
+
+import calculator
+from calculator import CalculationError
+from sampling import sample, sample_passes, value_range
+
+class TestSampling(unittest.TestCase):
+    def test_straight_line_needs_no_refinement(self):
+        passes = list(sample_passes("2*x+1", 0, 1, points=11))
+        self.assertEqual(len(passes), 1)
+        xs, ys = passes[0]
+        self.assertEqual((xs[0], xs[-1], len(xs)), (0.0, 1.0, 11))
+        self.assertEqual(ys, [2 * x + 1 for x in xs])
+
+    def test_refines_where_the_curve_bends(self):
+        xs, ys = sample("1/(1+(20*x)^2)", -1, 1, points=17)
+        self.assertEqual(xs, sorted(xs))
+        near_peak = sum(1 for x in xs if abs(x) < 0.1)
+        far_out = sum(1 for x in xs if x > 0.9)
+        self.assertGreater(near_peak, 4 * far_out)
+        for x, y in zip(xs, ys):
+            self.assertAlmostEqual(y, 1 / (1 + (20 * x) ** 2))
+
+    def test_passes_only_add_points(self):
+        previous = set()
+        for xs, ys in sample_passes("sin(x)*x", 0, 20, points=9):
+            self.assertTrue(previous <= set(xs))
+            self.assertEqual(len(xs), len(ys))
+            previous = set(xs)
+
+    def test_domain_edges_are_located(self):
+        xs, ys = sample("sqrt(x)", -1, 1, points=5, max_depth=12)
+        defined = [x for x, y in zip(xs, ys) if not math.isnan(y)]
+        self.assertLess(min(defined), 1e-3)
+        self.assertTrue(all(math.isnan(y) for x, y in zip(xs, ys) if x < 0))
+
+    def test_point_budget_and_other_variables(self):
+        xs, _ = sample("sin(1/x)", 0.01, 1, max_points=300)
+        self.assertLessEqual(len(xs), 300)
+        xs, ys = sample("a*t", 0, 1, variable='t', values={'a': 3}, points=3)
+        self.assertEqual(ys, [0.0, 1.5, 3.0])
+
+    def test_without_numpy(self):
+        with mock.patch.object(calculator, '_load_numpy', return_value=None):
+            xs, ys = sample("1/x", -1, 1, points=3, max_depth=0)
+        self.assertTrue(math.isnan(ys[1]))
+
+    def test_bad_input(self):
+        with self.assertRaises(ValueError):
+            sample("x", 1, 0)
+        with self.assertRaises(ValueError):
+            sample("x", 0, 1, points=1)
+        with self.assertRaises(CalculationError):
+            sample("x+y", 0, 1)
+
+    def test_value_range_ignores_spikes(self):
+        ys = [float(i % 10) for i in range(100)] + [1e9, -math.inf, math.nan]
+        self.assertEqual(value_range(ys), (0.0, 9.0))
+        self.assertEqual(value_range([2.0, 2.0]), (1.0, 3.0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import server
+from server import EvaluationServer
+
+def reject(constant):
+    raise ValueError(f"Not valid JSON: {constant}")
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, method, path, payload=None, headers=""):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\n{headers}"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode().split("\r\n")
+        status = int(lines[0].split()[1])
+        fields = dict(line.split(": ", 1) for line in lines[1:] if line)
+        body = await self.reader.readexactly(int(fields['Content-Length']))
+        return status, fields, json.loads(body, parse_constant=reject)
+
+class TestEvaluationServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.server = await EvaluationServer(port=0, workers=2, executor=self.executor).start()
+        self.client = Client(*await asyncio.open_connection('127.0.0.1', self.server.port))
+
+    async def asyncTearDown(self):
+        self.client.writer.close()
+        await self.server.close()
+        self.executor.shutdown()
+
+    async def test_single_and_batch_on_one_connection(self):
+        status, fields, record = await self.client.request('POST', '/evaluate', {'expression': "2+2"})
+        self.assertEqual((status, record), (200, {'expression': "2+2", 'result': 4.0}))
+        self.assertEqual(fields['Connection'], 'keep-alive')
+        status, _, record = await self.client.request('POST', '/evaluate', {'expression': "1/0"})
+        self.assertEqual(status, 422)
+        self.assertIn('error', record)
+        status, _, document = await self.client.request(
+            'POST', '/batch', {'expressions': ["1+1", "2++3", "5!"]})
+        self.assertEqual(status, 200)
+        self.assertEqual([r.get('result') for r in document['results']], [2.0, None, 120.0])
+
+    async def test_non_finite_results(self):
+        status, _, record = await self.client.request('POST', '/evaluate', {'expression': "1e308*10"})
+        self.assertEqual((status, record), (200, {'expression': "1e308*10", 'result': None}))
+        status, _, document = await self.client.request('POST', '/batch', {'expressions': ["-1e308*10", "1"]})
+        self.assertEqual([r['result'] for r in document['results']], [None, 1.0])
+
+    async def test_concurrent_requests_are_batched(self):
+        clients = [Client(*await asyncio.open_connection('127.0.0.1', self.server.port))
+                   for _ in range(20)]
+        try:
+            before = self.server.batcher.batches
+            replies = await asyncio.gather(*(client.request('POST', '/evaluate', {'expression': f"{i}*2"})
+                                             for i, client in enumerate(clients)))
+            self.assertEqual([record['result'] for _, _, record in replies], [i * 2.0 for i in range(20)])
+            self.assertLess(self.server.batcher.batches - before, 20)
+        finally:
+            for client in clients:
+                client.writer.close()
+
+    async def test_long_expressions_run_on_the_pool(self):
+        expression = "+".join(["1"] * (server.HEAVY_LENGTH // 2 + 1))
+        status, _, record = await self.client.request('POST', '/evaluate', {'expression': expression})
+        self.assertEqual((status, record['result']), (200, server.HEAVY_LENGTH // 2 + 1.0))
+        self.assertEqual(self.server.batcher.offloaded, 1)
+
+    async def test_bad_requests(self):
+        cases = [('GET', '/evaluate', None, 405), ('POST', '/nowhere', {}, 404),
+                 ('POST', '/evaluate', {'expr': "1"}, 400), ('POST', '/batch', {'expressions': [1]}, 400)]
+        for method, path, payload, expected in cases:
+            status, _, record = await self.client.request(method, path, payload)
+            self.assertEqual(status, expected, msg=path)
+            self.assertIn('error', record)
+        status, _, health = await self.client.request('GET', '/health')
+        self.assertEqual((status, health['status']), (200, 'ok'))
+        # Header errors close the connection, so each gets its own.
+        for length in ("-5", "ten"):
+            reader, writer = await asyncio.open_connection('127.0.0.1', self.server.port)
+            writer.write(f"POST /evaluate HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            self.assertTrue(head.startswith(b"HTTP/1.1 400 "), msg=length)
+            self.assertIn(b"Content-Length", await reader.read())
+            writer.close()
+
+    async def test_connection_close(self):
+        status, fields, _ = await self.client.request('POST', '/evaluate', {'expression': "1"},
+                                                      headers="Connection: close\r\n")
+        self.assertEqual((status, fields['Connection']), (200, 'close'))
+        self.assertEqual(await self.client.reader.read(), b"")
+
+if __name__ == "__main__":
+    unittest.main()
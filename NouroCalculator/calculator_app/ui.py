@@ -1,57 +1,292 @@
+import math
+import queue
+import threading
+import time
 import tkinter as tk
+from pathlib import Path
 from tkinter import messagebox
-from calculator import CalculatorEngine, CalculationError
+from calculator import (CalculatorEngine, CalculationError, ExpressionCache, IncrementalTokenizer,
+                        compile_expression, compile_tokens, evaluate_expression)
+from history_store import HistoryStore
+
+PREVIEW_DELAY_MS = 150
+PREVIEW_POLL_MS = 20
+PREVIEW_CACHE_SIZE = 64
+EVALUATION_POLL_MS = 25
+EVALUATION_TIMEOUT = 10.0
+MAX_EXPRESSION_LENGTH = 100_000
+PLOT_POLL_MS = 30
+PLOT_RANGE = (-10.0, 10.0)
+HISTORY_PATH = Path.home() / '.nourocalc' / 'history'
+# Extra bind tag shared by all calculator buttons, so hover handling is
+# bound once per window instead of twice per button.
+HOVER_TAG = 'NouroHover'
+
+THEMES = {
+    'dark': {
+        'root_bg': '#121212',
+        'mainframe_bg': '#121212',
+        'container_bg': '#1e1e1e',
+        'container_border': '#333333',
+        'display_bg': '#1e1e1e',
+        'display_fg': 'white',
+        'history_fg': '#aaaaaa',
+        'button_bg': '#2d2d2d',
+        'button_fg': 'white',
+        'button_active': '#3c3c3c',
+        'operator_bg': '#ff9500',
+        'operator_fg': 'black',
+        'operator_active': '#ffaa33',
+        'special_bg': '#444444',
+        'special_active': '#555555',
+        'scientific_bg': '#333333',
+        'scientific_active': '#444444',
+    },
+    'light': {
+        'root_bg': '#f0f0f0',
+        'mainframe_bg': '#f0f0f0',
+        'container_bg': '#ffffff',
+        'container_border': '#cccccc',
+        'display_bg': '#ffffff',
+        'display_fg': 'black',
+        'history_fg': '#666666',
+        'button_bg': '#e0e0e0',
+        'button_fg': 'black',
+        'button_active': '#d0d0d0',
+        'operator_bg': '#ff9500',
+        'operator_fg': 'black',
+        'operator_active': '#ffaa33',
+        'special_bg': '#c0c0c0',
+        'special_active': '#b0b0b0',
+        'scientific_bg': '#d0d0d0',
+        'scientific_active': '#c0c0c0',
+    }
+}
+
+# Every button's colours follow from its role; buttons not listed are
+# plain 'button's.
+BUTTON_ROLES = {
+    **dict.fromkeys(['÷', '×', '-', '+', '^', '='], 'operator'),
+    **dict.fromkeys(['C', '⌫'], 'special'),
+    **dict.fromkeys(['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'ln', 'log', 'exp', '√', '!'],
+                    'scientific'),
+}
+
+
+def _button_styles(theme):
+    return {
+        'operator': {'bg': theme['operator_bg'], 'fg': theme['operator_fg'],
+                     'activebackground': theme['operator_active']},
+        'special': {'bg': theme['special_bg'], 'activebackground': theme['special_active']},
+        'scientific': {'bg': theme['scientific_bg'], 'activebackground': theme['scientific_active']},
+        'button': {'bg': theme['button_bg'], 'fg': theme['button_fg'],
+                   'activebackground': theme['button_active']},
+    }
+
+
+# Theme -> role -> the options to config(); and the background a button of
+# that role has when not hovered and when hovered.
+BUTTON_STYLES = {name: _button_styles(theme) for name, theme in THEMES.items()}
+HOVER_COLORS = {name: {role: (style['bg'], style['activebackground']) for role, style in styles.items()}
+                for name, styles in BUTTON_STYLES.items()}
+
+
+# Previews compile every half-typed buffer; they get a small cache of their
+# own rather than filling the shared one.
+_preview_cache = ExpressionCache(PREVIEW_CACHE_SIZE)
+
+
+def _preview_result(expression, tokens):
+    try:
+        return compile_tokens(expression, tokens, _preview_cache).evaluate()
+    except CalculationError:
+        return None
+
+
+def _sample_into(compiled, start, stop, updates, cancelled):
+    # Runs in a worker thread; the panel polls `updates` from the Tk loop.
+    from sampling import sample_passes
+    try:
+        for samples in sample_passes(compiled, start, stop):
+            if cancelled.is_set():
+                return
+            updates.put(samples)
+    except (CalculationError, ValueError) as e:
+        updates.put(e)
+    finally:
+        updates.put(None)
+
+
+class PlotPanel:
+    # A window that plots an expression in x. Sampling runs in a background
+    # thread and the curve is redrawn after each refinement pass, so the
+    # calculator stays responsive however long the expression takes.
+    def __init__(self, app, expression: str):
+        self.app = app
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Plot")
+        self.window.geometry("480x400")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.window.columnconfigure(1, weight=1)
+        self.window.rowconfigure(2, weight=1)
+        self.expression_var = tk.StringVar(value=expression)
+        self.start_var = tk.StringVar(value=f"{PLOT_RANGE[0]:g}")
+        self.stop_var = tk.StringVar(value=f"{PLOT_RANGE[1]:g}")
+        self.status_var = tk.StringVar()
+        self.labels = [tk.Label(self.window, text="f(x) ="), tk.Label(self.window, text="x from")]
+        self.labels[0].grid(row=0, column=0, sticky="w", padx=5, pady=5)
+        self.labels[1].grid(row=1, column=0, sticky="w", padx=5)
+        self.expression_entry = tk.Entry(self.window, textvariable=self.expression_var)
+        self.expression_entry.grid(row=0, column=1, columnspan=3, sticky="ew", padx=5, pady=5)
+        self.expression_entry.bind('<Return>', lambda e: self.plot())
+        self.start_entry = tk.Entry(self.window, textvariable=self.start_var, width=8)
+        self.start_entry.grid(row=1, column=1, sticky="w", padx=5)
+        self.stop_entry = tk.Entry(self.window, textvariable=self.stop_var, width=8)
+        self.stop_entry.grid(row=1, column=2, sticky="w", padx=5)
+        self.plot_button = tk.Button(self.window, text="Plot", command=self.plot, relief="flat")
+        self.plot_button.grid(row=1, column=3, sticky="e", padx=5)
+        self.canvas = tk.Canvas(self.window, highlightthickness=0)
+        self.canvas.grid(row=2, column=0, columnspan=4, sticky="nsew", padx=5, pady=5)
+        self.canvas.bind('<Configure>', lambda e: self._draw())
+        self.status = tk.Label(self.window, textvariable=self.status_var, anchor="w")
+        self.status.grid(row=3, column=0, columnspan=4, sticky="ew", padx=5, pady=(0, 5))
+        self._samples = None
+        self._updates = None
+        self._cancelled = None
+        self.apply_theme()
+        self.plot()
+
+    def apply_theme(self):
+        theme = THEMES[self.app.current_theme]
+        self.window.config(bg=theme['container_bg'])
+        for label in (*self.labels, self.status):
+            label.config(bg=theme['container_bg'], fg=theme['history_fg'])
+        self.plot_button.config(bg=theme['operator_bg'], fg=theme['operator_fg'],
+                                activebackground=theme['operator_active'])
+        self.canvas.config(bg=theme['display_bg'])
+        self._draw()
+
+    def plot(self):
+        self._cancel()
+        try:
+            start, stop = float(self.start_var.get()), float(self.stop_var.get())
+            if not start < stop:
+                raise ValueError
+        except ValueError:
+            self.status_var.set("The range must be two numbers, smallest first")
+            return
+        try:
+            compiled = compile_expression(self.expression_var.get())
+        except CalculationError as e:
+            self.status_var.set(str(e))
+            return
+        unknown = [name for name in compiled.variables if name != 'x']
+        if unknown:
+            self.status_var.set(f"Unknown variable '{unknown[0]}'; only x can vary")
+            return
+        self._samples = None
+        self._updates = queue.Queue()
+        self._cancelled = threading.Event()
+        self.status_var.set("Sampling…")
+        threading.Thread(target=_sample_into, daemon=True,
+                         args=(compiled, start, stop, self._updates, self._cancelled)).start()
+        self.window.after(PLOT_POLL_MS, self._poll, self._updates)
+
+    def _poll(self, updates):
+        if updates is not self._updates:
+            return
+        latest, done = None, False
+        while True:
+            try:
+                update = updates.get_nowait()
+            except queue.Empty:
+                break
+            if update is None:
+                done = True
+            elif isinstance(update, Exception):
+                self.status_var.set(str(update))
+            else:
+                latest = update
+        if latest is not None:
+            # Each update holds every point so far; only the newest is drawn.
+            self._samples = latest
+            self._draw()
+            self.status_var.set(f"{len(latest[0])} points" + ("" if done else "…"))
+        if done:
+            self._updates = None
+        else:
+            self.window.after(PLOT_POLL_MS, self._poll, updates)
+
+    def _draw(self):
+        self.canvas.delete('plot')
+        if self._samples is None:
+            return
+        from sampling import value_range
+        xs, ys = self._samples
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        low, high = value_range(ys)
+        margin = (high - low) * 0.05
+        low, high = low - margin, high + margin
+        x_scale = (width - 1) / (xs[-1] - xs[0])
+        y_scale = (height - 1) / (high - low)
+        theme = THEMES[self.app.current_theme]
+        if low < 0 < high:
+            y = (high - 0) * y_scale
+            self.canvas.create_line(0, y, width, y, fill=theme['container_border'], tags='plot')
+        if xs[0] < 0 < xs[-1]:
+            x = -xs[0] * x_scale
+            self.canvas.create_line(x, 0, x, height, fill=theme['container_border'], tags='plot')
+        # One line per run of defined points; values far outside the view
+        # are clamped so the canvas coordinates stay reasonable.
+        run = []
+        for x, y in zip(xs, ys):
+            if not math.isfinite(y):
+                self._draw_run(run, theme)
+                run = []
+                continue
+            run.append((x - xs[0]) * x_scale)
+            run.append(min(max((high - y) * y_scale, -height), 2 * height))
+        self._draw_run(run, theme)
+
+    def _draw_run(self, run, theme):
+        if len(run) >= 4:
+            self.canvas.create_line(*run, fill=theme['operator_bg'], width=2, tags='plot')
+
+    def _cancel(self):
+        if self._cancelled is not None:
+            self._cancelled.set()
+        self._updates = None
+
+    def close(self):
+        self._cancel()
+        self.app._plot_panel = None
+        self.window.destroy()
 
 class NouroCalculatorUI:
-    def __init__(self, root: tk.Tk):
-        self.THEMES = {
-            'dark': {
-                'root_bg': '#121212',
-                'mainframe_bg': '#121212',
-                'container_bg': '#1e1e1e',
-                'container_border': '#333333',
-                'display_bg': '#1e1e1e',
-                'display_fg': 'white',
-                'history_fg': '#aaaaaa',
-                'button_bg': '#2d2d2d',
-                'button_fg': 'white',
-                'button_active': '#3c3c3c',
-                'operator_bg': '#ff9500',
-                'operator_fg': 'black',
-                'operator_active': '#ffaa33',
-                'special_bg': '#444444',
-                'special_active': '#555555',
-                'scientific_bg': '#333333',
-                'scientific_active': '#444444',
-            },
-            'light': {
-                'root_bg': '#f0f0f0',
-                'mainframe_bg': '#f0f0f0',
-                'container_bg': '#ffffff',
-                'container_border': '#cccccc',
-                'display_bg': '#ffffff',
-                'display_fg': 'black',
-                'history_fg': '#666666',
-                'button_bg': '#e0e0e0',
-                'button_fg': 'black',
-                'button_active': '#d0d0d0',
-                'operator_bg': '#ff9500',
-                'operator_fg': 'black',
-                'operator_active': '#ffaa33',
-                'special_bg': '#c0c0c0',
-                'special_active': '#b0b0b0',
-                'scientific_bg': '#d0d0d0',
-                'scientific_active': '#c0c0c0',
-            }
-        }
+    def __init__(self, root: tk.Tk, timeout: float = EVALUATION_TIMEOUT,
+                 max_expression_length: int = MAX_EXPRESSION_LENGTH, history_path=None):
         self.root = root
         self.root.title("Nouro Calculator")
         self.root.geometry("400x500")
         self.root.minsize(300, 400)
         self.current_theme = 'dark'
-        self.engine = CalculatorEngine()
+        history_store = HistoryStore(history_path) if history_path is not None else None
+        self.engine = CalculatorEngine(history_store=history_store)
         self.scientific_mode = False
         self.history_position = -1
+        self._tokenizer = IncrementalTokenizer()
+        # Started on first use, like the calculation pool below: neither is
+        # needed to put the window on screen.
+        self._preview_executor = None
+        self._preview_job = None
+        self._preview_future = None
+        self.timeout = timeout
+        self.max_expression_length = max_expression_length
+        # Calculations run in a worker process so that they can be killed;
+        # the pool is started on first use and replaced after a cancel.
+        self._pool = None
+        self._pending = None
+        self._plot_panel = None
         self._create_widgets()
         self._setup_keybindings()
         self._apply_theme()
@@ -88,18 +323,32 @@ class NouroCalculatorUI:
             padx=10
         )
         self.history_label.grid(row=1, column=0, sticky="ew")
+        self.cancel_button = tk.Button(
+            self.calc_container,
+            text="Cancel",
+            command=self.cancel_calculation,
+            font=("Helvetica", 10),
+            relief="flat",
+            borderwidth=0
+        )
+        self.cancel_button.grid(row=2, column=0, sticky="e", padx=10, pady=(0, 5))
+        self.cancel_button.grid_remove()
         self.button_frame = tk.Frame(self.mainframe)
         self.button_frame.grid(row=1, column=0, sticky="nsew")
         for i in range(5):
             self.button_frame.columnconfigure(i, weight=1, uniform="btn")
         for i in range(7):
             self.button_frame.rowconfigure(i, weight=1, uniform="btn")
+        self.root.bind_class(HOVER_TAG, "<Enter>", lambda e: self._on_button_hover(e.widget, True))
+        self.root.bind_class(HOVER_TAG, "<Leave>", lambda e: self._on_button_hover(e.widget, False))
+        self._roles = {}
         self._create_buttons()
         self.menu_bar = tk.Menu(self.root)
         self.root.config(menu=self.menu_bar)
         view_menu = tk.Menu(self.menu_bar, tearoff=0)
         view_menu.add_command(label="Scientific Mode", command=self.toggle_scientific_mode, accelerator="Ctrl+M")
         view_menu.add_command(label="Toggle Theme", command=self.toggle_theme, accelerator="Ctrl+T")
+        view_menu.add_command(label="Plot…", command=self.show_plot, accelerator="Ctrl+P")
         self.menu_bar.add_cascade(label="View", menu=view_menu)
         history_menu = tk.Menu(self.menu_bar, tearoff=0)
         history_menu.add_command(label="Show History", command=self.show_history)
@@ -136,6 +385,14 @@ class NouroCalculatorUI:
             ('π', 4, 2, 1, lambda: self.add_to_expression('π')),
             ('=', 4, 3, 2, self.calculate),
         ]
+        self.buttons = {}
+        for (text, row, col, colspan, command) in classic_buttons:
+            btn = self._create_button(text, row, col, colspan, command)
+            self.buttons[text] = btn
+        # Scientific buttons are only built when scientific mode is first shown.
+        self.scientific_buttons = []
+
+    def _create_scientific_buttons(self):
         scientific_buttons = [
             ('sin', 5, 0, 1, lambda: self.add_function('sin(')),
             ('cos', 5, 1, 1, lambda: self.add_function('cos(')),
@@ -148,16 +405,12 @@ class NouroCalculatorUI:
             ('e', 6, 3, 1, lambda: self.add_to_expression('e')),
             ('exp', 6, 4, 1, lambda: self.add_function('exp(')),
         ]
-        self.buttons = {}
-        for (text, row, col, colspan, command) in classic_buttons:
-            btn = self._create_button(text, row, col, colspan, command)
-            self.buttons[text] = btn
-        self.scientific_buttons = []
+        styles = BUTTON_STYLES[self.current_theme]
         for (text, row, col, colspan, command) in scientific_buttons:
             btn = self._create_button(text, row, col, colspan, command)
+            btn.config(**styles[self._roles[btn]])
             self.scientific_buttons.append(btn)
             self.buttons[text] = btn
-            btn.grid_remove()
 
     def _create_button(self, text, row, col, colspan, command):
         btn = tk.Button(
@@ -169,24 +422,16 @@ class NouroCalculatorUI:
             borderwidth=0
         )
         btn.grid(row=row, column=col, columnspan=colspan, sticky="nsew", padx=2, pady=2)
-        btn.bind("<Enter>", lambda e, b=btn: self._on_button_hover(b, True))
-        btn.bind("<Leave>", lambda e, b=btn: self._on_button_hover(b, False))
+        btn.bindtags(btn.bindtags() + (HOVER_TAG,))
+        self._roles[btn] = BUTTON_ROLES.get(text, 'button')
         return btn
 
     def _on_button_hover(self, button, hover):
-        theme = self.THEMES[self.current_theme]
-        text = button['text']
-        if text in ['÷', '×', '-', '+', '^', '=']:
-            button.config(bg=theme['operator_active'] if hover else theme['operator_bg'])
-        elif text in ['C', '⌫']:
-            button.config(bg=theme['special_active'] if hover else theme['special_bg'])
-        elif text in ['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'ln', 'log', 'exp', '√', '!']:
-            button.config(bg=theme['scientific_active'] if hover else theme['scientific_bg'])
-        else:
-            button.config(bg=theme['button_active'] if hover else theme['button_bg'])
+        normal, active = HOVER_COLORS[self.current_theme][self._roles[button]]
+        button.config(bg=active if hover else normal)
 
-    def _apply_theme(self):
-        theme = self.THEMES[self.current_theme]
+    def _apply_theme(self, previous_theme=None):
+        theme = THEMES[self.current_theme]
         self.root.config(bg=theme['root_bg'])
         self.mainframe.config(bg=theme['mainframe_bg'])
         self.calc_container.config(
@@ -203,29 +448,22 @@ class NouroCalculatorUI:
             bg=theme['display_bg'],
             fg=theme['history_fg']
         )
-        for text, button in self.buttons.items():
-            if text in ['÷', '×', '-', '+', '^', '=']:
-                button.config(
-                    bg=theme['operator_bg'],
-                    fg=theme['operator_fg'],
-                    activebackground=theme['operator_active']
-                )
-            elif text in ['C', '⌫']:
-                button.config(
-                    bg=theme['special_bg'],
-                    activebackground=theme['special_active']
-                )
-            elif text in ['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'ln', 'log', 'exp', '√', '!']:
-                button.config(
-                    bg=theme['scientific_bg'],
-                    activebackground=theme['scientific_active']
-                )
-            else:
-                button.config(
-                    bg=theme['button_bg'],
-                    fg=theme['button_fg'],
-                    activebackground=theme['button_active']
-                )
+        self.cancel_button.config(
+            bg=theme['special_bg'],
+            fg=theme['button_fg'],
+            activebackground=theme['special_active']
+        )
+        # Everything is configured in this one pass, before Tk gets back to
+        # its idle loop to redraw; buttons whose role looks the same in the
+        # previous theme are left alone.
+        styles = BUTTON_STYLES[self.current_theme]
+        previous = BUTTON_STYLES.get(previous_theme, {})
+        changed = {role for role, style in styles.items() if previous.get(role) != style}
+        for button, role in self._roles.items():
+            if role in changed:
+                button.config(**styles[role])
+        if self._plot_panel is not None:
+            self._plot_panel.apply_theme()
 
     def _setup_keybindings(self):
         for digit in "0123456789":
@@ -237,12 +475,13 @@ class NouroCalculatorUI:
         for key, value in operators.items():
             self.root.bind(key, lambda e, v=value: self.add_to_expression(v))
         self.root.bind('<Return>', lambda e: self.calculate())
-        self.root.bind('<Escape>', lambda e: self.clear())
+        self.root.bind('<Escape>', lambda e: self._on_escape())
         self.root.bind('<BackSpace>', lambda e: self.delete())
         self.root.bind('<Up>', lambda e: self.navigate_history(-1))
         self.root.bind('<Down>', lambda e: self.navigate_history(1))
         self.root.bind('<Control-m>', lambda e: self.toggle_scientific_mode())
         self.root.bind('<Control-t>', lambda e: self.toggle_theme())
+        self.root.bind('<Control-p>', lambda e: self.show_plot())
 
     def add_to_expression(self, value: str):
         expr = self.engine.current_expression
@@ -270,26 +509,97 @@ class NouroCalculatorUI:
         self._update_display()
 
     def calculate(self):
+        if self._pending is not None:
+            return
+        expr = self.engine.current_expression
+        if not expr:
+            self.display_var.set(str(self.engine.evaluate()))
+            return
+        if len(expr) > self.max_expression_length:
+            messagebox.showerror(
+                "Calculation Error",
+                f"Expression is longer than {self.max_expression_length} characters")
+            return
+        if self._pool is None:
+            import multiprocessing
+            # Not forked: the preview thread may hold a cache lock at that
+            # moment, and a forked child would inherit it locked.
+            self._pool = multiprocessing.get_context('spawn').Pool(1)
+        self._pending = (expr, self._pool.apply_async(evaluate_expression, (expr,)),
+                         time.monotonic() + self.timeout)
+        self._set_busy(True)
+        self.root.after(EVALUATION_POLL_MS, self._poll_calculation)
+
+    def _poll_calculation(self):
+        if self._pending is None:
+            return
+        expr, job, deadline = self._pending
+        if not job.ready():
+            if time.monotonic() >= deadline:
+                self.cancel_calculation()
+                messagebox.showerror("Calculation Error",
+                                     f"Calculation took longer than {self.timeout:g} seconds")
+            else:
+                self.root.after(EVALUATION_POLL_MS, self._poll_calculation)
+            return
+
+        self._pending = None
+        self._set_busy(False)
         try:
-            result = self.engine.evaluate()
-            self.display_var.set(str(result))
-            self.history_var.set(self.engine.current_expression)
-            self.engine.clear()
-            self.history_position = -1
+            result = job.get()
         except CalculationError as e:
             messagebox.showerror("Calculation Error", str(e))
             self.clear()
+            return
+        except Exception as e:
+            # A worker that died or a result that could not be sent back;
+            # the next calculation starts a fresh pool.
+            self._pool.terminate()
+            self._pool = None
+            messagebox.showerror("Calculation Error", f"{type(e).__name__}: {e}")
+            self.clear()
+            return
+        self.engine.add_to_history(expr, result)
+        self.display_var.set(str(result))
+        self.history_var.set(expr)
+        if self.engine.current_expression == expr:
+            self.engine.clear()
+        self.history_position = -1
+
+    def cancel_calculation(self):
+        if self._pending is None:
+            return
+        self._pending = None
+        self._pool.terminate()
+        self._pool = None
+        self._set_busy(False)
+        self.history_var.set("Cancelled")
+
+    def _set_busy(self, busy: bool):
+        if busy:
+            self.history_var.set("Calculating… (Esc to cancel)")
+            self.cancel_button.grid()
+            self.root.config(cursor="watch")
+        else:
+            self.cancel_button.grid_remove()
+            self.root.config(cursor="")
+
+    def _on_escape(self):
+        if self._pending is not None:
+            self.cancel_calculation()
+        else:
+            self.clear()
 
     def navigate_history(self, direction: int):
-        history = self.engine.get_history()
-        if not history:
+        size = self.engine.history_size()
+        if not size:
             return
-        self.history_position = max(-1, min(self.history_position + direction, len(history)-1))
+        self.history_position = max(-1, min(self.history_position + direction, size-1))
         if self.history_position == -1:
             self.engine.current_expression = ""
             self._update_display()
         else:
-            expr, result = history[self.history_position]
+            expr, result = self.engine.history_entry(self.history_position)
             self.engine.current_expression = expr
             self.display_var.set(str(result))
             self.history_var.set(expr)
@@ -298,9 +608,48 @@ class NouroCalculatorUI:
         expr = self.engine.current_expression
         self.display_var.set(expr if expr else "0")
         self.history_var.set("")
+        self._schedule_preview()
+
+    def _schedule_preview(self):
+        # Debounced: a burst of keystrokes only triggers one preview.
+        if self._preview_job is not None:
+            self.root.after_cancel(self._preview_job)
+        self._preview_job = self.root.after(PREVIEW_DELAY_MS, self._start_preview)
+
+    def _start_preview(self):
+        self._preview_job = None
+        expr = self.engine.current_expression
+        if not expr:
+            return
+        try:
+            tokens = self._tokenizer.update(expr).copy()
+        except SyntaxError:
+            return
+        if self._preview_future is not None:
+            self._preview_future.cancel()
+        if self._preview_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._preview_executor = ThreadPoolExecutor(max_workers=1)
+        self._preview_future = self._preview_executor.submit(_preview_result, expr, tokens)
+        self._poll_preview(self._preview_future, expr)
+
+    def _poll_preview(self, future, expr):
+        if future is not self._preview_future:
+            return
+        if not future.done():
+            self.root.after(PREVIEW_POLL_MS, self._poll_preview, future, expr)
+            return
+        self._preview_future = None
+        if future.cancelled() or expr != self.engine.current_expression:
+            return
+        result = future.result()
+        if result is not None:
+            self.history_var.set(f"= {result}")
 
     def toggle_scientific_mode(self):
         self.scientific_mode = not self.scientific_mode
+        if self.scientific_mode and not self.scientific_buttons:
+            self._create_scientific_buttons()
         for btn in self.scientific_buttons:
             if self.scientific_mode:
                 btn.grid()
@@ -310,8 +659,17 @@ class NouroCalculatorUI:
         self.root.geometry(f"400x{height}")
 
     def toggle_theme(self):
-        self.current_theme = 'light' if self.current_theme == 'dark' else 'dark'
-        self._apply_theme()
+        previous_theme = self.current_theme
+        self.current_theme = 'light' if previous_theme == 'dark' else 'dark'
+        self._apply_theme(previous_theme)
+
+    def show_plot(self):
+        expression = self.engine.current_expression or "sin(x)"
+        if self._plot_panel is None:
+            self._plot_panel = PlotPanel(self, expression)
+        else:
+            self._plot_panel.expression_var.set(expression)
+            self._plot_panel.plot()
 
     def show_history(self):
         history = self.engine.get_history()
@@ -326,11 +684,12 @@ class NouroCalculatorUI:
             "Digits: 0-9",
             "Operators: + - * / ^ !",
             "Enter: Calculate",
-            "Escape: Clear",
+            "Escape: Clear / cancel a running calculation",
             "Backspace: Delete last character",
             "Up/Down: Navigate history",
             "Ctrl+M: Toggle scientific mode",
             "Ctrl+T: Toggle theme",
+            "Ctrl+P: Plot the expression in x",
             "(: Open parenthesis",
             "): Close parenthesis"
         ]
@@ -348,5 +707,5 @@ class NouroCalculatorUI:
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = NouroCalculatorUI(root)
+    app = NouroCalculatorUI(root, history_path=HISTORY_PATH)
     root.mainloop()
\ No newline at end of file